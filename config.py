@@ -20,8 +20,30 @@ class Config:
     
     # ML Configuration
     PROPHET_TIMEOUT = int(os.getenv('PROPHET_TIMEOUT', 30))
+    PROPHET_POOL_WORKERS = int(os.getenv('PROPHET_POOL_WORKERS', 4))  # concurrent fits (one per currency); 0 = fit inline
+    PROPHET_WARM_START = os.getenv('PROPHET_WARM_START', 'True').lower() == 'true'  # refit from previous params
     ML_CACHE_ENABLED = os.getenv('ML_CACHE_ENABLED', 'True').lower() == 'true'
-    
+    ML_CACHE_MAX_ENTRIES = int(os.getenv('ML_CACHE_MAX_ENTRIES', 256))
+    ML_CACHE_MAX_MB = int(os.getenv('ML_CACHE_MAX_MB', 64))
+    BOOTSTRAP_PATHS = int(os.getenv('BOOTSTRAP_PATHS', 2000))  # simulated paths for prediction intervals
+    MODEL_STORE_ENABLED = os.getenv('MODEL_STORE_ENABLED', 'True').lower() == 'true'
+    MODEL_STORE_DIR = os.getenv('MODEL_STORE_DIR',
+                                os.path.join(os.path.dirname(os.path.abspath(__file__)), 'htmlss', 'model_store'))
+    COMMODITY_FORECAST_ENGINE = os.getenv('COMMODITY_FORECAST_ENGINE', 'ensemble')
+    PROPHET_TUNED_PARAMS_FILE = os.getenv('PROPHET_TUNED_PARAMS_FILE',
+                                          os.path.join(os.path.dirname(os.path.abspath(__file__)), 'htmlss', 'prophet_params.json'))
+    ENSEMBLE_WEIGHTS_FILE = os.getenv('ENSEMBLE_WEIGHTS_FILE',
+                                      os.path.join(os.path.dirname(os.path.abspath(__file__)), 'htmlss', 'ensemble_weights.json'))
+    CURRENCY_FORECAST_ENGINE = os.getenv('CURRENCY_FORECAST_ENGINE', 'auto')
+    FORECAST_PRECOMPUTE_ENABLED = os.getenv('FORECAST_PRECOMPUTE_ENABLED', 'True').lower() == 'true'
+    FORECAST_REFRESH_INTERVAL = int(os.getenv('FORECAST_REFRESH_INTERVAL', 300))  # seconds
+    FORECAST_SCHEDULER_LOCK_FILE = os.getenv('FORECAST_SCHEDULER_LOCK_FILE',
+                                             os.path.join(os.path.dirname(os.path.abspath(__file__)), 'htmlss', 'forecast_scheduler.lock'))
+    FORECAST_LEDGER_ENABLED = os.getenv('FORECAST_LEDGER_ENABLED', 'True').lower() == 'true'
+    CURRENCY_CACHE_ENABLED = os.getenv('CURRENCY_CACHE_ENABLED', 'True').lower() == 'true'  # memory-mapped compiled CSVs
+    CURRENCY_CACHE_DIR = os.getenv('CURRENCY_CACHE_DIR',
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), 'htmlss', 'currency_cache'))
+
     # API Rate Limiting
     RATE_LIMIT_PER_MINUTE = int(os.getenv('RATE_LIMIT_PER_MINUTE', 60))
     
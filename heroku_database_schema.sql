@@ -91,6 +91,29 @@ CREATE TABLE IF NOT EXISTS imports_share (
     change2 DECIMAL(5,2)
 );
 
+-- Create forecast_ledger table (if not exists); also created by htmlss/forecast_ledger.py
+CREATE TABLE IF NOT EXISTS forecast_ledger (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    run_id CHAR(32) NOT NULL,
+    series_type VARCHAR(16) NOT NULL,
+    source VARCHAR(64) NOT NULL,
+    series VARCHAR(255) NOT NULL,
+    engine VARCHAR(64) NOT NULL,
+    method VARCHAR(128),
+    as_of VARCHAR(10) NOT NULL,
+    target VARCHAR(10) NOT NULL,
+    horizon INT NOT NULL,
+    predicted DOUBLE NOT NULL,
+    lower_bound DOUBLE,
+    upper_bound DOUBLE,
+    compute_seconds DOUBLE,
+    actual DOUBLE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    scored_at TIMESTAMP NULL,
+    UNIQUE KEY forecast_target (series_type, source, series, engine, as_of, target),
+    KEY unscored (actual, series_type)
+);
+
 -- Insert sample data (you'll need to export your current data)
 -- Use: mysqldump -u root -p bigdatahackaton > database_backup.sql
 -- Then modify and run on ClearDB
\ No newline at end of file
@@ -3,18 +3,76 @@ import os
 import numpy as np
 from datetime import datetime, timedelta
 from db import register_user, check_user, get_db_connection
-from ml_predictions import generate_ml_predictions
+from ml_predictions import generate_ml_predictions, generate_batch_predictions, DEFAULT_HORIZON, MAX_HORIZON
+from ml_predictions import available_engines as commodity_engines
+from commodity_data import resolve_commodity_table, load_commodity_table
 from currency_analysis import (
     load_currency_data,
     calculate_currency_statistics,
     get_currency_data_by_period,
-    prepare_chart_data
+    prepare_chart_data,
+    AVAILABLE_CURRENCIES
 )
-from currency_forecasting import forecast_2026, forecast_all_currencies
+from currency_forecasting import (
+    forecast_all_currencies,
+    get_cached_forecast,
+    format_daily_forecast,
+    FORECAST_RESOLUTIONS,
+    available_engines as currency_engines
+)
+from joint_forecasting import JOINT_ENGINE
+from settings import CURRENCY_FORECAST_ENGINE
+from forecast_scheduler import forecast_scheduler, start_forecast_scheduler
+from forecast_engines import FORECAST_ENGINES
+from gdp_forecast import get_gdp_forecast, DEFAULT_GDP_ENGINE
+from forecast_ledger import ledger_summary
 
 app = Flask(__name__)
 app.secret_key = os.urandom(24)  # Needed for session management
 
+# Precompute forecasts in the background (in one worker per machine, see forecast_scheduler;
+# not in multiprocessing children re-importing this module)
+if __name__ != '__mp_main__':
+    start_forecast_scheduler()
+
+def get_horizon_arg():
+    """Forecast horizon (quarters) from the ?horizon= query parameter, or None if invalid"""
+    try:
+        horizon = int(request.args.get('horizon', DEFAULT_HORIZON))
+    except ValueError:
+        return None
+    return horizon if 1 <= horizon <= MAX_HORIZON else None
+
+HORIZON_ERROR = f'horizon must be an integer between 1 and {MAX_HORIZON}'
+
+def get_forecast_format_args():
+    """
+    daily_forecast formatting from the ?resolution=, ?encoding= and ?precision=
+    query parameters as (resolution, compact, precision), or None if invalid
+    """
+    resolution = request.args.get('resolution', 'daily')
+    encoding = request.args.get('encoding', 'full')
+    precision = request.args.get('precision')
+    if resolution not in FORECAST_RESOLUTIONS or encoding not in ('full', 'compact'):
+        return None
+    if precision is not None:
+        try:
+            precision = int(precision)
+        except ValueError:
+            return None
+        if not 0 <= precision <= 10:
+            return None
+    return resolution, encoding == 'compact', precision
+
+FORMAT_ERROR = (f"resolution must be one of {', '.join(FORECAST_RESOLUTIONS)}, "
+                "encoding full or compact and precision an integer between 0 and 10")
+
+def format_forecast(forecast, forecast_format):
+    """Apply the requested daily_forecast formatting to a forecast result in place"""
+    if forecast_format != ('daily', False, None) and 'daily_forecast' in forecast:
+        forecast['daily_forecast'] = format_daily_forecast(forecast['daily_forecast'], *forecast_format)
+    return forecast
+
 # Authentication decorator
 def login_required(f):
     def decorated_function(*args, **kwargs):
@@ -211,6 +269,13 @@ def import_commodity_options():
 # Endpoint to get commodity timeline data with ML predictions
 @app.route('/commodity_timeline/<commodity>')
 def commodity_timeline(commodity):
+    engine = request.args.get('engine')
+    if engine and engine not in commodity_engines():
+        return jsonify({'error': f'Unknown engine: {engine}', 'engines': commodity_engines()}), 400
+    horizon = get_horizon_arg()
+    if horizon is None:
+        return jsonify({'error': HORIZON_ERROR}), 400
+    
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -256,9 +321,10 @@ def commodity_timeline(commodity):
         conn.close()
         return jsonify({'error': f'Database error: {str(e)}'})
     
-    # Generate ML predictions for 2025Q3 and 2025Q4 using real data
+    # Generate ML predictions for the next `horizon` quarters using real data
     try:
-        ml_results = generate_ml_predictions(timeline_data, commodity)
+        ml_results = generate_ml_predictions(timeline_data, commodity, table='export_commodities', engine=engine,
+                                             horizon=horizon)
         ml_predictions = ml_results['predictions']
         model_performance = ml_results['model_performance']
         models_used = ml_results['models_used']
@@ -281,6 +347,8 @@ def commodity_timeline(commodity):
             'model_performance': model_performance,
             'models_used': models_used,
             'ml_enabled': True,
+            'cached': ml_results['cached'],
+            'horizon': horizon,
             'data_source': 'Real database values'
         }
         
@@ -329,6 +397,13 @@ def commodity_timeline(commodity):
 # Endpoint to get import commodity timeline data with ML predictions
 @app.route('/import_commodity_timeline/<commodity>')
 def import_commodity_timeline(commodity):
+    engine = request.args.get('engine')
+    if engine and engine not in commodity_engines():
+        return jsonify({'error': f'Unknown engine: {engine}', 'engines': commodity_engines()}), 400
+    horizon = get_horizon_arg()
+    if horizon is None:
+        return jsonify({'error': HORIZON_ERROR}), 400
+    
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -374,9 +449,10 @@ def import_commodity_timeline(commodity):
         conn.close()
         return jsonify({'error': f'Database error: {str(e)}'})
     
-    # Generate ML predictions for 2025Q3 and 2025Q4 using real data
+    # Generate ML predictions for the next `horizon` quarters using real data
     try:
-        ml_results = generate_ml_predictions(timeline_data, commodity)
+        ml_results = generate_ml_predictions(timeline_data, commodity, table='imports_commodities', engine=engine,
+                                             horizon=horizon)
         ml_predictions = ml_results['predictions']
         model_performance = ml_results['model_performance']
         models_used = ml_results['models_used']
@@ -399,6 +475,8 @@ def import_commodity_timeline(commodity):
             'model_performance': model_performance,
             'models_used': models_used,
             'ml_enabled': True,
+            'cached': ml_results['cached'],
+            'horizon': horizon,
             'data_source': 'Real database values'
         }
         
@@ -444,6 +522,41 @@ def import_commodity_timeline(commodity):
         'prediction_info': prediction_info
     })
 
+# Endpoint to get ML forecasts for every commodity of a table in one batch
+@app.route('/commodity_forecasts')
+def commodity_forecasts():
+    table = request.args.get('table', 'exports')
+    table_name = resolve_commodity_table(table)
+    if table_name is None:
+        return jsonify({'error': f'Unknown commodity table: {table}'}), 400
+    horizon = get_horizon_arg()
+    if horizon is None:
+        return jsonify({'error': HORIZON_ERROR}), 400
+    
+    try:
+        quarters, commodities, values = load_commodity_table(table_name)
+    except Exception as e:
+        print(f"Database error for commodity table {table_name}: {e}")
+        return jsonify({'error': f'Database error: {str(e)}'}), 500
+    
+    if not commodities:
+        return jsonify({'error': f'No data found in {table_name}'}), 404
+    
+    try:
+        forecasts = generate_batch_predictions(quarters, commodities, values, table=table_name,
+                                               periods=horizon)
+    except Exception as e:
+        print(f"Batch ML prediction error for {table_name}: {e}")
+        return jsonify({'error': f'Error generating forecasts: {str(e)}'}), 500
+    
+    return jsonify({
+        'table': table_name,
+        'quarters': quarters,
+        'horizon': horizon,
+        'method': 'Batch Polynomial Regression',
+        'forecasts': forecasts
+    })
+
 # Endpoint to get trade data
 @app.route('/trade20_25q2_data')
 def trade20_25q2_data():
@@ -696,8 +809,41 @@ def gdp_export_correlation():
         cursor.close()
         conn.close()
 
+@app.route('/gdp_forecast')
+def gdp_forecast():
+    """Forecast every GDP subsector, reconciled to the gdp_main sector forecasts"""
+    if 'username' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    engine = request.args.get('engine', DEFAULT_GDP_ENGINE)
+    if engine not in FORECAST_ENGINES:
+        return jsonify({'error': f'Unknown engine: {engine}', 'engines': list(FORECAST_ENGINES)}), 400
+    horizon = get_horizon_arg()
+    if horizon is None:
+        return jsonify({'error': HORIZON_ERROR}), 400
+    
+    try:
+        return jsonify(get_gdp_forecast(horizon, engine))
+    except Exception as e:
+        return jsonify({'error': f'Error forecasting GDP: {str(e)}'}), 500
+
 # Currency API Endpoints
 
+@app.route('/api/forecast_ledger/summary')
+def forecast_ledger_summary():
+    """Forecast error and compute cost per engine from the forecast ledger"""
+    if 'username' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    series_type = request.args.get('series_type')
+    if series_type not in (None, 'commodity', 'currency'):
+        return jsonify({'error': 'series_type must be commodity or currency'}), 400
+    
+    try:
+        return jsonify({'engines': ledger_summary(series_type), 'series_type': series_type or 'all'})
+    except Exception as e:
+        return jsonify({'error': f'Error reading forecast ledger: {str(e)}'}), 500
+
 @app.route('/api/currency/statistics')
 def currency_statistics():
     """Get currency statistics for a specific period"""
@@ -728,10 +874,18 @@ def currency_historical():
     currency = request.args.get('currency', 'USD')
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    max_points = request.args.get('max_points')
+    if max_points is not None:
+        try:
+            max_points = int(max_points)
+        except ValueError:
+            max_points = 0
+        if max_points < 3:
+            return jsonify({'error': 'max_points must be an integer of at least 3'}), 400
     
     try:
-        # Prepare chart data using the currency_analysis module
-        chart_data = prepare_chart_data(currency, start_date, end_date)
+        # Prepare chart data using the currency_analysis module (downsampled if max_points is given)
+        chart_data = prepare_chart_data(currency, start_date, end_date, max_points)
         
         if chart_data is None:
             return jsonify({'error': f'No data available for {currency}'}), 404
@@ -749,20 +903,23 @@ def currency_forecast():
     
     currency = request.args.get('currency', 'USD')
     include_trade = request.args.get('include_trade', 'false').lower() == 'true'
+    engine = request.args.get('engine') or CURRENCY_FORECAST_ENGINE
+    if engine not in currency_engines():
+        return jsonify({'error': f'Unknown engine: {engine}', 'engines': currency_engines()}), 400
+    forecast_format = get_forecast_format_args()
+    if forecast_format is None:
+        return jsonify({'error': FORMAT_ERROR}), 400
     
     try:
-        # Load currency data
-        df = load_currency_data(currency)
-        if df is None or df.empty:
+        # Cached per version of the currency file (precomputed for the default engine)
+        forecast_results = get_cached_forecast(currency, engine, include_trade)
+        if forecast_results is None:
             return jsonify({'error': f'No data available for {currency}'}), 404
         
-        # Generate forecast with optional trade adjustment
-        forecast_results = forecast_2026(df, currency, include_trade_adjustment=include_trade)
-        
         if 'error' in forecast_results:
             return jsonify(forecast_results), 500
         
-        return jsonify(forecast_results)
+        return jsonify(format_forecast(forecast_results, forecast_format))
     
     except Exception as e:
         return jsonify({'error': f'Error generating forecast: {str(e)}'}), 500
@@ -773,21 +930,86 @@ def all_currency_forecasts():
     if 'username' not in session:
         return jsonify({'error': 'Authentication required'}), 401
     
+    engine = request.args.get('engine') or CURRENCY_FORECAST_ENGINE
+    engines = currency_engines() + [JOINT_ENGINE]
+    if engine not in engines:
+        return jsonify({'error': f'Unknown engine: {engine}', 'engines': engines}), 400
+    forecast_format = get_forecast_format_args()
+    if forecast_format is None:
+        return jsonify({'error': FORMAT_ERROR}), 400
+    
     try:
-        all_forecasts = forecast_all_currencies()
+        # Precomputed forecasts exist for the default engine only
+        all_forecasts = None
+        if engine == CURRENCY_FORECAST_ENGINE:
+            all_forecasts = forecast_scheduler.get_all_currency_forecasts()
+        if all_forecasts is None:
+            all_forecasts = forecast_all_currencies(engine)
         
         if not all_forecasts:
             return jsonify({'error': 'No forecast data available'}), 404
         
+        for forecast in all_forecasts.values():
+            format_forecast(forecast, forecast_format)
+        
         return jsonify({
             'forecasts': all_forecasts,
             'currencies': list(all_forecasts.keys()),
+            'engine': engine,
             'forecast_year': 2026
         })
     
     except Exception as e:
         return jsonify({'error': f'Error generating forecasts: {str(e)}'}), 500
 
+@app.route('/api/currency/trade_scenarios')
+def currency_trade_scenarios():
+    """Percentile fan charts of 2026 rates for a distribution of trade balance shocks"""
+    if 'username' not in session:
+        return jsonify({'error': 'Authentication required'}), 401
+    
+    from currency_trade_integration import (
+        get_trade_scenario_fan, SHOCK_DISTRIBUTIONS, DEFAULT_SCENARIOS, MAX_SCENARIOS
+    )
+    
+    try:
+        shock_mean = float(request.args.get('shock_mean', 0))
+        shock_std = float(request.args.get('shock_std', 5))
+        n_scenarios = int(request.args.get('scenarios', DEFAULT_SCENARIOS))
+    except ValueError:
+        return jsonify({'error': 'shock_mean, shock_std and scenarios must be numbers'}), 400
+    distribution = request.args.get('distribution', 'normal')
+    if distribution not in SHOCK_DISTRIBUTIONS:
+        return jsonify({'error': f'Unknown distribution: {distribution}',
+                        'distributions': list(SHOCK_DISTRIBUTIONS)}), 400
+    if not (np.isfinite(shock_mean) and np.isfinite(shock_std)):
+        return jsonify({'error': 'shock_mean and shock_std must be finite'}), 400
+    if shock_std < 0 or not 1 <= n_scenarios <= MAX_SCENARIOS:
+        return jsonify({'error': f'shock_std must be >= 0 and scenarios between 1 and {MAX_SCENARIOS}'}), 400
+    
+    currencies = request.args.get('currencies')
+    codes = currencies.split(',') if currencies else list(AVAILABLE_CURRENCIES)
+    unknown = [code for code in codes if code not in AVAILABLE_CURRENCIES]
+    if unknown:
+        return jsonify({'error': f"Unknown currencies: {', '.join(unknown)}"}), 400
+    
+    try:
+        # Base forecasts, cached per version of each currency file
+        base_forecasts = {}
+        for code in codes:
+            forecast = get_cached_forecast(code)
+            if forecast and 'error' not in forecast:
+                base_forecasts[code] = forecast
+        
+        fan = get_trade_scenario_fan(base_forecasts, shock_mean, shock_std, distribution, n_scenarios)
+        if fan is None:
+            return jsonify({'error': 'No forecast data available'}), 404
+        
+        return jsonify(fan)
+    
+    except Exception as e:
+        return jsonify({'error': f'Error simulating trade scenarios: {str(e)}'}), 500
+
 @app.route('/api/currency/trade_impact')
 def currency_trade_impact():
     """Get trade balance impact analysis for currency"""
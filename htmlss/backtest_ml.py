@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Rolling-Origin Backtest Harness for CommodityPredictor
+Evaluates each engine (Prophet, linear, ensemble, fallback and the NumPy
+engines of forecast_engines) on every real commodity series and reports
+accuracy (MAE/MAPE) and prediction interval coverage next to fit/predict
+wall-clock time and peak memory, as JSON
+
+Usage:
+    python backtest_ml.py [--table exports|imports|all] [--horizon 2] [--min-train 12]
+                          [--engines prophet,linear,ensemble,fallback,holt_winters,...]
+                          [--from-dump] [--output report.json]
+
+Notes:
+    Peak memory is measured with tracemalloc in this process on the largest
+    training window of each series. Prophet fits run in the Prophet process
+    pool (and Stan in a CmdStan subprocess), so their memory is not included.
+"""
+
+import argparse
+import json
+import sys
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__))
+
+from ml_predictions import CommodityPredictor
+from forecast_engines import FORECAST_ENGINES
+from commodity_data import (
+    COMMODITY_TABLES,
+    load_commodity_table,
+    load_commodity_table_from_dump,
+    series_records
+)
+
+ENGINES = ('prophet', 'linear', 'ensemble', 'fallback') + tuple(FORECAST_ENGINES)
+
+
+def fit_engine(engine, train_records):
+    """
+    Fit a CommodityPredictor restricted to one engine
+
+    'fallback' fits nothing, so predict_future uses its trend extrapolation.
+    """
+    predictor = CommodityPredictor()
+    predictor.fit(train_records, engine=None if engine == 'fallback' else engine)
+    return predictor
+
+
+def run_engine(engine, train_records, horizon):
+    """
+    Fit and predict with one engine, timing both steps
+
+    Returns:
+        Tuple of (predictions array, (lower, upper) bound arrays, fit seconds,
+        predict seconds, prophet_failed)
+    """
+    start = time.perf_counter()
+    predictor = fit_engine(engine, train_records)
+    fitted = time.perf_counter()
+    predictions = predictor.predict_future(periods=horizon)
+    done = time.perf_counter()
+
+    values = np.array([p['predicted_value'] for p in predictions], dtype=float)
+    bounds = (np.array([p['lower_bound'] for p in predictions], dtype=float),
+              np.array([p['upper_bound'] for p in predictions], dtype=float))
+    prophet_failed = engine in ('prophet', 'ensemble') and predictor.prophet_model is None
+    return values, bounds, fitted - start, done - fitted, prophet_failed
+
+
+def measure_peak_memory(engine, train_records, horizon):
+    """Peak Python heap allocation (bytes) for one fit + predict"""
+    tracemalloc.start()
+    try:
+        predictor = fit_engine(engine, train_records)
+        predictor.predict_future(periods=horizon)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def backtest_series(records, engines=ENGINES, horizon=2, min_train=12, track_memory=True):
+    """
+    Rolling-origin evaluation of one series
+
+    For each origin t (min_train <= t <= n - horizon) every engine is fitted on
+    the first t quarters and scored on the next `horizon` quarters.
+
+    Args:
+        records: Timeline records ({'quarter', 'value'}) in chronological order
+        engines: Engines to evaluate
+        horizon: Forecast horizon in quarters
+        min_train: Size of the first training window
+        track_memory: Measure peak memory on the largest training window
+
+    Returns:
+        Dictionary keyed by engine with per-origin forecasts, actuals and timings
+    """
+    n = len(records)
+    results = {}
+    for engine in engines:
+        origins = []
+        for t in range(min_train, n - horizon + 1):
+            predicted, (lower, upper), fit_s, predict_s, prophet_failed = run_engine(
+                engine, records[:t], horizon)
+            origins.append({
+                'origin': records[t - 1]['quarter'],
+                'predicted': predicted.tolist(),
+                'lower': lower.tolist(),
+                'upper': upper.tolist(),
+                'actual': [float(r['value']) for r in records[t:t + horizon]],
+                'fit_seconds': fit_s,
+                'predict_seconds': predict_s,
+                'prophet_failed': prophet_failed
+            })
+
+        results[engine] = {
+            'origins': origins,
+            'peak_memory_bytes': (
+                measure_peak_memory(engine, records[:n - horizon], horizon)
+                if track_memory and origins else None
+            )
+        }
+    return results
+
+
+def summarize_engine(engine_result):
+    """Aggregate accuracy and cost metrics over all origins of one engine"""
+    origins = engine_result['origins']
+    if not origins:
+        return None
+
+    predicted = np.array([o['predicted'] for o in origins])
+    actual = np.array([o['actual'] for o in origins])
+    errors = np.abs(predicted - actual)
+    covered = (actual >= np.array([o['lower'] for o in origins])) & (actual <= np.array([o['upper'] for o in origins]))
+    nonzero = actual != 0
+    fit_ms = np.array([o['fit_seconds'] for o in origins]) * 1000
+    predict_ms = np.array([o['predict_seconds'] for o in origins]) * 1000
+
+    return {
+        'origins': len(origins),
+        'mae': float(errors.mean()),
+        'mae_by_step': errors.mean(axis=0).tolist(),
+        'mape': float((errors[nonzero] / np.abs(actual[nonzero])).mean() * 100) if nonzero.any() else None,
+        'coverage': float(covered.mean()),
+        'coverage_by_step': covered.mean(axis=0).tolist(),
+        'fit_ms_mean': float(fit_ms.mean()),
+        'fit_ms_p95': float(np.percentile(fit_ms, 95)),
+        'predict_ms_mean': float(predict_ms.mean()),
+        'predict_ms_p95': float(np.percentile(predict_ms, 95)),
+        'peak_memory_kb': (
+            engine_result['peak_memory_bytes'] / 1024
+            if engine_result['peak_memory_bytes'] is not None else None
+        ),
+        'prophet_failures': int(sum(o['prophet_failed'] for o in origins))
+    }
+
+
+def load_series(tables, from_dump=False):
+    """Yield (table_name, commodity, records) for every commodity series"""
+    loader = load_commodity_table_from_dump if from_dump else load_commodity_table
+    for table_name in tables:
+        quarters, commodities, values = loader(table_name)
+        for commodity, row in zip(commodities, values):
+            yield table_name, commodity, series_records(quarters, row)
+
+
+def run_backtest(tables, engines=ENGINES, horizon=2, min_train=12, from_dump=False, track_memory=True):
+    """
+    Backtest every commodity series of the given tables
+
+    Returns:
+        Report dictionary with per-series and per-engine summaries
+    """
+    report = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'settings': {
+            'tables': list(tables),
+            'engines': list(engines),
+            'horizon': horizon,
+            'min_train': min_train
+        },
+        'series': [],
+        'engines': {}
+    }
+
+    per_engine = {engine: [] for engine in engines}
+    for table_name, commodity, records in load_series(tables, from_dump):
+        if len(records) < min_train + horizon:
+            print(f"Skipping {commodity}: only {len(records)} quarters", file=sys.stderr)
+            continue
+
+        print(f"Backtesting {table_name} / {commodity}...", file=sys.stderr)
+        results = backtest_series(records, engines, horizon, min_train, track_memory)
+        summaries = {engine: summarize_engine(result) for engine, result in results.items()}
+        report['series'].append({
+            'table': table_name,
+            'commodity': commodity,
+            'quarters': len(records),
+            'engines': summaries
+        })
+        for engine, summary in summaries.items():
+            if summary:
+                per_engine[engine].append(summary)
+
+    # Overall summary: average of per-series metrics
+    for engine, summaries in per_engine.items():
+        if not summaries:
+            continue
+        mapes = [s['mape'] for s in summaries if s['mape'] is not None]
+        peaks = [s['peak_memory_kb'] for s in summaries if s['peak_memory_kb'] is not None]
+        report['engines'][engine] = {
+            'series': len(summaries),
+            'mean_mae': float(np.mean([s['mae'] for s in summaries])),
+            'mean_mape': float(np.mean(mapes)) if mapes else None,
+            'mean_coverage': float(np.mean([s['coverage'] for s in summaries])),
+            'coverage_by_step': np.mean([s['coverage_by_step'] for s in summaries], axis=0).tolist(),
+            'fit_ms_mean': float(np.mean([s['fit_ms_mean'] for s in summaries])),
+            'fit_ms_p95': float(np.max([s['fit_ms_p95'] for s in summaries])),
+            'predict_ms_mean': float(np.mean([s['predict_ms_mean'] for s in summaries])),
+            'peak_memory_kb_max': float(np.max(peaks)) if peaks else None,
+            'prophet_failures': int(sum(s['prophet_failures'] for s in summaries))
+        }
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Rolling-origin backtest of CommodityPredictor engines')
+    parser.add_argument('--table', choices=['exports', 'imports', 'all'], default='all')
+    parser.add_argument('--engines', default=','.join(ENGINES),
+                        help='Comma-separated engines (default: %(default)s)')
+    parser.add_argument('--horizon', type=int, default=2)
+    parser.add_argument('--min-train', type=int, default=12)
+    parser.add_argument('--from-dump', action='store_true',
+                        help='Read series from bigdata.sql instead of the database')
+    parser.add_argument('--no-memory', action='store_true', help='Skip peak memory measurement')
+    parser.add_argument('--output', help='Write the JSON report to this file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    engines = [e.strip() for e in args.engines.split(',') if e.strip()]
+    unknown = set(engines) - set(ENGINES)
+    if unknown:
+        parser.error(f"Unknown engines: {', '.join(sorted(unknown))}")
+
+    tables = list(COMMODITY_TABLES.values()) if args.table == 'all' else [COMMODITY_TABLES[args.table]]
+    report = run_backtest(tables, engines, args.horizon, args.min_train,
+                          from_dump=args.from_dump, track_memory=not args.no_memory)
+
+    payload = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        print(f"Report written to {args.output}", file=sys.stderr)
+    else:
+        print(payload)
+
+
+if __name__ == '__main__':
+    main()
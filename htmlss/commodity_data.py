@@ -0,0 +1,121 @@
+"""
+Commodity Data Module
+Loads quarterly export/import commodity tables as aligned numeric matrices
+"""
+
+import os
+import re
+
+import numpy as np
+from db import get_db_connection
+
+# MySQL dump shipped with the repository (used by offline jobs)
+SQL_DUMP_PATH = os.path.join(os.path.dirname(__file__), 'bigdata.sql')
+
+# Public table aliases accepted by the API -> database table names
+COMMODITY_TABLES = {
+    'exports': 'export_commodities',
+    'imports': 'imports_commodities'
+}
+
+
+def resolve_commodity_table(table):
+    """
+    Map an API table name to the database table
+
+    Args:
+        table: 'exports', 'imports' or a full table name
+
+    Returns:
+        Database table name, or None if the table is not a commodity table
+    """
+    if table in COMMODITY_TABLES:
+        return COMMODITY_TABLES[table]
+    if table in COMMODITY_TABLES.values():
+        return table
+    return None
+
+
+def load_commodity_table(table_name):
+    """
+    Load every commodity row of a quarterly commodity table
+
+    Args:
+        table_name: 'export_commodities' or 'imports_commodities'
+
+    Returns:
+        Tuple of (quarters, commodities, values) where values is a
+        commodities x quarters float array in US dollars (NaN for missing)
+    """
+    if table_name not in COMMODITY_TABLES.values():
+        raise ValueError(f"Unknown commodity table: {table_name}")
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT * FROM {table_name}")
+        rows = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+    finally:
+        cursor.close()
+        conn.close()
+
+    quarters = [col for col in columns if col != 'period']
+    quarter_idx = [columns.index(q) for q in quarters]
+    period_idx = columns.index('period')
+    rows = [row for row in rows if row[period_idx]]
+
+    commodities = [row[period_idx] for row in rows]
+    values = np.full((len(rows), len(quarters)), np.nan)
+    for i, row in enumerate(rows):
+        for j, col_idx in enumerate(quarter_idx):
+            if row[col_idx] is not None:
+                # Data is stored in millions; same conversion as the timeline endpoints
+                values[i, j] = int(float(row[col_idx]) * 1000000)
+
+    return quarters, commodities, values
+
+
+def load_commodity_table_from_dump(table_name, sql_path=SQL_DUMP_PATH):
+    """
+    Same as load_commodity_table but reads the MySQL dump instead of the database,
+    so offline jobs (backtests, tuning) can run without a database server
+    """
+    if table_name not in COMMODITY_TABLES.values():
+        raise ValueError(f"Unknown commodity table: {table_name}")
+
+    with open(sql_path, 'r', encoding='utf-8') as f:
+        sql = f.read()
+
+    create = re.search(r"CREATE TABLE `%s` \((.*?)\n\)" % table_name, sql, re.S)
+    insert = re.search(r"INSERT INTO `%s` VALUES (.*);" % table_name, sql)
+    if not create or not insert:
+        raise ValueError(f"Table {table_name} not found in {sql_path}")
+
+    columns = re.findall(r"^\s*`([^`]+)`", create.group(1), re.M)
+    quarters = [col for col in columns if col != 'period']
+
+    commodities = []
+    rows = []
+    for name, numbers in re.findall(r"\('((?:[^'\\]|\\.)*)',([^()]*)\)", insert.group(1)):
+        if not name:
+            continue
+        commodities.append(name.replace("\\'", "'"))
+        rows.append([
+            np.nan if number == 'NULL' else int(float(number) * 1000000)
+            for number in numbers.split(',')
+        ])
+
+    return quarters, commodities, np.array(rows, dtype=float).reshape(len(rows), len(quarters))
+
+
+def series_records(quarters, row):
+    """
+    Convert one row of load_commodity_table values to the timeline format
+    used by the commodity endpoints (missing quarters are skipped)
+    """
+    return [
+        {'quarter': quarter, 'value': int(value), 'is_actual': True}
+        for quarter, value in zip(quarters, row)
+        if not np.isnan(value)
+    ]
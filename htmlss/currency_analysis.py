@@ -4,11 +4,15 @@ Loads and processes exchange rate data from CSV files
 Provides statistical analysis and data preparation for visualization
 """
 
+import numpy as np
 import pandas as pd
 import os
+import threading
 from datetime import datetime, timedelta
 import json
 
+from currency_columns import compiled_columns
+
 # Currency data directory
 CURRENCY_DIR = os.path.join(os.path.dirname(__file__), 'currency')
 
@@ -20,42 +24,256 @@ AVAILABLE_CURRENCIES = {
     'TSH': 'Tanzanian Shilling'
 }
 
-def load_currency_data(currency_code='USD'):
+# Rate columns of the currency files
+RATE_COLUMNS = ['buying_rate', 'average_rate', 'selling_rate']
+
+def get_currency_file_path(currency_code):
+    """Path of the CSV file holding a currency's exchange rates"""
+    return os.path.join(CURRENCY_DIR, f'{currency_code.lower()}_table.csv')
+
+
+def currency_file_fingerprint(currency_code):
+    """Identify the current version of a currency CSV by its mtime and size (None if missing)"""
+    try:
+        stat = os.stat(get_currency_file_path(currency_code))
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def parse_currency_csv(file_path):
     """
-    Load exchange rate data from CSV file
+    Parse a currency CSV file
     
     Args:
-        currency_code: Currency code (USD, EUR, CNY, TSH)
+        file_path: Path of the CSV file
     
     Returns:
-        DataFrame with exchange rate data
+        DataFrame sorted by post_date with float rate columns
     """
-    try:
-        file_path = os.path.join(CURRENCY_DIR, f'{currency_code.lower()}_table.csv')
+    df = pd.read_csv(file_path)
+    
+    # Convert post_date to datetime
+    df['post_date'] = pd.to_datetime(df['post_date'], format='%m/%d/%Y')
+    
+    # Convert rates to float (remove commas if present)
+    for col in RATE_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.replace(',', '').astype(float)
+    
+    # Sort by date
+    return df.sort_values('post_date', kind='stable').reset_index(drop=True)
+
+
+# Windows up to this many rows compute their standard deviation directly
+DIRECT_STD_ROWS = 256
+
+
+class WindowStatistics:
+    """
+    Constant-time statistics over any row range [lo, hi) of a series
+    
+    Prefix sums of the values and of their squares (shifted by the first value
+    to limit cancellation) give the mean and sample standard deviation of a
+    range (short ranges compute the latter directly); sparse tables, whose
+    level k holds the minimum and maximum of the 2**k values starting at each
+    position, give its extremes from two overlapping lookups.
+    """
+    
+    def __init__(self, values):
+        values = np.asarray(values, dtype=float)
+        self.shift = float(values[0]) if len(values) else 0.0
+        centered = values - self.shift
+        self.sums = np.concatenate([[0.0], np.cumsum(centered)])
+        self.squares = np.concatenate([[0.0], np.cumsum(centered * centered)])
         
-        if not os.path.exists(file_path):
-            print(f"Currency file not found: {file_path}")
+        self.minima = [values]
+        self.maxima = [values]
+        width = 1
+        while 2 * width <= len(values):
+            self.minima.append(np.minimum(self.minima[-1][:-width], self.minima[-1][width:]))
+            self.maxima.append(np.maximum(self.maxima[-1][:-width], self.maxima[-1][width:]))
+            width *= 2
+    
+    def mean(self, lo, hi):
+        if hi <= lo:
+            return float('nan')
+        return float((self.sums[hi] - self.sums[lo]) / (hi - lo) + self.shift)
+    
+    def std(self, lo, hi):
+        """Sample standard deviation (NaN for fewer than two values, like pandas)"""
+        n = hi - lo
+        if n < 2:
+            return float('nan')
+        if n <= DIRECT_STD_ROWS:
+            # Prefix sums lose precision when the spread is tiny next to the level
+            return float(np.std(self.minima[0][lo:hi], ddof=1))
+        total = self.sums[hi] - self.sums[lo]
+        variance = (self.squares[hi] - self.squares[lo] - total * total / n) / (n - 1)
+        return float(np.sqrt(max(variance, 0.0)))
+    
+    def _level(self, lo, hi):
+        level = int(hi - lo).bit_length() - 1
+        return level, hi - (1 << level)
+    
+    def min(self, lo, hi):
+        level, start = self._level(lo, hi)
+        return float(min(self.minima[level][lo], self.minima[level][start]))
+    
+    def max(self, lo, hi):
+        level, start = self._level(lo, hi)
+        return float(max(self.maxima[level][lo], self.maxima[level][start]))
+
+
+class CurrencyStore:
+    """
+    Parsed currency files shared by every caller in the process
+    
+    Each file is loaded once and reloaded only when its mtime or size
+    changes. Files are loaded from their memory-mapped compiled columns (see
+    currency_columns), compiling them first if needed, and parsed in-process
+    only when the compiled cache is unavailable. The frames and arrays handed
+    out are shared and must not be modified; load_currency_data returns a
+    private copy for callers that need one.
+    """
+    
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+    
+    def _load_lock(self, currency_code):
+        with self._lock:
+            return self._load_locks.setdefault(currency_code, threading.Lock())
+    
+    def _entry(self, currency_code):
+        fingerprint = currency_file_fingerprint(currency_code)
+        if fingerprint is None:
+            print(f"Currency file not found: {get_currency_file_path(currency_code)}")
+            with self._lock:
+                self._entries.pop(currency_code, None)
             return None
         
-        # Load CSV data
-        df = pd.read_csv(file_path)
-        
-        # Convert post_date to datetime
-        df['post_date'] = pd.to_datetime(df['post_date'], format='%m/%d/%Y')
-        
-        # Convert rates to float (remove commas if present)
-        for col in ['buying_rate', 'average_rate', 'selling_rate']:
-            if col in df.columns:
-                df[col] = df[col].astype(str).str.replace(',', '').astype(float)
+        entry = self._entries.get(currency_code)
+        if entry is not None and entry['fingerprint'] == fingerprint:
+            return entry
         
-        # Sort by date
-        df = df.sort_values('post_date')
+        # One thread loads; concurrent callers for the same file wait for it
+        with self._load_lock(currency_code):
+            entry = self._entries.get(currency_code)
+            if entry is not None and entry['fingerprint'] == fingerprint:
+                return entry
+            file_path = get_currency_file_path(currency_code)
+            try:
+                columns = compiled_columns(currency_code, fingerprint, lambda: parse_currency_csv(file_path))
+                if columns is not None:
+                    # Zero-copy frame over the read-only mapped columns
+                    frame = pd.DataFrame(columns, copy=False)
+                else:
+                    frame = parse_currency_csv(file_path)
+            except Exception as e:
+                print(f"Error loading currency data for {currency_code}: {e}")
+                return None
+            
+            arrays = {}
+            for col in ['post_date'] + RATE_COLUMNS:
+                if col in frame.columns:
+                    values = columns[col] if columns is not None else frame[col].to_numpy(copy=True)
+                    values.flags.writeable = False
+                    arrays[col] = values
+            entry = {'fingerprint': fingerprint, 'frame': frame, 'arrays': arrays}
+            with self._lock:
+                self._entries[currency_code] = entry
+            return entry
+    
+    def frame(self, currency_code):
+        """Shared (read-only) DataFrame of a currency, or None if unavailable"""
+        entry = self._entry(currency_code)
+        return entry['frame'] if entry is not None else None
+    
+    def arrays(self, currency_code):
+        """Read-only NumPy arrays (post_date and rate columns) of a currency, or None"""
+        entry = self._entry(currency_code)
+        return entry['arrays'] if entry is not None else None
+    
+    def window_statistics(self, currency_code):
+        """
+        Arrays of a currency with window statistics of its average rate
         
-        return df
+        Returns:
+            Tuple of (arrays, dictionary with WindowStatistics of 'average_rate'
+            and of its day-to-day 'returns'), or None if unavailable. The
+            statistics are built on first use after each load.
+        """
+        entry = self._entry(currency_code)
+        if entry is None:
+            return None
+        if 'statistics' not in entry:
+            with self._load_lock(currency_code):
+                if 'statistics' not in entry:
+                    rates = entry['arrays']['average_rate']
+                    entry['statistics'] = {
+                        'average_rate': WindowStatistics(rates),
+                        'returns': WindowStatistics(rates[1:] / rates[:-1] - 1)
+                    }
+        return entry['arrays'], entry['statistics']
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+currency_store = CurrencyStore()
+
+
+def load_currency_data(currency_code='USD'):
+    """
+    Load exchange rate data from CSV file
     
-    except Exception as e:
-        print(f"Error loading currency data for {currency_code}: {e}")
-        return None
+    Args:
+        currency_code: Currency code (USD, EUR, CNY, TSH)
+    
+    Returns:
+        DataFrame with exchange rate data (a copy the caller may modify)
+    """
+    df = currency_store.frame(currency_code)
+    return df.copy() if df is not None else None
+
+
+def _datetime64(date):
+    return pd.Timestamp(date).to_datetime64()
+
+
+def date_position(df, date):
+    """
+    Position of the first row of a date-sorted currency frame on or after date
+    
+    Args:
+        df: Currency DataFrame sorted by post_date
+        date: Date (string, datetime or Timestamp)
+    
+    Returns:
+        Row position found by binary search (len(df) if every row is earlier)
+    """
+    return int(np.searchsorted(df['post_date'].to_numpy(), _datetime64(date), side='left'))
+
+
+def date_window(df, start_date=None, end_date=None):
+    """
+    Rows of a date-sorted currency frame within [start_date, end_date]
+    
+    Args:
+        df: Currency DataFrame sorted by post_date
+        start_date: First date included (None for no lower bound)
+        end_date: Last date included (None for no upper bound)
+    
+    Returns:
+        Zero-copy slice of df found by binary search (a view; do not modify)
+    """
+    dates = df['post_date'].to_numpy()
+    lo = np.searchsorted(dates, _datetime64(start_date), side='left') if start_date is not None else 0
+    hi = np.searchsorted(dates, _datetime64(end_date), side='right') if end_date is not None else len(dates)
+    return df.iloc[lo:max(lo, hi)]
 
 
 def get_currency_data_by_period(currency_code='USD', start_date=None, end_date=None):
@@ -68,25 +286,14 @@ def get_currency_data_by_period(currency_code='USD', start_date=None, end_date=N
         end_date: End date (string or datetime)
     
     Returns:
-        Filtered DataFrame
+        Filtered DataFrame (a read-only view of the shared data)
     """
-    df = load_currency_data(currency_code)
+    df = currency_store.frame(currency_code)
     
     if df is None:
         return None
     
-    # Filter by date range
-    if start_date:
-        if isinstance(start_date, str):
-            start_date = pd.to_datetime(start_date)
-        df = df[df['post_date'] >= start_date]
-    
-    if end_date:
-        if isinstance(end_date, str):
-            end_date = pd.to_datetime(end_date)
-        df = df[df['post_date'] <= end_date]
-    
-    return df
+    return date_window(df, start_date or None, end_date or None)
 
 
 def calculate_currency_statistics(currency_code='USD', period_days=365):
@@ -100,17 +307,22 @@ def calculate_currency_statistics(currency_code='USD', period_days=365):
     Returns:
         Dictionary with statistics
     """
-    df = load_currency_data(currency_code)
+    loaded = currency_store.window_statistics(currency_code)
     
-    if df is None or df.empty:
+    if loaded is None or len(loaded[0]['post_date']) == 0:
         return None
+    arrays, windows = loaded
+    rates = arrays['average_rate']
+    average = windows['average_rate']
     
-    # Get recent period
-    end_date = df['post_date'].max()
+    # Get recent period: rows [lo, hi)
+    dates = arrays['post_date']
+    end_date = pd.Timestamp(dates[-1])
     start_date = end_date - timedelta(days=period_days)
-    period_df = df[df['post_date'] >= start_date]
+    lo = int(np.searchsorted(dates, start_date.to_datetime64(), side='left'))
+    hi = len(dates)
     
-    if period_df.empty:
+    if lo >= hi:
         return None
     
     stats = {
@@ -121,28 +333,28 @@ def calculate_currency_statistics(currency_code='USD', period_days=365):
         'end_date': end_date.strftime('%Y-%m-%d'),
         
         # Current rates
-        'current_buying': float(period_df['buying_rate'].iloc[-1]),
-        'current_average': float(period_df['average_rate'].iloc[-1]),
-        'current_selling': float(period_df['selling_rate'].iloc[-1]),
+        'current_buying': float(arrays['buying_rate'][-1]),
+        'current_average': float(rates[-1]),
+        'current_selling': float(arrays['selling_rate'][-1]),
         
         # Period statistics
-        'min_rate': float(period_df['average_rate'].min()),
-        'max_rate': float(period_df['average_rate'].max()),
-        'mean_rate': float(period_df['average_rate'].mean()),
-        'std_rate': float(period_df['average_rate'].std()),
+        'min_rate': average.min(lo, hi),
+        'max_rate': average.max(lo, hi),
+        'mean_rate': average.mean(lo, hi),
+        'std_rate': average.std(lo, hi),
         
         # Changes
-        'period_change': float(period_df['average_rate'].iloc[-1] - period_df['average_rate'].iloc[0]),
-        'period_change_percent': float(((period_df['average_rate'].iloc[-1] - period_df['average_rate'].iloc[0]) / period_df['average_rate'].iloc[0]) * 100),
+        'period_change': float(rates[-1] - rates[lo]),
+        'period_change_percent': float(((rates[-1] - rates[lo]) / rates[lo]) * 100),
         
-        # Volatility
-        'volatility': float(period_df['average_rate'].pct_change().std() * 100),
+        # Volatility (returns[i] is the change from row i to row i + 1)
+        'volatility': windows['returns'].std(lo, hi - 1) * 100,
     }
     
     # Recent trend (last 30 days vs previous 30 days)
-    if len(period_df) > 60:
-        recent_30 = period_df.tail(30)['average_rate'].mean()
-        previous_30 = period_df.tail(60).head(30)['average_rate'].mean()
+    if hi - lo > 60:
+        recent_30 = average.mean(hi - 30, hi)
+        previous_30 = average.mean(hi - 60, hi - 30)
         stats['trend'] = 'appreciating' if recent_30 < previous_30 else 'depreciating'
         stats['trend_strength'] = float(abs((recent_30 - previous_30) / previous_30) * 100)
     else:
@@ -175,7 +387,53 @@ def get_multi_currency_comparison(period_days=365):
     return comparison
 
 
-def prepare_chart_data(currency_code='USD', start_date=None, end_date=None):
+def lttb_indices(x, y, max_points):
+    """
+    Largest-Triangle-Three-Buckets downsampling
+    
+    Keeps the first and last points and, from each of max_points - 2 equal
+    buckets in between, the point forming the largest triangle with the point
+    kept from the previous bucket and the average of the next bucket, so
+    peaks and troughs survive. Bucket averages are computed with NumPy; the
+    selection depends on the previous bucket's choice, so it is one pass over
+    plain floats (per-bucket NumPy calls cost more than the few points in each).
+    
+    Args:
+        x: Increasing x values (array)
+        y: Values (array)
+        max_points: Number of points to keep (at least 3)
+    
+    Returns:
+        Sorted positions of the kept points (all positions if len(y) <= max_points)
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    
+    # Bucket b holds positions [edges[b], edges[b + 1])
+    edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+    counts = np.diff(edges)
+    # Average of every bucket, followed by the last point
+    next_x = np.append(np.add.reduceat(x[:n - 1], edges[:-1]) / counts, x[-1]).tolist()
+    next_y = np.append(np.add.reduceat(y[:n - 1], edges[:-1]) / counts, y[-1]).tolist()
+    x, y, edges = np.asarray(x, dtype=float).tolist(), np.asarray(y, dtype=float).tolist(), edges.tolist()
+    
+    selected = [0]
+    a = 0
+    for b in range(max_points - 2):
+        ax, ay = x[a], y[a]
+        dx, dy = ax - next_x[b + 1], next_y[b + 1] - ay
+        best = -1.0
+        for i in range(edges[b], edges[b + 1]):
+            area = abs(dx * (y[i] - ay) - (ax - x[i]) * dy)
+            if area > best:
+                best, a = area, i
+        selected.append(a)
+    selected.append(n - 1)
+    return np.array(selected)
+
+
+def prepare_chart_data(currency_code='USD', start_date=None, end_date=None, max_points=None):
     """
     Prepare data for Chart.js visualization
     
@@ -183,6 +441,8 @@ def prepare_chart_data(currency_code='USD', start_date=None, end_date=None):
         currency_code: Currency code
         start_date: Start date
         end_date: End date
+        max_points: Downsample to at most this many points (at least 3) with
+            LTTB on the average rate; None returns every point
     
     Returns:
         Dictionary with chart-ready data
@@ -192,6 +452,12 @@ def prepare_chart_data(currency_code='USD', start_date=None, end_date=None):
     if df is None or df.empty:
         return None
     
+    total_points = len(df)
+    if max_points is not None and total_points > max_points:
+        # Days since the first point as x, so spacing follows the calendar
+        days = (df['post_date'].to_numpy() - df['post_date'].iloc[0].to_datetime64()) / np.timedelta64(1, 'D')
+        df = df.iloc[lttb_indices(days, df['average_rate'].to_numpy(), max_points)]
+    
     # Convert to chart format
     chart_data = {
         'labels': df['post_date'].dt.strftime('%Y-%m-%d').tolist(),
@@ -199,7 +465,9 @@ def prepare_chart_data(currency_code='USD', start_date=None, end_date=None):
         'average_rate': df['average_rate'].tolist(),
         'selling_rate': df['selling_rate'].tolist(),
         'currency_code': currency_code,
-        'currency_name': AVAILABLE_CURRENCIES.get(currency_code, currency_code)
+        'currency_name': AVAILABLE_CURRENCIES.get(currency_code, currency_code),
+        'total_points': total_points,
+        'downsampled': len(df) < total_points
     }
     
     return chart_data
@@ -216,28 +484,28 @@ def get_currency_spread_analysis(currency_code='USD', period_days=30):
     Returns:
         Dictionary with spread analysis
     """
-    df = load_currency_data(currency_code)
+    df = currency_store.frame(currency_code)
     
     if df is None or df.empty:
         return None
     
     # Get recent period
-    end_date = df['post_date'].max()
+    end_date = df['post_date'].iloc[-1]
     start_date = end_date - timedelta(days=period_days)
-    period_df = df[df['post_date'] >= start_date]
+    period_df = date_window(df, start_date)
     
     # Calculate spread
-    period_df['spread'] = period_df['selling_rate'] - period_df['buying_rate']
-    period_df['spread_percent'] = (period_df['spread'] / period_df['average_rate']) * 100
+    spread = period_df['selling_rate'] - period_df['buying_rate']
+    spread_percent = (spread / period_df['average_rate']) * 100
     
     analysis = {
         'currency_code': currency_code,
-        'average_spread': float(period_df['spread'].mean()),
-        'average_spread_percent': float(period_df['spread_percent'].mean()),
-        'min_spread': float(period_df['spread'].min()),
-        'max_spread': float(period_df['spread'].max()),
-        'current_spread': float(period_df['spread'].iloc[-1]),
-        'spread_volatility': float(period_df['spread'].std())
+        'average_spread': float(spread.mean()),
+        'average_spread_percent': float(spread_percent.mean()),
+        'min_spread': float(spread.min()),
+        'max_spread': float(spread.max()),
+        'current_spread': float(spread.iloc[-1]),
+        'spread_volatility': float(spread.std())
     }
     
     return analysis
@@ -253,29 +521,29 @@ def get_year_over_year_comparison(currency_code='USD'):
     Returns:
         Dictionary with YoY comparison
     """
-    df = load_currency_data(currency_code)
+    df = currency_store.frame(currency_code)
     
     if df is None or df.empty:
         return None
     
-    current_date = df['post_date'].max()
+    current_date = df['post_date'].iloc[-1]
     one_year_ago = current_date - timedelta(days=365)
     
-    # Get rates
-    current_rate = df[df['post_date'] == current_date]['average_rate'].iloc[0] if len(df[df['post_date'] == current_date]) > 0 else df['average_rate'].iloc[-1]
+    # Get rates (first posting of the latest date)
+    current_rate = df['average_rate'].iloc[date_position(df, current_date)]
     
     # Find closest date to one year ago
-    year_ago_df = df[df['post_date'] >= one_year_ago].head(1)
-    if year_ago_df.empty:
+    year_ago = date_position(df, one_year_ago)
+    if year_ago == len(df):
         return None
     
-    year_ago_rate = year_ago_df['average_rate'].iloc[0]
+    year_ago_rate = df['average_rate'].iloc[year_ago]
     
     comparison = {
         'currency_code': currency_code,
         'current_date': current_date.strftime('%Y-%m-%d'),
         'current_rate': float(current_rate),
-        'year_ago_date': year_ago_df['post_date'].iloc[0].strftime('%Y-%m-%d'),
+        'year_ago_date': df['post_date'].iloc[year_ago].strftime('%Y-%m-%d'),
         'year_ago_rate': float(year_ago_rate),
         'yoy_change': float(current_rate - year_ago_rate),
         'yoy_change_percent': float(((current_rate - year_ago_rate) / year_ago_rate) * 100)
@@ -294,11 +562,11 @@ def get_all_available_currencies():
     currencies = []
     
     for code, name in AVAILABLE_CURRENCIES.items():
-        file_path = os.path.join(CURRENCY_DIR, f'{code.lower()}_table.csv')
+        file_path = get_currency_file_path(code)
         available = os.path.exists(file_path)
         
         if available:
-            df = load_currency_data(code)
+            df = currency_store.frame(code)
             if df is not None and not df.empty:
                 currencies.append({
                     'code': code,
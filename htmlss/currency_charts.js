@@ -109,7 +109,9 @@ function loadStatistics(currency, startDate, endDate) {
  * Load and display historical exchange rate chart
  */
 function loadHistoricalChart(currency, startDate, endDate) {
-    fetch(`/api/currency/historical?currency=${currency}&start_date=${startDate}&end_date=${endDate}`)
+    // About one point per pixel is all the chart can show
+    const maxPoints = Math.max(500, document.getElementById('historicalChart').clientWidth);
+    fetch(`/api/currency/historical?currency=${currency}&start_date=${startDate}&end_date=${endDate}&max_points=${maxPoints}`)
         .then(response => response.json())
         .then(data => {
             if (data.error) {
@@ -226,7 +228,9 @@ function loadHistoricalChart(currency, startDate, endDate) {
  * Load and display spread analysis chart
  */
 function loadSpreadChart(currency, startDate, endDate) {
-    fetch(`/api/currency/historical?currency=${currency}&start_date=${startDate}&end_date=${endDate}`)
+    // About one point per pixel is all the chart can show
+    const maxPoints = Math.max(500, document.getElementById('spreadChart').clientWidth);
+    fetch(`/api/currency/historical?currency=${currency}&start_date=${startDate}&end_date=${endDate}&max_points=${maxPoints}`)
         .then(response => response.json())
         .then(data => {
             if (data.error) {
@@ -351,9 +355,12 @@ function loadForecast(currency) {
         loadForecast(currency);
     });
 
-    fetch(`/api/currency/forecast?currency=${currency}&include_trade=${includeTrade}`)
+    fetch(`/api/currency/forecast?currency=${currency}&include_trade=${includeTrade}&encoding=compact&precision=2`)
         .then(response => response.json())
         .then(data => {
+            if (data.daily_forecast) {
+                data.daily_forecast = decodeDailyForecast(data.daily_forecast);
+            }
             if (data.error) {
                 forecastSection.innerHTML = `
                     <div class="forecast-header">🔮 2026 Exchange Rate Forecast</div>
@@ -434,6 +441,30 @@ function loadForecast(currency) {
         });
 }
 
+/**
+ * Expand a compact daily_forecast (start + step + count) into its date list
+ */
+function decodeDailyForecast(dailyForecast) {
+    if (dailyForecast.encoding !== 'compact') {
+        return dailyForecast;
+    }
+
+    const dates = [];
+    const start = new Date(`${dailyForecast.start}T00:00:00Z`);
+    const stepSize = parseInt(dailyForecast.step, 10);
+    const stepUnit = dailyForecast.step.slice(-1);
+    for (let i = 0; i < dailyForecast.count; i++) {
+        const date = new Date(start);
+        if (stepUnit === 'M') {
+            date.setUTCMonth(start.getUTCMonth() + i * stepSize);
+        } else {
+            date.setUTCDate(start.getUTCDate() + i * stepSize);
+        }
+        dates.push(date.toISOString().split('T')[0]);
+    }
+    return { ...dailyForecast, dates };
+}
+
 /**
  * Load and display forecast chart with historical data
  */
@@ -444,7 +475,9 @@ function loadForecastChart(currency, forecastData) {
     startDate.setFullYear(startDate.getFullYear() - 2);
     const startDateStr = startDate.toISOString().split('T')[0];
 
-    fetch(`/api/currency/historical?currency=${currency}&start_date=${startDateStr}&end_date=${endDate}`)
+    // About one point per pixel is all the chart can show
+    const maxPoints = Math.max(500, document.getElementById('forecastChart').clientWidth);
+    fetch(`/api/currency/historical?currency=${currency}&start_date=${startDateStr}&end_date=${endDate}&max_points=${maxPoints}`)
         .then(response => response.json())
         .then(historicalData => {
             if (historicalData.error) {
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Columnar Currency Cache
+Compiled form of the currency CSV files: one .npy file per column (post_date
+as int64 nanoseconds, rates as float64) that every worker memory-maps, so all
+gunicorn processes share one page-cache copy and nothing is parsed at startup
+
+Layout:
+    CURRENCY_CACHE_DIR/v<CACHE_VERSION>/<code>-<mtime_ns>-<size>/<column>.npy
+    CURRENCY_CACHE_DIR/v<CACHE_VERSION>/<code>-<mtime_ns>-<size>/columns.json
+
+Artifacts are named after the modification time and size of their source
+CSV, so a CSV that changes gets a new artifact on its next load. They are
+built in a temporary directory and renamed into place, so concurrent workers
+never map a partial artifact; superseded artifacts are removed (processes
+that still map them keep their mapping).
+
+Usage:
+    python currency_columns.py [USD EUR ...]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+
+from settings import CURRENCY_CACHE_DIR, CURRENCY_CACHE_ENABLED
+
+# Bump when the stored layout changes incompatibly
+CACHE_VERSION = 1
+
+MANIFEST = 'columns.json'
+
+
+def _root():
+    return os.path.join(CURRENCY_CACHE_DIR, f'v{CACHE_VERSION}')
+
+
+def artifact_path(currency_code, fingerprint):
+    """Directory of the compiled columns of one version of a currency file"""
+    mtime_ns, size = fingerprint
+    return os.path.join(_root(), f'{currency_code}-{mtime_ns}-{size}')
+
+
+def load_columns(currency_code, fingerprint):
+    """
+    Memory-map the compiled columns of a currency file
+
+    Args:
+        currency_code: Currency code
+        fingerprint: (mtime_ns, size) of the source CSV
+
+    Returns:
+        Dictionary of column -> read-only array in file column order (post_date
+        as datetime64[ns]), or None if no artifact matches the fingerprint
+    """
+    path = artifact_path(currency_code, fingerprint)
+    try:
+        with open(os.path.join(path, MANIFEST), 'r') as f:
+            manifest = json.load(f)
+        columns = {}
+        for name in manifest['columns']:
+            values = np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+            columns[name] = values.view('datetime64[ns]') if name in manifest['dates'] else values
+        return columns
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Could not load compiled currency data {path}: {e}")
+        return None
+
+
+def write_columns(currency_code, fingerprint, frame):
+    """
+    Compile a parsed currency frame and remove superseded artifacts
+
+    Args:
+        currency_code: Currency code
+        fingerprint: (mtime_ns, size) of the CSV the frame was parsed from
+        frame: Parsed currency DataFrame
+
+    Returns:
+        Path of the artifact
+    """
+    path = artifact_path(currency_code, fingerprint)
+    os.makedirs(_root(), exist_ok=True)
+    tmp_path = tempfile.mkdtemp(dir=_root(), prefix=f'.{currency_code}-')
+    try:
+        dates = []
+        for name in frame.columns:
+            series = frame[name]
+            if pd.api.types.is_datetime64_any_dtype(series):
+                values = series.to_numpy(dtype='datetime64[ns]').view('int64')
+                dates.append(name)
+            elif pd.api.types.is_numeric_dtype(series):
+                values = series.to_numpy(dtype=float)
+            else:
+                values = series.astype(str).to_numpy(dtype=str)
+            np.save(os.path.join(tmp_path, f'{name}.npy'), values)
+        with open(os.path.join(tmp_path, MANIFEST), 'w') as f:
+            json.dump({'columns': list(frame.columns), 'dates': dates, 'rows': len(frame)}, f)
+        os.rename(tmp_path, path)
+    except OSError:
+        # Another worker compiled the same version first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not os.path.isdir(path):
+            raise
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+
+    prefix = f'{currency_code}-'
+    for entry in os.listdir(_root()):
+        if entry.startswith(prefix) and os.path.join(_root(), entry) != path:
+            shutil.rmtree(os.path.join(_root(), entry), ignore_errors=True)
+    return path
+
+
+def compiled_columns(currency_code, fingerprint, parse):
+    """
+    Compiled columns of a currency file, compiling it first if needed
+
+    Args:
+        currency_code: Currency code
+        fingerprint: (mtime_ns, size) of the source CSV
+        parse: Callable returning the parsed DataFrame of the source CSV
+
+    Returns:
+        Dictionary of column -> read-only array (see load_columns), or None if
+        the cache is disabled or cannot be written
+    """
+    if not CURRENCY_CACHE_ENABLED:
+        return None
+    columns = load_columns(currency_code, fingerprint)
+    if columns is not None:
+        return columns
+
+    from currency_analysis import currency_file_fingerprint
+
+    frame = parse()
+    # Do not file data under the fingerprint of a CSV that changed while it was parsed
+    if currency_file_fingerprint(currency_code) != fingerprint:
+        return None
+    try:
+        write_columns(currency_code, fingerprint, frame)
+    except Exception as e:
+        print(f"Could not compile currency data for {currency_code}: {e}")
+        return None
+    return load_columns(currency_code, fingerprint)
+
+
+def main(argv=None):
+    import argparse
+    from currency_analysis import (AVAILABLE_CURRENCIES, currency_file_fingerprint, get_currency_file_path,
+                                   parse_currency_csv)
+
+    parser = argparse.ArgumentParser(description='Compile the currency CSV files for memory-mapping')
+    parser.add_argument('currencies', nargs='*', default=list(AVAILABLE_CURRENCIES))
+    args = parser.parse_args(argv)
+
+    for code in args.currencies:
+        fingerprint = currency_file_fingerprint(code)
+        if fingerprint is None:
+            print(f"Skipping {code}: no data", file=sys.stderr)
+            continue
+        if load_columns(code, fingerprint) is not None:
+            print(f"{code} is up to date", file=sys.stderr)
+            continue
+        path = write_columns(code, fingerprint, parse_currency_csv(get_currency_file_path(code)))
+        print(f"Compiled {code} to {path}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
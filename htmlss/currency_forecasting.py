@@ -3,9 +3,13 @@ Currency Forecasting Module
 Uses Prophet and statistical models to forecast 2026 exchange rates
 """
 
+import copy
+import time
 import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from statistics import NormalDist
 import warnings
 warnings.filterwarnings('ignore')
 
@@ -25,7 +29,63 @@ except ImportError:
     print("Warning: Scikit-learn not available, using basic predictions")
     SKLEARN_AVAILABLE = False
 
-from currency_analysis import load_currency_data, AVAILABLE_CURRENCIES
+from currency_analysis import load_currency_data, currency_file_fingerprint, AVAILABLE_CURRENCIES
+from forecast_cache import ForecastCache
+from prophet_pool import fit_prophet_model, warm_start_init
+from model_store import model_store
+from prophet_tuning import tuned_prophet_params
+from forecast_engines import FORECAST_ENGINES, run_engine, engine_description
+from joint_forecasting import JOINT_ENGINE, forecast_currencies_joint
+from prediction_intervals import INTERVAL_WIDTH
+from forecast_ledger import record_forecast
+from settings import CURRENCY_FORECAST_ENGINE
+
+# Prophet settings for daily exchange rates (prophet_tuning.py may override the
+# prior scales per currency)
+CURRENCY_PROPHET_PARAMS = {
+    'yearly_seasonality': True,
+    'weekly_seasonality': False,
+    'daily_seasonality': False,
+    'changepoint_prior_scale': 0.05,
+    'seasonality_prior_scale': 10,
+    'interval_width': 0.95
+}
+
+# Latest fitted Prophet model per currency, used to warm-start the refit when
+# new days are appended to the currency's CSV
+latest_prophet_models = {}
+
+# Resolutions of daily_forecast payloads and the step between their points
+FORECAST_RESOLUTIONS = {'daily': '1D', 'weekly': '7D', 'monthly': '1M'}
+DAILY_FORECAST_SERIES = ('rates', 'lower_bound', 'upper_bound')
+
+# Forecasts keyed by (currency, CSV fingerprint, engine, include_trade)
+currency_forecast_cache = ForecastCache(max_entries=64)
+
+# Combined forecasts of all currencies keyed by (engine, fingerprints of their CSV files)
+all_currencies_cache = ForecastCache(max_entries=8)
+
+# Engines built into CurrencyForecaster; 'auto' is the Prophet -> polynomial -> trend chain.
+# FORECAST_ENGINES are also accepted.
+MODEL_ENGINES = {
+    'auto': None,
+    'prophet': 'Prophet (FB Time Series)',
+    'linear': 'Polynomial Regression',
+    'trend': 'Trend-based Forecast'
+}
+
+
+def available_engines():
+    """Engine names accepted by CurrencyForecaster.forecast_2026"""
+    return list(MODEL_ENGINES) + list(FORECAST_ENGINES)
+
+
+class _UncachedForecast(Exception):
+    """Carries a forecast out of the cache computation without caching it"""
+    
+    def __init__(self, forecast):
+        super().__init__()
+        self.forecast = forecast
 
 
 class CurrencyForecaster:
@@ -40,6 +100,7 @@ class CurrencyForecaster:
         self.prophet_model = None
         self.linear_model = None
         self.predictions = None
+        self.prophet_params = tuned_prophet_params(CURRENCY_PROPHET_PARAMS, 'currencies', currency_code)
         
     def load_data(self):
         """Load historical currency data"""
@@ -60,8 +121,19 @@ class CurrencyForecaster:
         
         return prophet_df
     
+    def _store_key(self, params):
+        """Model store key for the loaded history and model params"""
+        series = list(zip(self.historical_data['post_date'].dt.strftime('%Y-%m-%d'),
+                          self.historical_data['average_rate'].tolist()))
+        return model_store.key(self.currency_code, series, params)
+    
     def train_prophet_model(self):
-        """Train Prophet model for forecasting"""
+        """
+        Train Prophet model for forecasting
+        The fit runs in the Prophet process pool and is abandoned after PROPHET_TIMEOUT.
+        It is warm-started from this currency's previous fit when there is one.
+        A model already fitted on the same data is loaded from the model store.
+        """
         if not PROPHET_AVAILABLE:
             return None
         
@@ -69,17 +141,15 @@ class CurrencyForecaster:
             # Prepare data
             prophet_df = self.prepare_prophet_data()
             
-            # Initialize and train Prophet model
-            self.prophet_model = Prophet(
-                yearly_seasonality=True,
-                weekly_seasonality=False,
-                daily_seasonality=False,
-                changepoint_prior_scale=0.05,
-                seasonality_prior_scale=10,
-                interval_width=0.95
-            )
-            
-            self.prophet_model.fit(prophet_df)
+            store_key = self._store_key(self.prophet_params)
+            self.prophet_model = model_store.load_prophet('currency_prophet', store_key)
+            if self.prophet_model is None:
+                init = warm_start_init(latest_prophet_models.get(self.currency_code))
+                self.prophet_model = fit_prophet_model(prophet_df, self.prophet_params, init=init)
+                if self.prophet_model is not None:
+                    model_store.save_prophet('currency_prophet', store_key, self.prophet_model)
+            if self.prophet_model is not None:
+                latest_prophet_models[self.currency_code] = self.prophet_model
             return self.prophet_model
         
         except Exception as e:
@@ -99,6 +169,12 @@ class CurrencyForecaster:
             X = df[['days_since_start']].values
             y = df['average_rate'].values
             
+            store_key = self._store_key({'degree': 2, 'features': ['days_since_start']})
+            stored = model_store.load_object('currency_linear', store_key)
+            if stored is not None:
+                self.poly_features, self.linear_model = stored
+                return self.linear_model
+            
             # Polynomial features (degree 2)
             poly_features = PolynomialFeatures(degree=2)
             X_poly = poly_features.fit_transform(X)
@@ -107,6 +183,7 @@ class CurrencyForecaster:
             self.linear_model = LinearRegression()
             self.linear_model.fit(X_poly, y)
             self.poly_features = poly_features
+            model_store.save_object('currency_linear', store_key, (self.poly_features, self.linear_model))
             
             return self.linear_model
         
@@ -131,17 +208,13 @@ class CurrencyForecaster:
             return None
         
         try:
-            # Create future dataframe
-            future = self.prophet_model.make_future_dataframe(periods=periods)
+            # Predict the forecast period only (not the fitted history)
+            last_date = self.historical_data['post_date'].max()
+            future = pd.DataFrame({'ds': pd.date_range(start=last_date + timedelta(days=1), periods=periods)})
             
-            # Make predictions
             forecast = self.prophet_model.predict(future)
             
-            # Filter to forecast period only
-            last_date = self.historical_data['post_date'].max()
-            forecast_only = forecast[forecast['ds'] > last_date].copy()
-            
-            return forecast_only[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
+            return forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
         
         except Exception as e:
             print(f"Error making Prophet forecast: {e}")
@@ -227,13 +300,65 @@ class CurrencyForecaster:
             print(f"Error in fallback forecast: {e}")
             return None
     
-    def forecast_2026(self):
+    def forecast_engine(self, engine, periods=365):
+        """
+        Forecast using a registered NumPy engine (see forecast_engines)
+        
+        The engines step once per observation and rates are posted on
+        business days only, so the forecast has one step per business day;
+        weekends repeat Friday's forecast.
+        
+        Args:
+            engine: Engine name
+            periods: Number of days to forecast
+        
+        Returns:
+            DataFrame with predictions
+        """
+        try:
+            last_date = self.historical_data['post_date'].max()
+            future_dates = pd.date_range(start=last_date + timedelta(days=1), periods=periods)
+            business_days = pd.bdate_range(future_dates[0], future_dates[-1])
+            
+            values = self.historical_data['average_rate'].values
+            result = run_engine(engine, values, len(business_days))
+            
+            # Step 0 (days before the first business day) is the last observation
+            steps = business_days.searchsorted(future_dates, side='right')
+            point = np.concatenate([[values[-1]], result['forecast']])[steps]
+            forecast_df = pd.DataFrame({
+                'ds': future_dates,
+                'yhat': point
+            })
+            
+            # Analytic intervals for engines that provide forecast variances
+            if 'forecast_std' in result:
+                z = NormalDist().inv_cdf(0.5 + INTERVAL_WIDTH / 2)
+                std = np.concatenate([[0.0], result['forecast_std']])[steps]
+                forecast_df['yhat_lower'] = point - z * std
+                forecast_df['yhat_upper'] = point + z * std
+            
+            return forecast_df
+        
+        except Exception as e:
+            print(f"Error in {engine} forecast: {e}")
+            return None
+    
+    def forecast_2026(self, engine=None):
         """
         Forecast exchange rates for 2026
         
+        Args:
+            engine: One of available_engines(); defaults to CURRENCY_FORECAST_ENGINE
+        
         Returns:
             Dictionary with predictions
         """
+        engine = engine or CURRENCY_FORECAST_ENGINE
+        if engine not in available_engines():
+            raise ValueError(f"Unknown forecasting engine: {engine}")
+        started = time.time()
+        
         # Load data if not already loaded
         if self.historical_data is None:
             self.load_data()
@@ -246,16 +371,21 @@ class CurrencyForecaster:
         if days_to_forecast <= 0:
             days_to_forecast = 365  # Default to 1 year
         
-        # Try Prophet first
         forecast = None
         method_used = None
         
-        if PROPHET_AVAILABLE:
+        # Registry engines
+        if engine in FORECAST_ENGINES:
+            forecast = self.forecast_engine(engine, days_to_forecast)
+            method_used = engine_description(engine)
+        
+        # Try Prophet first
+        if forecast is None and engine in ('auto', 'prophet') and PROPHET_AVAILABLE:
             forecast = self.forecast_prophet(days_to_forecast)
             method_used = 'Prophet (FB Time Series)'
         
         # Fallback to linear regression
-        if forecast is None and SKLEARN_AVAILABLE:
+        if forecast is None and engine in ('auto', 'linear') and SKLEARN_AVAILABLE:
             forecast = self.forecast_linear(days_to_forecast)
             method_used = 'Polynomial Regression'
         
@@ -267,11 +397,55 @@ class CurrencyForecaster:
         if forecast is None:
             return None
         
+        result = self.build_result(forecast, method_used, engine)
+        self.record_in_ledger(forecast, method_used, engine, time.time() - started)
+        return result
+    
+    def record_in_ledger(self, forecast, method_used, engine, compute_seconds):
+        """
+        Record the monthly averages of a daily forecast in the forecast ledger
+        
+        Only calendar months the forecast covers completely are recorded, so
+        each one can be scored against the month's average actual rate. Rates
+        are posted on business days only, so weekends are left out of the
+        averages as they are out of the actuals.
+        """
+        as_of = self.historical_data['post_date'].max()
+        months = forecast['ds'].dt.to_period('M')
+        end_month = (forecast['ds'].max() + timedelta(days=1)).to_period('M')
+        complete = (months > as_of.to_period('M')) & (months < end_month)
+        business_days = complete & (forecast['ds'].dt.dayofweek < 5)
+        if not business_days.any():
+            return
+        
+        columns = [c for c in ('yhat', 'yhat_lower', 'yhat_upper') if c in forecast.columns]
+        monthly = forecast.loc[business_days, columns].groupby(months[business_days]).mean()
+        record_forecast(
+            'currency', self.currency_code, self.currency_code, engine, method_used,
+            as_of.strftime('%Y-%m-%d'), [str(month) for month in monthly.index], monthly['yhat'].tolist(),
+            monthly['yhat_lower'].tolist() if 'yhat_lower' in monthly else None,
+            monthly['yhat_upper'].tolist() if 'yhat_upper' in monthly else None,
+            compute_seconds
+        )
+    
+    def build_result(self, forecast, method_used, engine):
+        """
+        Summarize a daily forecast into the forecast_2026 result
+        
+        Args:
+            forecast: DataFrame with ds, yhat and optional yhat_lower / yhat_upper
+            method_used: Method description
+            engine: Engine name
+        
+        Returns:
+            Dictionary with predictions
+        """
         # Prepare results
         result = {
             'currency_code': self.currency_code,
             'currency_name': self.currency_name,
             'method': method_used,
+            'engine': engine,
             'forecast_start': forecast['ds'].min().strftime('%Y-%m-%d'),
             'forecast_end': forecast['ds'].max().strftime('%Y-%m-%d'),
             'predictions': []
@@ -316,20 +490,20 @@ class CurrencyForecaster:
         
         # Add full daily predictions for charting
         result['daily_forecast'] = {
-            'dates': [d.strftime('%Y-%m-%d') for d in forecast['ds']],
-            'rates': [float(r) for r in forecast['yhat']]
+            'dates': forecast['ds'].dt.strftime('%Y-%m-%d').tolist(),
+            'rates': forecast['yhat'].to_numpy(dtype=float).tolist()
         }
         
         # Add confidence intervals if available (Prophet)
         if 'yhat_lower' in forecast.columns and 'yhat_upper' in forecast.columns:
-            result['daily_forecast']['lower_bound'] = [float(r) for r in forecast['yhat_lower']]
-            result['daily_forecast']['upper_bound'] = [float(r) for r in forecast['yhat_upper']]
+            result['daily_forecast']['lower_bound'] = forecast['yhat_lower'].to_numpy(dtype=float).tolist()
+            result['daily_forecast']['upper_bound'] = forecast['yhat_upper'].to_numpy(dtype=float).tolist()
         
         self.predictions = result
         return result
 
 
-def forecast_2026(df, currency_code='USD', include_trade_adjustment=False):
+def forecast_2026(df, currency_code='USD', include_trade_adjustment=False, engine=None):
     """
     Standalone function to forecast 2026 exchange rates
     
@@ -337,6 +511,7 @@ def forecast_2026(df, currency_code='USD', include_trade_adjustment=False):
         df: DataFrame with historical currency data
         currency_code: Currency code (USD, EUR, CNY, TSH)
         include_trade_adjustment: Whether to adjust forecast based on trade balance data
+        engine: Forecasting engine (see available_engines)
     
     Returns:
         Dictionary with forecast results
@@ -344,44 +519,227 @@ def forecast_2026(df, currency_code='USD', include_trade_adjustment=False):
     try:
         forecaster = CurrencyForecaster(currency_code)
         forecaster.historical_data = df
-        base_forecast = forecaster.forecast_2026()
+        base_forecast = forecaster.forecast_2026(engine)
         
         # Apply trade adjustment if requested
         if include_trade_adjustment:
-            try:
-                from currency_trade_integration import get_trade_adjusted_forecast
-                base_forecast = get_trade_adjusted_forecast(currency_code, base_forecast)
-            except Exception as e:
-                print(f"Trade adjustment failed: {e}. Using base forecast.")
-                base_forecast['trade_adjustment_error'] = str(e)
+            base_forecast = apply_trade_adjustment(base_forecast, currency_code)
         
         return base_forecast
     except Exception as e:
         return {'error': str(e)}
 
 
-def forecast_all_currencies():
+def get_cached_forecast(currency_code='USD', engine=None, include_trade=False):
+    """
+    2026 forecast of a currency's CSV data, computed once per version of the file
+    
+    The trade-adjusted variant is derived from the cached base forecast, so
+    both (and get_currency_forecast_summary) come from a single fit. It is
+    only cached once the adjustment succeeds; until then the base forecast
+    is returned and the adjustment is retried on the next call.
+    
+    Args:
+        currency_code: Currency code (USD, EUR, CNY, TSH)
+        engine: Forecasting engine (see available_engines)
+        include_trade: Whether to adjust the forecast for trade balance data
+    
+    Returns:
+        Forecast dictionary (a copy the caller may modify), None if the
+        currency has no data, or {'error': ...} if the forecast failed
+    """
+    engine = engine or CURRENCY_FORECAST_ENGINE
+    fingerprint = currency_file_fingerprint(currency_code)
+    if fingerprint is None:
+        return None
+    key = (currency_code, fingerprint, engine, include_trade)
+    
+    def compute():
+        if include_trade:
+            base = get_cached_forecast(currency_code, engine)
+            if base is None or 'error' in base:
+                # The base forecast failed; retry it on the next call
+                raise _UncachedForecast(base)
+            adjusted = apply_trade_adjustment(base, currency_code)
+            if not adjusted.get('trade_adjusted'):
+                # Trade data unavailable or the adjustment failed
+                raise _UncachedForecast(adjusted)
+            return adjusted
+        
+        df = load_currency_data(currency_code)
+        if df is None or df.empty:
+            return None
+        forecaster = CurrencyForecaster(currency_code)
+        forecaster.historical_data = df
+        forecast = forecaster.forecast_2026(engine)
+        if forecast is None:
+            raise ValueError(f"No forecast could be produced for {currency_code}")
+        return forecast
+    
+    # Drop forecasts of previous versions of this currency's file
+    currency_forecast_cache.invalidate(lambda cached_key: cached_key[0] == currency_code
+                                       and cached_key[1] != fingerprint)
+    try:
+        forecast, _ = currency_forecast_cache.get_or_compute(key, compute)
+    except _UncachedForecast as e:
+        return e.forecast
+    except Exception as e:
+        # Not cached, so the next call retries
+        return {'error': str(e)}
+    return copy.deepcopy(forecast)
+
+
+def format_daily_forecast(daily, resolution='daily', compact=False, precision=None):
+    """
+    Resample and encode the daily_forecast of a forecast result for transfer
+    
+    Weekly points average consecutive 7-day blocks from the first forecast
+    day; monthly points average each calendar month and are dated the first
+    of the month. The compact encoding replaces the date list with start,
+    step and count, e.g. start '2026-01-01', step '1M', count 12.
+    
+    Args:
+        daily: daily_forecast dictionary (dates, rates, optional bounds)
+        resolution: 'daily', 'weekly' or 'monthly'
+        compact: Use the start/step/count encoding instead of a date list
+        precision: Round values to this many decimals (None keeps full precision)
+    
+    Returns:
+        New daily_forecast dictionary
+    """
+    if resolution not in FORECAST_RESOLUTIONS:
+        raise ValueError(f"Unknown resolution: {resolution}")
+    
+    dates = np.array(daily['dates'], dtype='datetime64[D]')
+    series = {name: np.asarray(daily[name], dtype=float) for name in DAILY_FORECAST_SERIES if name in daily}
+    
+    if resolution != 'daily' and len(dates):
+        if resolution == 'weekly':
+            starts = np.arange(0, len(dates), 7)
+            labels = dates[starts]
+        else:
+            months = dates.astype('datetime64[M]')
+            starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+            labels = months[starts].astype('datetime64[D]')
+        counts = np.diff(np.r_[starts, len(dates)])
+        series = {name: np.add.reduceat(values, starts) / counts for name, values in series.items()}
+        dates = labels
+    
+    if precision is not None:
+        series = {name: np.round(values, precision) for name, values in series.items()}
+    
+    encoded = {'resolution': resolution}
+    if compact:
+        encoded.update({
+            'encoding': 'compact',
+            'start': str(dates[0]) if len(dates) else None,
+            'step': FORECAST_RESOLUTIONS[resolution],
+            'count': int(len(dates))
+        })
+    else:
+        encoded['dates'] = dates.astype(str).tolist()
+    encoded.update({name: values.tolist() for name, values in series.items()})
+    return encoded
+
+
+def apply_trade_adjustment(base_forecast, currency_code='USD'):
+    """
+    Adjust a forecast for trade balance trends, keeping the base forecast on failure
+    
+    Args:
+        base_forecast: Result of CurrencyForecaster.forecast_2026
+        currency_code: Currency code
+    
+    Returns:
+        Adjusted forecast dictionary
+    """
+    try:
+        from currency_trade_integration import get_trade_adjusted_forecast
+        return get_trade_adjusted_forecast(currency_code, base_forecast)
+    except Exception as e:
+        print(f"Trade adjustment failed: {e}. Using base forecast.")
+        base_forecast['trade_adjustment_error'] = str(e)
+        return base_forecast
+
+
+def _forecast_currency(code, engine=None):
+    """Load and forecast one currency (None if it has no data or the forecast failed)"""
+    print(f"Forecasting {code}...")
+    forecast = get_cached_forecast(code, engine)
+    if forecast and 'error' in forecast:
+        print(f"Error forecasting {code}: {forecast['error']}")
+        return None
+    return forecast
+
+
+def _forecast_joint(codes):
+    """Forecast all currencies with one joint VAR fit (see joint_forecasting)"""
+    frames = {}
+    for code in codes:
+        df = load_currency_data(code)
+        if df is not None and not df.empty:
+            frames[code] = df
+    if not frames:
+        return {}
+    
+    last_date = max(df['post_date'].max() for df in frames.values())
+    end_date = datetime(2026, 12, 31)
+    if end_date <= last_date:
+        end_date = last_date + timedelta(days=365)
+    
+    started = time.time()
+    forecasts, summary = forecast_currencies_joint(frames, end_date)
+    method = f"Joint VAR({summary['lags']}) on log-returns"
+    # One fit serves every currency; split its cost between them
+    compute_seconds = (time.time() - started) / len(forecasts)
+    
+    results = {}
+    for code, forecast in forecasts.items():
+        forecaster = CurrencyForecaster(code)
+        forecaster.historical_data = frames[code]
+        results[code] = forecaster.build_result(forecast, method, JOINT_ENGINE)
+        results[code]['joint_model'] = summary
+        forecaster.record_in_ledger(forecast, method, JOINT_ENGINE, compute_seconds)
+    return results
+
+
+def forecast_all_currencies(engine=None):
     """
     Forecast 2026 rates for all available currencies
     
+    The currencies are forecast concurrently; their Prophet fits run side by
+    side in the Prophet process pool, which has one slot per currency by
+    default (PROPHET_POOL_WORKERS). Each fit's timeout starts when its
+    process does, so fits waiting for a slot never time out. With
+    engine='joint' all currencies come from a single VAR fit instead. The
+    combined result is shared by all callers until one of the currency CSV
+    files changes.
+    
+    Args:
+        engine: One of available_engines() or 'joint'; defaults to CURRENCY_FORECAST_ENGINE
+    
     Returns:
         Dictionary with forecasts for all currencies
     """
-    results = {}
+    engine = engine or CURRENCY_FORECAST_ENGINE
+    if engine != JOINT_ENGINE and engine not in available_engines():
+        raise ValueError(f"Unknown forecasting engine: {engine}")
     
-    for code in AVAILABLE_CURRENCIES.keys():
-        try:
-            print(f"Forecasting {code}...")
-            df = load_currency_data(code)
-            if df is not None and not df.empty:
-                forecast = forecast_2026(df, code)
-                if forecast and 'error' not in forecast:
-                    results[code] = forecast
-        except Exception as e:
-            print(f"Error forecasting {code}: {e}")
-            continue
+    codes = list(AVAILABLE_CURRENCIES.keys())
+    fingerprints = tuple((code, currency_file_fingerprint(code)) for code in codes)
+    key = (engine, fingerprints)
     
-    return results
+    def compute():
+        if engine == JOINT_ENGINE:
+            return _forecast_joint(codes)
+        with ThreadPoolExecutor(max_workers=len(codes), thread_name_prefix='currency-forecast') as executor:
+            forecasts = dict(zip(codes, executor.map(lambda code: _forecast_currency(code, engine), codes)))
+        return {code: forecast for code, forecast in forecasts.items() if forecast is not None}
+    
+    # Drop combined results of previous versions of the files
+    all_currencies_cache.invalidate(lambda cached_key: cached_key[1] != fingerprints)
+    results, _ = all_currencies_cache.get_or_compute(key, compute)
+    return copy.deepcopy(results)
 
 
 def get_currency_forecast_summary(currency_code='USD'):
@@ -395,10 +753,9 @@ def get_currency_forecast_summary(currency_code='USD'):
         Dictionary with summary
     """
     try:
-        forecaster = CurrencyForecaster(currency_code)
-        forecast = forecaster.forecast_2026()
+        forecast = get_cached_forecast(currency_code)
         
-        if not forecast:
+        if not forecast or 'error' in forecast:
             return None
         
         summary = {
@@ -3,11 +3,27 @@ Currency-Trade Integration Module
 Enhances currency predictions by incorporating trade balance data
 """
 
+import warnings
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from currency_analysis import load_currency_data, AVAILABLE_CURRENCIES
+from currency_analysis import currency_store, currency_file_fingerprint, AVAILABLE_CURRENCIES
 from db import get_db_connection
+from forecast_cache import ForecastCache, series_fingerprint
+
+# Scenario engine defaults
+SCENARIO_PERCENTILES = [5, 25, 50, 75, 95]
+SHOCK_DISTRIBUTIONS = ('normal', 'uniform')
+DEFAULT_SCENARIOS = 5000
+MAX_SCENARIOS = 50000
+SCENARIO_SEED = 7
+
+# Default of the trade_df arguments: load the trade data from the database.
+# Entry points load it once and pass the frame (or None if unavailable) on.
+_LOAD_TRADE_DATA = object()
+
+# Trade sensitivities keyed by (currency, currency file fingerprint, trade data fingerprint)
+trade_sensitivity_cache = ForecastCache(max_entries=16)
 
 def get_trade_balance_data():
     """
@@ -50,32 +66,35 @@ def get_trade_balance_data():
         return None
 
 
-def align_currency_with_trade(currency_code='USD'):
+def align_currency_with_trade(currency_code='USD', trade_df=_LOAD_TRADE_DATA):
     """
     Align currency exchange rates with trade balance data
     
     Args:
         currency_code: Currency code
+        trade_df: Result of get_trade_balance_data if already loaded (None if
+            trade data is unavailable); loaded here if not given
     
     Returns:
         DataFrame with both currency rates and trade metrics
     """
-    # Load currency data
-    currency_df = load_currency_data(currency_code)
+    # Load currency data (shared frame; not modified here)
+    currency_df = currency_store.frame(currency_code)
     if currency_df is None:
         return None
     
     # Load trade balance data
-    trade_df = get_trade_balance_data()
+    if trade_df is _LOAD_TRADE_DATA:
+        trade_df = get_trade_balance_data()
     if trade_df is None:
-        return currency_df  # Return currency data only if trade data unavailable
+        return currency_df.copy()  # Return currency data only if trade data unavailable
     
     # Aggregate currency data by quarter to match trade data
-    currency_df['year'] = currency_df['post_date'].dt.year
-    currency_df['quarter'] = currency_df['post_date'].dt.quarter
+    year = currency_df['post_date'].dt.year.rename('year')
+    quarter = currency_df['post_date'].dt.quarter.rename('quarter')
     
     # Calculate average exchange rate per quarter
-    currency_quarterly = currency_df.groupby(['year', 'quarter']).agg({
+    currency_quarterly = currency_df.groupby([year, quarter]).agg({
         'average_rate': 'mean',
         'buying_rate': 'mean',
         'selling_rate': 'mean',
@@ -101,18 +120,19 @@ def align_currency_with_trade(currency_code='USD'):
     return merged_df
 
 
-def calculate_trade_impact_score(currency_code='USD', period_quarters=4):
+def calculate_trade_impact_score(currency_code='USD', period_quarters=4, trade_df=_LOAD_TRADE_DATA):
     """
     Calculate how much trade balance impacts currency movement
     
     Args:
         currency_code: Currency code
         period_quarters: Number of quarters to analyze
+        trade_df: Trade balance data (see align_currency_with_trade)
     
     Returns:
         Dictionary with trade impact metrics
     """
-    merged_df = align_currency_with_trade(currency_code)
+    merged_df = align_currency_with_trade(currency_code, trade_df)
     
     if merged_df is None or len(merged_df) < 2:
         return {
@@ -182,62 +202,69 @@ def calculate_trade_impact_score(currency_code='USD', period_quarters=4):
     }
 
 
-def get_trade_adjusted_forecast(currency_code='USD', base_forecast=None, trade_adjustment_weight=0.3):
+def get_trade_adjusted_forecast(currency_code='USD', base_forecast=None, trade_adjustment_weight=None,
+                                n_scenarios=DEFAULT_SCENARIOS, trade_df=_LOAD_TRADE_DATA):
     """
     Adjust currency forecast based on trade balance trends
     
+    Simulates trade balance shocks centred on the latest quarterly change of
+    the trade balance (spread by its historical volatility) through the
+    currency's estimated trade sensitivity. The adjusted rate of each month
+    is the scenario median, with the 5th-95th percentile range as bounds.
+    
     Args:
         currency_code: Currency code
         base_forecast: Base forecast data from Prophet/regression
-        trade_adjustment_weight: How much to weight trade data (0-1)
+        trade_adjustment_weight: Deprecated and ignored; the size of the
+            adjustment now follows from the estimated trade sensitivity
+        n_scenarios: Number of simulated trade scenarios
+        trade_df: Trade balance data (see align_currency_with_trade)
     
     Returns:
         Adjusted forecast with trade considerations
     """
+    if trade_adjustment_weight is not None:
+        warnings.warn("trade_adjustment_weight is ignored; the adjustment follows the estimated trade sensitivity",
+                      DeprecationWarning, stacklevel=2)
     if base_forecast is None:
         return None
     
+    if trade_df is _LOAD_TRADE_DATA:
+        trade_df = get_trade_balance_data()
+    
     # Get trade impact
-    trade_impact = calculate_trade_impact_score(currency_code, period_quarters=8)
+    trade_impact = calculate_trade_impact_score(currency_code, period_quarters=8, trade_df=trade_df)
+    sensitivity = get_trade_sensitivity(currency_code, trade_df)
     
-    if trade_impact.get('correlation') is None:
+    if trade_impact.get('correlation') is None or not sensitivity['trade_data']:
         # No adjustment if no correlation data
         base_forecast['trade_adjusted'] = False
         base_forecast['trade_impact'] = 'No trade data available for adjustment'
         return base_forecast
     
-    # Calculate adjustment factor based on trade balance trend
-    correlation = trade_impact['correlation']
-    balance_trend = trade_impact['trade_balance_trend']
-    
-    # Adjustment logic:
-    # - Negative correlation means: trade deficit → currency depreciates (rate increases)
-    # - Positive correlation means: trade deficit → currency appreciates (rare, but possible)
+    predictions = base_forecast.get('predictions', [])
+    if not predictions:
+        base_forecast['trade_adjusted'] = False
+        base_forecast['trade_impact'] = trade_impact
+        return base_forecast
     
-    if balance_trend == 'Improving':
-        # Improving trade balance (less deficit or more surplus)
-        if correlation < 0:
-            # Normal case: better trade balance → currency appreciates (rate decreases)
-            adjustment_factor = -abs(correlation) * trade_adjustment_weight * 0.01
-        else:
-            adjustment_factor = abs(correlation) * trade_adjustment_weight * 0.01
-    else:
-        # Declining trade balance (worse deficit)
-        if correlation < 0:
-            # Normal case: worse trade balance → currency depreciates (rate increases)
-            adjustment_factor = abs(correlation) * trade_adjustment_weight * 0.01
-        else:
-            adjustment_factor = -abs(correlation) * trade_adjustment_weight * 0.01
+    base_rates = np.array([pred['predicted_rate'] for pred in predictions])
+    scenarios = simulate_trade_scenarios(
+        base_rates[None, :], [sensitivity['elasticity']], [sensitivity['residual_std']],
+        shock_mean=sensitivity['latest_shock'], shock_std=sensitivity['shock_std'],
+        n_scenarios=n_scenarios, percentiles=[5, 50, 95]
+    )
+    lower, median, upper = scenarios['fan'][:, 0, :]
     
     # Apply adjustment to predictions
-    if 'predictions' in base_forecast:
-        for pred in base_forecast['predictions']:
-            original_rate = pred['predicted_rate']
-            adjusted_rate = original_rate * (1 + adjustment_factor)
-            pred['trade_adjusted_rate'] = float(adjusted_rate)
-            pred['trade_adjustment_pct'] = float(adjustment_factor * 100)
-    
-    # Update 2026 statistics
+    for pred, rate, low, high, base in zip(predictions, median, lower, upper, base_rates):
+        pred['trade_adjusted_rate'] = float(rate)
+        pred['trade_adjusted_lower'] = float(low)
+        pred['trade_adjusted_upper'] = float(high)
+        pred['trade_adjustment_pct'] = float((rate / base - 1) * 100)
+    
+    # Update 2026 statistics with the year-end adjustment
+    adjustment_factor = float(median[-1] / base_rates[-1] - 1)
     if '2026_statistics' in base_forecast:
         stats = base_forecast['2026_statistics']
         for key in ['mean_rate', 'min_rate', 'max_rate', 'year_end_rate']:
@@ -245,18 +272,204 @@ def get_trade_adjusted_forecast(currency_code='USD', base_forecast=None, trade_a
                 stats[f'{key}_trade_adjusted'] = float(stats[key] * (1 + adjustment_factor))
     
     # Add trade metadata
+    correlation = trade_impact['correlation']
+    balance_trend = trade_impact['trade_balance_trend']
     base_forecast['trade_adjusted'] = True
-    base_forecast['trade_adjustment_factor'] = float(adjustment_factor)
+    base_forecast['trade_adjustment_factor'] = adjustment_factor
     base_forecast['trade_correlation'] = float(correlation)
+    base_forecast['trade_sensitivity'] = sensitivity
+    base_forecast['trade_scenarios'] = n_scenarios
     base_forecast['trade_impact'] = trade_impact
     base_forecast['adjustment_explanation'] = (
         f"Trade balance is {balance_trend.lower()}, with correlation of {correlation:.3f}. "
-        f"Forecast adjusted by {adjustment_factor*100:.2f}% based on trade trends."
+        f"Median of {n_scenarios} trade scenarios moves the year-end rate by {adjustment_factor*100:.2f}% "
+        f"({sensitivity['elasticity']:.3f}% per point of trade balance)."
     )
     
     return base_forecast
 
 
+def estimate_trade_sensitivity(currency_code='USD', trade_df=_LOAD_TRADE_DATA):
+    """
+    Sensitivity of quarterly exchange rate changes to trade balance changes
+    
+    Regresses the quarterly % change of the average rate on the change of the
+    trade balance as % of total trade (percentage points). The residual
+    standard deviation is the rate movement not explained by trade.
+    
+    Args:
+        currency_code: Currency code
+        trade_df: Trade balance data (see align_currency_with_trade)
+    
+    Returns:
+        Dictionary with elasticity (% rate change per point of trade balance),
+        residual_std (% per quarter), latest_shock and shock_std (the last and
+        the typical quarterly trade balance change, in points), quarters used
+        and whether trade data was found
+    """
+    merged_df = align_currency_with_trade(currency_code, trade_df)
+    if merged_df is None or len(merged_df) < 3:
+        return {'elasticity': 0.0, 'residual_std': 0.0, 'latest_shock': 0.0, 'shock_std': 0.0,
+                'quarters': 0, 'trade_data': False}
+    
+    if 'trade_balance_pct' in merged_df.columns:
+        rate_change = merged_df['average_rate'].pct_change().values * 100
+        balance_change = merged_df['trade_balance_pct'].diff().values
+    else:
+        # Trade data unavailable: align_currency_with_trade returned daily rates
+        quarterly = merged_df.groupby(merged_df['post_date'].dt.to_period('Q'))['average_rate'].mean()
+        rate_change = quarterly.pct_change().values * 100
+        balance_change = np.full(len(rate_change), np.nan)
+    
+    valid = ~np.isnan(rate_change) & ~np.isnan(balance_change)
+    if valid.sum() >= 3 and np.var(balance_change[valid]) > 0:
+        x = balance_change[valid]
+        y = rate_change[valid]
+        elasticity = np.cov(x, y, bias=True)[0, 1] / np.var(x)
+        residuals = y - y.mean() - elasticity * (x - x.mean())
+        return {
+            'elasticity': float(elasticity),
+            'residual_std': float(residuals.std()),
+            'latest_shock': float(x[-1]),
+            'shock_std': float(x.std()),
+            'quarters': int(valid.sum()),
+            'trade_data': True
+        }
+    
+    # No usable trade data: rate uncertainty only
+    observed = rate_change[~np.isnan(rate_change)]
+    return {
+        'elasticity': 0.0,
+        'residual_std': float(observed.std()) if len(observed) else 0.0,
+        'latest_shock': 0.0,
+        'shock_std': 0.0,
+        'quarters': int(len(observed)),
+        'trade_data': False
+    }
+
+
+def get_trade_sensitivity(currency_code='USD', trade_df=_LOAD_TRADE_DATA):
+    """estimate_trade_sensitivity, cached until the currency's CSV or the trade data changes"""
+    if trade_df is _LOAD_TRADE_DATA:
+        trade_df = get_trade_balance_data()
+    trade_key = None
+    if trade_df is not None:
+        trade_key = series_fingerprint(trade_df[['period', 'exports', 'imports']].values.tolist())
+    key = (currency_code, currency_file_fingerprint(currency_code), trade_key)
+    sensitivity, _ = trade_sensitivity_cache.get_or_compute(
+        key, lambda: estimate_trade_sensitivity(currency_code, trade_df)
+    )
+    return sensitivity
+
+
+def simulate_trade_scenarios(base_rates, elasticities, residual_stds, shock_mean=0.0, shock_std=5.0,
+                             distribution='normal', n_scenarios=DEFAULT_SCENARIOS,
+                             percentiles=SCENARIO_PERCENTILES, seed=SCENARIO_SEED):
+    """
+    Monte Carlo what-if analysis of trade balance shocks for several currencies
+    
+    Every scenario draws one trade balance shock (change in trade balance as
+    % of total trade, in percentage points) shared by all currencies. Each
+    currency passes it through with its elasticity, phased in over the first
+    quarter, plus its own unexplained rate noise growing with the square root
+    of time. All currencies x scenarios x months are evaluated as one array.
+    
+    Args:
+        base_rates: Monthly base forecast, shape (currencies, months)
+        elasticities: % rate change per point of trade balance, per currency
+        residual_stds: Unexplained % rate change per quarter, per currency
+        shock_mean: Mean trade balance shock (percentage points)
+        shock_std: Standard deviation of the shock (percentage points)
+        distribution: 'normal' or 'uniform' (same mean and standard deviation)
+        n_scenarios: Number of simulated scenarios
+        percentiles: Percentiles of the fan chart
+        seed: Random seed (fixed so a slider position always gives the same fan)
+    
+    Returns:
+        Dictionary with 'fan' of shape (len(percentiles), currencies, months)
+        and 'mean' of shape (currencies, months)
+    """
+    if distribution not in SHOCK_DISTRIBUTIONS:
+        raise ValueError(f"Unknown shock distribution: {distribution}")
+    if not (np.isfinite(shock_mean) and np.isfinite(shock_std)):
+        raise ValueError("shock_mean and shock_std must be finite")
+    
+    base = np.atleast_2d(np.asarray(base_rates, dtype=float))
+    elasticities = np.asarray(elasticities, dtype=float)
+    residual_stds = np.asarray(residual_stds, dtype=float)
+    n_currencies, months = base.shape
+    
+    rng = np.random.default_rng(seed)
+    if distribution == 'normal':
+        shocks = rng.normal(shock_mean, shock_std, n_scenarios)
+    else:
+        half_width = shock_std * np.sqrt(3)
+        shocks = rng.uniform(shock_mean - half_width, shock_mean + half_width, n_scenarios)
+    noise = rng.standard_normal((n_currencies, n_scenarios))
+    
+    # Quarters elapsed at each month; trade effects are fully passed through after one quarter
+    elapsed = np.arange(1, months + 1) / 3
+    pass_through = np.minimum(elapsed, 1.0)
+    
+    change_pct = (elasticities[:, None, None] * shocks[None, :, None] * pass_through
+                  + residual_stds[:, None, None] * noise[:, :, None] * np.sqrt(elapsed))
+    paths = base[:, None, :] * (1 + change_pct / 100)
+    
+    return {
+        'fan': np.percentile(paths, percentiles, axis=1),
+        'mean': paths.mean(axis=1)
+    }
+
+
+def get_trade_scenario_fan(base_forecasts, shock_mean=0.0, shock_std=5.0, distribution='normal',
+                           n_scenarios=DEFAULT_SCENARIOS, percentiles=SCENARIO_PERCENTILES):
+    """
+    Percentile fan charts of 2026 monthly rates under a trade shock distribution
+    
+    Args:
+        base_forecasts: Dictionary of currency code -> forecast_2026 result
+        shock_mean, shock_std, distribution, n_scenarios, percentiles: See simulate_trade_scenarios
+    
+    Returns:
+        Dictionary with months, percentiles and per-currency fans
+    """
+    codes = [code for code, forecast in base_forecasts.items() if forecast and forecast.get('predictions')]
+    if not codes:
+        return None
+    
+    months = min(len(base_forecasts[code]['predictions']) for code in codes)
+    base = np.array([[pred['predicted_rate'] for pred in base_forecasts[code]['predictions'][:months]]
+                     for code in codes])
+    trade_df = get_trade_balance_data()
+    sensitivities = [get_trade_sensitivity(code, trade_df) for code in codes]
+    
+    scenarios = simulate_trade_scenarios(
+        base,
+        [s['elasticity'] for s in sensitivities],
+        [s['residual_std'] for s in sensitivities],
+        shock_mean, shock_std, distribution, n_scenarios, percentiles
+    )
+    
+    currencies = {}
+    for i, (code, sensitivity) in enumerate(zip(codes, sensitivities)):
+        currencies[code] = {
+            'currency_name': AVAILABLE_CURRENCIES.get(code, code),
+            'base': [float(r) for r in base[i]],
+            'mean': [float(r) for r in scenarios['mean'][i]],
+            'fan': {str(p): [float(r) for r in scenarios['fan'][j, i]] for j, p in enumerate(percentiles)},
+            'year_end': {str(p): float(scenarios['fan'][j, i, -1]) for j, p in enumerate(percentiles)},
+            'sensitivity': sensitivity
+        }
+    
+    return {
+        'months': [pred['month_name'] for pred in base_forecasts[codes[0]]['predictions'][:months]],
+        'percentiles': list(percentiles),
+        'shock': {'mean': shock_mean, 'std': shock_std, 'distribution': distribution},
+        'scenarios': n_scenarios,
+        'currencies': currencies
+    }
+
+
 def get_trade_currency_comparison():
     """
     Compare all currencies with their trade balance correlations
@@ -265,9 +478,10 @@ def get_trade_currency_comparison():
         List of currencies with trade impact scores
     """
     results = []
+    trade_df = get_trade_balance_data()
     
     for code in AVAILABLE_CURRENCIES.keys():
-        impact = calculate_trade_impact_score(code, period_quarters=8)
+        impact = calculate_trade_impact_score(code, period_quarters=8, trade_df=trade_df)
         if impact and 'error' not in impact:
             results.append(impact)
     
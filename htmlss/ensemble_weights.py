@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Per-Commodity Ensemble Weights
+Learns, for every commodity series, the Prophet/linear blend (or the single
+engine) with the lowest rolling-origin backtest error and stores the choice
+in ENSEMBLE_WEIGHTS_FILE. The 'ensemble' engine of generate_ml_predictions
+reads it at serve time, so series whose best blend gives one model a weight
+of ~0 never fit that model.
+
+Usage:
+    python ensemble_weights.py [--table exports|imports|all] [--horizon 2] [--min-train 12]
+                               [--from-dump] [--output ensemble_weights.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.dirname(__file__))
+
+from forecast_cache import JsonArtifact, write_json_atomic
+from settings import ENSEMBLE_WEIGHTS_FILE
+
+# Blends that give a model less than this weight drop that model entirely
+WEIGHT_EPSILON = 0.05
+
+# Static weight used when no learned weight exists
+DEFAULT_PROPHET_WEIGHT = 0.6
+
+ensemble_weights_file = JsonArtifact(ENSEMBLE_WEIGHTS_FILE)
+
+
+def learn_prophet_weight(prophet_pred, linear_pred, actual):
+    """
+    Least-squares weight w in [0, 1] for the blend w * prophet + (1 - w) * linear
+
+    Returns:
+        The weight, or None if the two models never disagree
+    """
+    p = np.asarray(prophet_pred, dtype=float).ravel()
+    l = np.asarray(linear_pred, dtype=float).ravel()
+    a = np.asarray(actual, dtype=float).ravel()
+    diff = p - l
+    denominator = (diff ** 2).sum()
+    if denominator == 0:
+        return None
+    return float(np.clip((diff * (a - l)).sum() / denominator, 0.0, 1.0))
+
+
+def choose_series_plan(results):
+    """
+    Pick the engine (and Prophet weight) with the lowest backtest MAE
+
+    Args:
+        results: Output of backtest_ml.backtest_series including 'prophet' and 'linear'
+
+    Returns:
+        Dictionary with 'engine', 'prophet_weight', 'mae' and 'static_mae'
+    """
+    def origins_array(engine, key):
+        return np.array([o[key] for o in results[engine]['origins']], dtype=float)
+
+    actual = origins_array('prophet', 'actual')
+    prophet_pred = origins_array('prophet', 'predicted')
+    linear_pred = origins_array('linear', 'predicted')
+
+    weight = learn_prophet_weight(prophet_pred, linear_pred, actual)
+    if weight is None:
+        weight = DEFAULT_PROPHET_WEIGHT
+    if weight < WEIGHT_EPSILON:
+        weight = 0.0
+    elif weight > 1 - WEIGHT_EPSILON:
+        weight = 1.0
+
+    def blend_mae(w):
+        return float(np.abs(w * prophet_pred + (1 - w) * linear_pred - actual).mean())
+
+    candidates = {}
+    if weight == 0.0:
+        candidates['linear'] = blend_mae(0.0)
+    elif weight == 1.0:
+        candidates['prophet'] = blend_mae(1.0)
+    else:
+        candidates['ensemble'] = blend_mae(weight)
+
+    # Registry engines compete as single engines
+    for engine, result in results.items():
+        if engine not in ('prophet', 'linear', 'ensemble') and result['origins']:
+            candidates[engine] = float(np.abs(origins_array(engine, 'predicted') - actual).mean())
+
+    engine = min(candidates, key=candidates.get)
+    return {
+        'engine': engine,
+        'prophet_weight': weight if engine == 'ensemble' else None,
+        'mae': candidates[engine],
+        'static_mae': blend_mae(DEFAULT_PROPHET_WEIGHT),
+        'origins': len(actual)
+    }
+
+
+def get_series_plan(table, commodity):
+    """Learned plan for one commodity series, or None (the file is re-read when it changes)"""
+    return ensemble_weights_file.load().get('series', {}).get(table or '', {}).get(commodity)
+
+
+def learn_ensemble_weights(tables, horizon=2, min_train=12, from_dump=False):
+    """
+    Backtest every commodity series and choose its engine / ensemble weight
+
+    Returns:
+        Dictionary with settings and per-series plans (series[table][commodity])
+    """
+    from backtest_ml import backtest_series, load_series
+    from forecast_engines import FORECAST_ENGINES
+
+    engines = ('prophet', 'linear') + tuple(FORECAST_ENGINES)
+    learned = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'settings': {'horizon': horizon, 'min_train': min_train, 'weight_epsilon': WEIGHT_EPSILON},
+        'series': {}
+    }
+
+    for table_name, commodity, records in load_series(tables, from_dump):
+        if len(records) < min_train + horizon:
+            print(f"Skipping {commodity}: only {len(records)} quarters", file=sys.stderr)
+            continue
+        print(f"Learning weights for {table_name} / {commodity}...", file=sys.stderr)
+        results = backtest_series(records, engines, horizon, min_train, track_memory=False)
+        learned['series'].setdefault(table_name, {})[commodity] = choose_series_plan(results)
+
+    return learned
+
+
+def main(argv=None):
+    from commodity_data import COMMODITY_TABLES
+
+    parser = argparse.ArgumentParser(description='Learn per-commodity ensemble weights from backtests')
+    parser.add_argument('--table', choices=['exports', 'imports', 'all'], default='all')
+    parser.add_argument('--horizon', type=int, default=2)
+    parser.add_argument('--min-train', type=int, default=12)
+    parser.add_argument('--from-dump', action='store_true',
+                        help='Read series from bigdata.sql instead of the database')
+    parser.add_argument('--output', default=ENSEMBLE_WEIGHTS_FILE,
+                        help='Weights file (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    tables = list(COMMODITY_TABLES.values()) if args.table == 'all' else [COMMODITY_TABLES[args.table]]
+    learned = learn_ensemble_weights(tables, args.horizon, args.min_train, args.from_dump)
+
+    # Keep plans of tables that were not re-learned this run
+    if args.table != 'all' and os.path.exists(args.output):
+        with open(args.output, encoding='utf-8') as f:
+            previous = json.load(f).get('series', {})
+        learned['series'] = {**previous, **learned['series']}
+
+    write_json_atomic(args.output, learned)
+
+    chosen = [plan['engine'] for plans in learned['series'].values() for plan in plans.values()]
+    summary = ', '.join(f"{engine}: {chosen.count(engine)}" for engine in sorted(set(chosen)))
+    print(f"Weights for {len(chosen)} series written to {args.output} ({summary})", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+Forecast Cache Module
+Thread-safe LRU cache for fitted forecasting models and their predictions
+Entries are evicted by count and by an approximate memory budget; fitted
+models count towards the entry limit only
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date
+
+import numpy as np
+
+from settings import ML_CACHE_ENABLED, ML_CACHE_MAX_ENTRIES, ML_CACHE_MAX_MB
+
+
+def series_fingerprint(series):
+    """
+    Hash a time series so that any change to its values produces a new key
+
+    Args:
+        series: List of (label, value) pairs or any JSON-serializable sequence
+
+    Returns:
+        Hex digest string
+    """
+    payload = json.dumps(series, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def make_cache_key(table, series_name, series, params):
+    """
+    Build a cache key from the source table, series name, data and engine parameters
+
+    Args:
+        table: Source table name (or None for ad-hoc data)
+        series_name: Commodity or currency name
+        series: Series passed to series_fingerprint
+        params: Dictionary of model parameters that affect the fit
+
+    Returns:
+        Hashable tuple
+    """
+    return (
+        table,
+        series_name,
+        series_fingerprint(series),
+        json.dumps(params, sort_keys=True, default=str)
+    )
+
+
+def _payload_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not part of a forecast payload")
+
+
+def estimate_size(value):
+    """
+    Approximate size of a cached forecast payload in bytes (its JSON length)
+
+    Values that are not plain payloads, such as fitted models, return 0:
+    they are bounded by the cache's entry count only, since neither pickling
+    them on every put nor a shallow sys.getsizeof gives a useful size.
+    """
+    try:
+        return len(json.dumps(value, default=_payload_default))
+    except (TypeError, ValueError):
+        return 0
+
+
+class ForecastCache:
+    """
+    LRU cache bounded by number of entries and total (estimated) size
+    """
+
+    def __init__(self, max_entries=ML_CACHE_MAX_ENTRIES, max_bytes=ML_CACHE_MAX_MB * 1024 * 1024,
+                 enabled=ML_CACHE_ENABLED):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key and mark it as recently used"""
+        if not self.enabled:
+            return default
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value, size=None):
+        """Store a value, evicting least recently used entries if over budget"""
+        if not self.enabled:
+            return
+        if size is None:
+            size = estimate_size(value)
+        if size > self.max_bytes:
+            # Never cache something that would flush the whole cache
+            return
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, computing and storing it on a miss
+
+        Concurrent callers asking for the same missing key wait for the first
+        computation instead of running it again.
+
+        Returns:
+            Tuple of (value, cache_hit)
+        """
+        if not self.enabled:
+            return compute(), False
+
+        while True:
+            with self._lock:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key], True
+                event = self._in_flight.get(key)
+                if event is None:
+                    self.misses += 1
+                    event = threading.Event()
+                    self._in_flight[key] = event
+                    break
+            event.wait()
+
+        try:
+            value = compute()
+            self.put(key, value)
+            return value, False
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            event.set()
+
+    def invalidate(self, predicate=None):
+        """Drop entries whose key matches predicate (all entries if None)"""
+        with self._lock:
+            for key in [k for k in self._entries if predicate is None or predicate(k)]:
+                self._total_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+
+    def clear(self):
+        self.invalidate()
+
+    def stats(self):
+        """Return cache usage statistics"""
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+    def _evict(self):
+        # Caller must hold the lock
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 self._total_bytes > self.max_bytes):
+            key, _ = self._entries.popitem(last=False)
+            self._total_bytes -= self._sizes.pop(key)
+            self.evictions += 1
+
+
+class JsonArtifact:
+    """
+    JSON file written by an offline job (learned weights, tuned parameters)
+    Parsed once and re-read whenever the file's modification time changes
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._mtime = None
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Current contents, or {} if the file is missing or unreadable"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return {}
+
+        with self._lock:
+            if self._mtime != mtime:
+                try:
+                    with open(self.path, encoding='utf-8') as f:
+                        self._data = json.load(f)
+                except (OSError, ValueError) as e:
+                    print(f"Could not read {self.path}: {e}")
+                    self._data = {}
+                self._mtime = mtime
+            return self._data
+
+
+def write_json_atomic(path, data):
+    """
+    Write JSON through a temporary file so readers never see a partial file
+
+    Every writer gets its own temporary file, so concurrent writers (e.g. an
+    offline job and the scheduler) cannot interleave; the last rename wins.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
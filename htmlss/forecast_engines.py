@@ -0,0 +1,247 @@
+"""
+Forecasting Engine Registry
+Fast pure-NumPy forecasting engines that can be selected per request
+alongside the Prophet / polynomial models
+
+Every engine takes the history y (shape (n,) or (series, n) to forecast
+several series at once) and returns a dictionary with:
+    'fitted':   one-step-ahead in-sample predictions (NaN where undefined)
+    'forecast': predictions for the next `periods` steps
+"""
+
+import numpy as np
+
+# name -> {'function': callable, 'description': str, 'accumulating_errors': bool}
+FORECAST_ENGINES = {}
+
+# Default smoothing parameters
+HOLT_WINTERS_PARAMS = {'alpha': 0.4, 'beta': 0.1, 'gamma': 0.2}
+DAMPED_TREND_PARAMS = {'alpha': 0.5, 'beta': 0.1, 'phi': 0.9}
+
+
+def register_engine(name, description, accumulating_errors=False):
+    """
+    Decorator registering a forecasting engine under `name`
+
+    accumulating_errors marks engines that forecast from their last filtered
+    state (random-walk-like), whose one-step errors add up over the horizon.
+    """
+    def decorator(function):
+        FORECAST_ENGINES[name] = {'function': function, 'description': description,
+                                  'accumulating_errors': accumulating_errors}
+        return function
+    return decorator
+
+
+def run_engine(name, y, periods, season_length=None):
+    """
+    Run a registered engine
+
+    Args:
+        name: Engine name (see FORECAST_ENGINES)
+        y: History, shape (n,) or (series, n)
+        periods: Number of steps to forecast
+        season_length: Observations per seasonal cycle (e.g. 4 for quarters), or None
+
+    Returns:
+        Dictionary with 'fitted' and 'forecast' arrays
+    """
+    if name not in FORECAST_ENGINES:
+        raise ValueError(f"Unknown forecasting engine: {name}")
+    y = np.asarray(y, dtype=float)
+    return FORECAST_ENGINES[name]['function'](y, periods, season_length)
+
+
+def engine_description(name):
+    return FORECAST_ENGINES[name]['description']
+
+
+def engine_accumulates_errors(name):
+    """Whether bootstrap intervals of the engine should accumulate errors over the horizon"""
+    return FORECAST_ENGINES[name]['accumulating_errors']
+
+
+def fit_metrics(y, fitted):
+    """
+    In-sample performance of one-step-ahead predictions (same keys as
+    CommodityPredictor.get_model_performance)
+    """
+    y = np.asarray(y, dtype=float)
+    fitted = np.asarray(fitted, dtype=float)
+    mask = ~np.isnan(fitted)
+    if mask.sum() < 2:
+        return None
+    residuals = y[mask] - fitted[mask]
+    ss_tot = ((y[mask] - y[mask].mean()) ** 2).sum()
+    r2 = 1 - (residuals ** 2).sum() / ss_tot if ss_tot > 0 else 0.0
+    return {
+        'r2_score': round(float(r2), 3),
+        'mean_absolute_error': round(float(np.abs(residuals).mean()), 2),
+        'model_accuracy': round(float(r2) * 100, 1)
+    }
+
+
+@register_engine('seasonal_naive', 'Seasonal Naive', accumulating_errors=True)
+def seasonal_naive(y, periods, season_length=None):
+    """Repeat the last observed season (last value if no seasonality)"""
+    n = y.shape[-1]
+    m = season_length if season_length and n >= season_length else 1
+
+    fitted = np.full(y.shape, np.nan)
+    fitted[..., m:] = y[..., :-m]
+
+    idx = n - m + (np.arange(periods) % m)
+    return {'fitted': fitted, 'forecast': y[..., idx]}
+
+
+@register_engine('holt_winters', 'Holt-Winters Exponential Smoothing', accumulating_errors=True)
+def holt_winters(y, periods, season_length=None, alpha=None, beta=None, gamma=None):
+    """
+    Additive Holt-Winters (ETS(A,A,A)); Holt's linear trend when there is no
+    seasonality or fewer than two full seasons of history
+    """
+    alpha = HOLT_WINTERS_PARAMS['alpha'] if alpha is None else alpha
+    beta = HOLT_WINTERS_PARAMS['beta'] if beta is None else beta
+    gamma = HOLT_WINTERS_PARAMS['gamma'] if gamma is None else gamma
+
+    n = y.shape[-1]
+    m = season_length if season_length and n >= 2 * season_length else 0
+    fitted = np.full(y.shape, np.nan)
+
+    if m:
+        level = y[..., :m].mean(axis=-1)
+        trend = (y[..., m:2 * m].mean(axis=-1) - level) / m
+        season = y[..., :m] - level[..., None]
+        start = m
+    else:
+        if n < 2:
+            forecast = np.repeat(y[..., -1:], periods, axis=-1)
+            return {'fitted': fitted, 'forecast': forecast}
+        level = y[..., 0]
+        trend = y[..., 1] - y[..., 0]
+        season = np.zeros(y.shape[:-1] + (1,))
+        start = 1
+
+    season = season.copy()
+    for t in range(start, n):
+        s = season[..., t % m] if m else 0.0
+        fitted[..., t] = level + trend + s
+        previous_level = level
+        level = alpha * (y[..., t] - s) + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous_level) + (1 - beta) * trend
+        if m:
+            season[..., t % m] = gamma * (y[..., t] - level) + (1 - gamma) * s
+
+    steps = np.arange(1, periods + 1)
+    forecast = level[..., None] + trend[..., None] * steps
+    if m:
+        forecast = forecast + season[..., (n + steps - 1) % m]
+    return {'fitted': fitted, 'forecast': forecast}
+
+
+@register_engine('damped_trend', 'Damped Trend Exponential Smoothing', accumulating_errors=True)
+def damped_trend(y, periods, season_length=None, alpha=None, beta=None, phi=None):
+    """Holt's linear method with a damped trend (Gardner & McKenzie)"""
+    alpha = DAMPED_TREND_PARAMS['alpha'] if alpha is None else alpha
+    beta = DAMPED_TREND_PARAMS['beta'] if beta is None else beta
+    phi = DAMPED_TREND_PARAMS['phi'] if phi is None else phi
+
+    n = y.shape[-1]
+    fitted = np.full(y.shape, np.nan)
+    if n < 2:
+        return {'fitted': fitted, 'forecast': np.repeat(y[..., -1:], periods, axis=-1)}
+
+    level = y[..., 0]
+    trend = y[..., 1] - y[..., 0]
+    for t in range(1, n):
+        fitted[..., t] = level + phi * trend
+        previous_level = level
+        level = alpha * y[..., t] + (1 - alpha) * (level + phi * trend)
+        trend = beta * (level - previous_level) + (1 - beta) * phi * trend
+
+    # Sum of phi^1..phi^h for each horizon step
+    damping = np.cumsum(phi ** np.arange(1, periods + 1))
+    forecast = level[..., None] + trend[..., None] * damping
+    return {'fitted': fitted, 'forecast': forecast}
+
+
+def local_linear_trend_variances(y, slope_lag=None):
+    """
+    Moment estimates of the local linear trend noise variances
+
+    The lag-k second difference y[t] - 2 y[t-k] + y[t-2k] has variance
+    zeta * k (2k^2 + 1) / 3 + 2k * eta + 6 * eps. At k = 1 its autocovariances
+    g1 = -eta - 4 eps and g2 = eps give eta and eps; zeta is tiny next to
+    them there, so it is read off a long lag instead, where it dominates.
+    Estimates are floored at a small positive value so the filter stays proper.
+
+    Args:
+        y: History, shape (n,) or (series, n)
+        slope_lag: Lag k used for zeta (default: n // 8, at most 60)
+
+    Returns:
+        Tuple of (observation, level, slope) noise variance arrays, one value per series
+    """
+    n = y.shape[-1]
+    d2 = np.diff(y, n=2, axis=-1)
+    d2 = d2 - d2.mean(axis=-1, keepdims=True)
+    g0 = (d2 * d2).mean(axis=-1)
+    g1 = (d2[..., 1:] * d2[..., :-1]).sum(axis=-1) / d2.shape[-1]
+    g2 = (d2[..., 2:] * d2[..., :-2]).sum(axis=-1) / d2.shape[-1]
+
+    floor = np.maximum(g0, 1e-12) * 1e-9
+    eps = np.maximum(g2, floor)
+    eta = np.maximum(-g1 - 4 * eps, floor)
+
+    k = slope_lag or max(1, min(n // 8, 60))
+    dk = y[..., 2 * k:] - 2 * y[..., k:-k] + y[..., :-2 * k]
+    zeta = (dk.var(axis=-1) - 2 * k * eta - 6 * eps) / (k * (2 * k * k + 1) / 3)
+    return eps, eta, np.maximum(zeta, floor)
+
+
+@register_engine('local_linear_trend', 'Local Linear Trend (Kalman Filter)', accumulating_errors=True)
+def local_linear_trend(y, periods, season_length=None):
+    """
+    Local linear trend state-space model
+        y[t] = level[t] + eps,  level[t+1] = level[t] + slope[t] + eta,  slope[t+1] = slope[t] + zeta
+
+    One Kalman filter pass over time (vectorized over series) gives the
+    one-step predictions and the final state. Forecast variances are analytic.
+
+    Returns:
+        The usual 'fitted' and 'forecast' plus 'forecast_std' (standard
+        deviation of each forecast observation)
+    """
+    n = y.shape[-1]
+    fitted = np.full(y.shape, np.nan)
+    if n < 5:
+        forecast = np.repeat(y[..., -1:], periods, axis=-1)
+        return {'fitted': fitted, 'forecast': forecast, 'forecast_std': np.zeros(forecast.shape)}
+
+    eps, eta, zeta = local_linear_trend_variances(y)
+
+    # t = 0 starts from the first observation and first difference
+    level = y[..., 0]
+    slope = y[..., 1] - y[..., 0]
+    p11 = eps
+    p12 = np.zeros(eps.shape)
+    p22 = (y.var(axis=-1) + 1.0) * 1e4  # diffuse slope
+    for t in range(1, n):
+        # Predict t from t - 1
+        level = level + slope
+        p11, p12, p22 = p11 + 2 * p12 + p22 + eta, p12 + p22, p22 + zeta
+        fitted[..., t] = level
+        # Update with y[t]
+        f = p11 + eps
+        k1, k2 = p11 / f, p12 / f
+        v = y[..., t] - level
+        level, slope = level + k1 * v, slope + k2 * v
+        p11, p12, p22 = p11 - k1 * p11, p12 - k1 * p12, p22 - k2 * p12
+
+    # h steps ahead: level + h * slope with variance
+    # p11 + 2h p12 + h^2 p22 + h eta + zeta (h-1)h(2h-1)/6, plus eps for the observation
+    h = np.arange(1, periods + 1)
+    forecast = level[..., None] + slope[..., None] * h
+    variance = (p11[..., None] + 2 * h * p12[..., None] + h * h * p22[..., None] + h * eta[..., None]
+                + zeta[..., None] * (h - 1) * h * (2 * h - 1) / 6 + eps[..., None])
+    return {'fitted': fitted, 'forecast': forecast, 'forecast_std': np.sqrt(variance)}
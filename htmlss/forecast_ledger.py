@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Forecast Ledger
+Records every computed forecast (series, engine, as-of period, horizon,
+predicted value, interval and compute time) in the forecast_ledger table,
+scores the records against actuals once they are ingested, and summarizes
+error and cost per engine
+
+Forecasts are written by a background thread so recording never slows a
+request; failures (e.g. no database) are printed and the records dropped.
+The first run that forecasts a target from an as-of period is kept: later
+runs of the same series, engine and as-of period (e.g. after a restart)
+leave its record, run_id and compute time as they were.
+
+Usage:
+    python forecast_ledger.py [score|summary]
+"""
+
+import os
+import queue
+import sys
+import threading
+import uuid
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+
+from db import get_db_connection
+from settings import FORECAST_LEDGER_ENABLED
+
+LEDGER_TABLE = 'forecast_ledger'
+
+CREATE_LEDGER_TABLE = f"""
+CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    run_id CHAR(32) NOT NULL,
+    series_type VARCHAR(16) NOT NULL,
+    source VARCHAR(64) NOT NULL,
+    series VARCHAR(255) NOT NULL,
+    engine VARCHAR(64) NOT NULL,
+    method VARCHAR(128),
+    as_of VARCHAR(10) NOT NULL,
+    target VARCHAR(10) NOT NULL,
+    horizon INT NOT NULL,
+    predicted DOUBLE NOT NULL,
+    lower_bound DOUBLE,
+    upper_bound DOUBLE,
+    compute_seconds DOUBLE,
+    actual DOUBLE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    scored_at TIMESTAMP NULL,
+    UNIQUE KEY forecast_target (series_type, source, series, engine, as_of, target),
+    KEY unscored (actual, series_type)
+)
+"""
+
+_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+_table_ready = False
+
+
+def ensure_ledger_table(conn):
+    """Create the ledger table once per process"""
+    global _table_ready
+    if _table_ready:
+        return
+    cursor = conn.cursor()
+    try:
+        cursor.execute(CREATE_LEDGER_TABLE)
+        conn.commit()
+    finally:
+        cursor.close()
+    _table_ready = True
+
+
+def _write_rows(rows):
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(
+            f"INSERT INTO {LEDGER_TABLE} (run_id, series_type, source, series, engine, method, as_of, target, "
+            "horizon, predicted, lower_bound, upper_bound, compute_seconds) "
+            "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) "
+            "ON DUPLICATE KEY UPDATE id = id",
+            rows
+        )
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def _drain():
+    while True:
+        rows = _queue.get()
+        # Batch whatever else is waiting
+        while not _queue.empty():
+            rows.extend(_queue.get())
+        try:
+            if not _table_ready:
+                conn = get_db_connection()
+                try:
+                    ensure_ledger_table(conn)
+                finally:
+                    conn.close()
+            _write_rows(rows)
+        except Exception as e:
+            print(f"Could not write {len(rows)} forecast ledger records: {e}")
+
+
+def record_forecast(series_type, source, series, engine, method, as_of, targets, predicted,
+                    lower=None, upper=None, compute_seconds=None):
+    """
+    Queue one forecast run for the ledger
+
+    Args:
+        series_type: 'commodity' or 'currency'
+        source: Where actuals come from (commodity table or currency code)
+        series: Series name (commodity name or currency code)
+        engine: Engine that produced the forecast
+        method: Human-readable method description
+        as_of: Last observed period ('2025Q1' or '2025-09-19')
+        targets: Forecast periods ('2025Q2' or '2026-01'); horizon is their position
+        predicted: Predicted value per target
+        lower, upper: Interval bounds per target, or None
+        compute_seconds: Time spent producing the forecast
+    """
+    if not FORECAST_LEDGER_ENABLED or not targets:
+        return
+    global _writer
+
+    run_id = uuid.uuid4().hex
+    lower = lower if lower is not None else [None] * len(targets)
+    upper = upper if upper is not None else [None] * len(targets)
+    rows = [
+        (run_id, series_type, source, series, engine, method, as_of, target, horizon,
+         float(value), None if low is None else float(low), None if high is None else float(high),
+         compute_seconds)
+        for horizon, (target, value, low, high) in enumerate(zip(targets, predicted, lower, upper), start=1)
+    ]
+
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_drain, name='forecast-ledger', daemon=True)
+            _writer.start()
+    _queue.put(rows)
+
+
+def _commodity_actuals(table_name):
+    """(commodity, quarter) -> value for every observation in a commodity table"""
+    from commodity_data import load_commodity_table, series_records
+
+    quarters, commodities, values = load_commodity_table(table_name)
+    return {(commodity, record['quarter']): float(record['value'])
+            for commodity, row in zip(commodities, values)
+            for record in series_records(quarters, row)}
+
+
+def _currency_actuals(currency_code):
+    """(currency, 'YYYY-MM') -> average rate for every complete month of a currency file"""
+    from currency_analysis import load_currency_data
+
+    df = load_currency_data(currency_code)
+    if df is None or df.empty:
+        return {}
+    months = df['post_date'].dt.to_period('M')
+    monthly = df.groupby(months)['average_rate'].mean()
+    # The last month is complete only if its last day has been posted
+    last_date = df['post_date'].max()
+    if last_date < months.max().to_timestamp(how='end').normalize():
+        monthly = monthly.iloc[:-1]
+    return {(currency_code, str(month)): float(rate) for month, rate in monthly.items()}
+
+
+def score_forecast_ledger():
+    """
+    Fill in actuals for ledger records whose target period has been ingested
+
+    Returns:
+        Number of records scored
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        ensure_ledger_table(conn)
+        cursor.execute(f"SELECT id, series_type, source, series, target FROM {LEDGER_TABLE} "
+                       "WHERE actual IS NULL")
+        pending = cursor.fetchall()
+
+        actuals = {}
+        updates = []
+        for row_id, series_type, source, series, target in pending:
+            if (series_type, source) not in actuals:
+                try:
+                    loader = _commodity_actuals if series_type == 'commodity' else _currency_actuals
+                    actuals[(series_type, source)] = loader(source)
+                except Exception as e:
+                    print(f"Could not load actuals for {series_type} {source}: {e}")
+                    actuals[(series_type, source)] = {}
+            actual = actuals[(series_type, source)].get((series, target))
+            if actual is not None:
+                updates.append((actual, row_id))
+
+        if updates:
+            cursor.executemany(f"UPDATE {LEDGER_TABLE} SET actual = %s, scored_at = NOW() WHERE id = %s",
+                               updates)
+            conn.commit()
+        return len(updates)
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def ledger_summary(series_type=None):
+    """
+    Error and cost per engine
+
+    Args:
+        series_type: Restrict to 'commodity' or 'currency' (None for both)
+
+    Returns:
+        List of dictionaries with forecast counts, MAE, MAPE, interval
+        coverage and mean compute time per forecast run, by series type and engine
+    """
+    where = "WHERE series_type = %s" if series_type else ""
+    params = (series_type, series_type) if series_type else ()
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        ensure_ledger_table(conn)
+        cursor.execute(
+            f"""
+            SELECT e.series_type, e.engine, e.forecasts, e.scored, e.mae, e.mape, e.coverage,
+                   c.runs, c.mean_seconds, c.total_seconds
+            FROM (
+                SELECT series_type, engine,
+                       COUNT(*) AS forecasts,
+                       COUNT(actual) AS scored,
+                       AVG(ABS(predicted - actual)) AS mae,
+                       AVG(ABS(predicted - actual) / NULLIF(ABS(actual), 0)) * 100 AS mape,
+                       AVG(CASE WHEN actual IS NULL OR lower_bound IS NULL THEN NULL
+                                WHEN actual BETWEEN lower_bound AND upper_bound THEN 1 ELSE 0 END) AS coverage
+                FROM {LEDGER_TABLE} {where}
+                GROUP BY series_type, engine
+            ) e
+            JOIN (
+                SELECT series_type, engine, COUNT(*) AS runs,
+                       AVG(compute_seconds) AS mean_seconds, SUM(compute_seconds) AS total_seconds
+                FROM (SELECT DISTINCT run_id, series_type, engine, compute_seconds
+                      FROM {LEDGER_TABLE} {where}) r
+                GROUP BY series_type, engine
+            ) c ON c.series_type = e.series_type AND c.engine = e.engine
+            ORDER BY e.series_type, e.mape IS NULL, e.mape
+            """,
+            params
+        )
+        columns = [desc[0] for desc in cursor.description]
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+        conn.close()
+
+    def number(value, digits=4):
+        return round(float(value), digits) if value is not None else None
+
+    summary = []
+    for row in rows:
+        entry = dict(zip(columns, row))
+        summary.append({
+            'series_type': entry['series_type'],
+            'engine': entry['engine'],
+            'forecasts': int(entry['forecasts']),
+            'scored': int(entry['scored']),
+            'mae': number(entry['mae']),
+            'mape': number(entry['mape'], 2),
+            'interval_coverage': number(entry['coverage'], 3),
+            'runs': int(entry['runs']),
+            'mean_compute_seconds': number(entry['mean_seconds']),
+            'total_compute_seconds': number(entry['total_seconds'], 2)
+        })
+    return summary
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Score and summarize the forecast ledger')
+    parser.add_argument('command', choices=['score', 'summary'], nargs='?', default='score')
+    args = parser.parse_args(argv)
+
+    if args.command == 'score':
+        print(f"Scored {score_forecast_ledger()} forecast ledger records", file=sys.stderr)
+    else:
+        print(pd.DataFrame(ledger_summary()).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
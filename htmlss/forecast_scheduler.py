@@ -0,0 +1,186 @@
+"""
+Forecast Precompute Scheduler
+Computes every commodity and currency forecast in a background thread at
+startup and again whenever the commodity tables or currency CSV files change,
+so the forecast endpoints only look results up
+
+Only one process per machine precomputes: the scheduler of every web worker
+waits for an exclusive lock on FORECAST_SCHEDULER_LOCK_FILE, and the worker
+holding it does the work (another one takes over if it exits). Fitted models
+reach the other workers through the on-disk model store.
+"""
+
+import copy
+import os
+import threading
+import time
+from datetime import datetime
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+from settings import (FORECAST_PRECOMPUTE_ENABLED, FORECAST_REFRESH_INTERVAL, FORECAST_LEDGER_ENABLED,
+                      FORECAST_SCHEDULER_LOCK_FILE)
+from forecast_cache import series_fingerprint
+from commodity_data import COMMODITY_TABLES, load_commodity_table, series_records
+from ml_predictions import generate_ml_predictions
+from currency_analysis import AVAILABLE_CURRENCIES, currency_file_fingerprint
+from currency_forecasting import get_cached_forecast
+from forecast_ledger import score_forecast_ledger
+
+
+class ForecastScheduler:
+    """
+    Background precompute of all forecasts with change detection
+
+    Commodity forecasts are precomputed through generate_ml_predictions, which
+    leaves the fitted models in its content-keyed cache; the timeline endpoints
+    then hit that cache. When a table changes only the commodities whose own
+    series changed are refitted (warm-started from their previous fit).
+    Currency forecasts are stored here together with the fingerprint of the
+    CSV they were computed from and are only served while the file is
+    unchanged.
+    """
+
+    def __init__(self, interval=FORECAST_REFRESH_INTERVAL):
+        self.interval = interval
+        self._table_fingerprints = {}
+        self._series_fingerprints = {}
+        self._currency_forecasts = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock_file = None
+        self.last_refresh = None
+
+    def start(self):
+        """Start the background thread (no-op if already running)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='forecast-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _acquire_lock(self):
+        """Try to take the machine-wide scheduler lock (held until the process exits)"""
+        if not FCNTL_AVAILABLE:
+            return True
+        try:
+            if self._lock_file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(FORECAST_SCHEDULER_LOCK_FILE)), exist_ok=True)
+                self._lock_file = open(FORECAST_SCHEDULER_LOCK_FILE, 'a')
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+
+    def _run(self):
+        # Another worker precomputes while it holds the lock
+        while not self._stop.is_set() and not self._acquire_lock():
+            self._stop.wait(self.interval)
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def refresh(self):
+        """Recompute forecasts for every source that changed since the last pass"""
+        started = time.time()
+        changed = False
+        for table_name in COMMODITY_TABLES.values():
+            try:
+                changed = self.refresh_commodity_table(table_name) or changed
+            except Exception as e:
+                print(f"Forecast precompute failed for {table_name}: {e}")
+        for code in AVAILABLE_CURRENCIES:
+            try:
+                changed = self.refresh_currency(code) or changed
+            except Exception as e:
+                print(f"Forecast precompute failed for {code}: {e}")
+        
+        # New data may contain actuals for earlier forecasts
+        if changed and FORECAST_LEDGER_ENABLED:
+            try:
+                scored = score_forecast_ledger()
+                if scored:
+                    print(f"Scored {scored} forecast ledger records")
+            except Exception as e:
+                print(f"Forecast ledger scoring failed: {e}")
+        self.last_refresh = datetime.now()
+        print(f"Forecast precompute pass finished in {time.time() - started:.1f}s")
+
+    def refresh_commodity_table(self, table_name):
+        quarters, commodities, values = load_commodity_table(table_name)
+        fingerprint = series_fingerprint({
+            'quarters': quarters,
+            'commodities': commodities,
+            'values': values.tolist()
+        })
+        if self._table_fingerprints.get(table_name) == fingerprint:
+            return False
+
+        refitted = 0
+        for commodity, row in zip(commodities, values):
+            records = series_records(quarters, row)
+            if not records:
+                continue
+            series_id = (table_name, commodity)
+            series_fp = series_fingerprint(records)
+            if self._series_fingerprints.get(series_id) == series_fp:
+                continue
+            generate_ml_predictions(records, commodity, table=table_name)
+            self._series_fingerprints[series_id] = series_fp
+            refitted += 1
+        self._table_fingerprints[table_name] = fingerprint
+        print(f"Refitted {refitted} of {len(commodities)} series in {table_name}")
+        return True
+
+    def refresh_currency(self, code):
+        fingerprint = currency_file_fingerprint(code)
+        if fingerprint is None:
+            return False
+        with self._lock:
+            stored = self._currency_forecasts.get(code)
+        if stored is not None and stored[0] == fingerprint:
+            return False
+
+        forecast = get_cached_forecast(code)
+        if forecast and 'error' not in forecast:
+            with self._lock:
+                self._currency_forecasts[code] = (fingerprint, forecast)
+        return True
+
+    def get_currency_forecast(self, code):
+        """
+        Return a copy of the precomputed forecast for a currency, or None
+        if it is missing or its CSV changed since it was computed
+        """
+        with self._lock:
+            stored = self._currency_forecasts.get(code)
+        if stored is None or stored[0] != currency_file_fingerprint(code):
+            return None
+        return copy.deepcopy(stored[1])
+
+    def get_all_currency_forecasts(self):
+        """Return precomputed forecasts for all currencies, or None if any is missing or stale"""
+        results = {}
+        for code in AVAILABLE_CURRENCIES:
+            forecast = self.get_currency_forecast(code)
+            if forecast is None:
+                return None
+            results[code] = forecast
+        return results
+
+
+forecast_scheduler = ForecastScheduler()
+
+
+def start_forecast_scheduler():
+    """Start background precompute if enabled in configuration"""
+    if FORECAST_PRECOMPUTE_ENABLED:
+        forecast_scheduler.start()
@@ -0,0 +1,112 @@
+"""
+GDP Data Module
+Loads the quarterly gdp_main (sector) and gdp_details (subsector) tables as
+aligned numeric matrices
+"""
+
+import csv
+import os
+
+import numpy as np
+from db import get_db_connection
+
+GDP_TABLES = ('gdp_main', 'gdp_details')
+
+# CSV files loaded into the tables by create_gdp_tables.py (used by offline jobs)
+GDP_CSV_FILES = {
+    'gdp_main': os.path.join(os.path.dirname(__file__), 'gdp', 'gdp_main.csv'),
+    'gdp_details': os.path.join(os.path.dirname(__file__), 'gdp', 'details_gdp.csv')
+}
+
+
+def load_gdp_table(table_name):
+    """
+    Load every row of a GDP table
+
+    Args:
+        table_name: 'gdp_main' or 'gdp_details'
+
+    Returns:
+        Tuple of (quarters, codes, items, values) where quarters are labels
+        like '2020Q1', codes the sector Code_No of each row and values a
+        rows x quarters float array
+    """
+    if table_name not in GDP_TABLES:
+        raise ValueError(f"Unknown GDP table: {table_name}")
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"SELECT * FROM {table_name} ORDER BY Code_No, id")
+        rows = cursor.fetchall()
+        columns = [desc[0] for desc in cursor.description]
+    finally:
+        cursor.close()
+        conn.close()
+
+    # Quarter columns are stored as Q2020Q1, Q2020Q2, ...
+    quarter_columns = [col for col in columns if col.startswith('Q20')]
+    quarter_idx = [columns.index(col) for col in quarter_columns]
+    code_idx = columns.index('Code_No')
+    items_idx = columns.index('items')
+
+    values = np.array([
+        [float(row[i]) if row[i] is not None else 0.0 for i in quarter_idx]
+        for row in rows
+    ]).reshape(len(rows), len(quarter_columns))
+
+    return ([col[1:] for col in quarter_columns],
+            [int(row[code_idx]) for row in rows],
+            [row[items_idx].strip() for row in rows],
+            values)
+
+
+def load_gdp_table_from_csv(table_name):
+    """
+    Same as load_gdp_table but reads the source CSV files in gdp/, so offline
+    jobs can run without a database server
+    """
+    from create_gdp_tables import clean_number
+
+    if table_name not in GDP_TABLES:
+        raise ValueError(f"Unknown GDP table: {table_name}")
+
+    with open(GDP_CSV_FILES[table_name], 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        quarters = [col for col in reader.fieldnames if col not in ('Code_No', 'items')]
+        rows = list(reader)
+
+    values = np.array([[clean_number(row[q]) for q in quarters] for row in rows]).reshape(len(rows), len(quarters))
+    return (quarters,
+            [int(row['Code_No']) for row in rows],
+            [row['items'].strip() for row in rows],
+            values)
+
+
+def gdp_tables_version():
+    """
+    Identify the currently loaded version of the GDP tables
+
+    create_gdp_tables.py drops and recreates both tables, so their creation
+    (and update) times change whenever the data is reloaded.
+
+    Returns:
+        Tuple of (table, create_time, update_time) entries, or None if the
+        information schema cannot be read
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT TABLE_NAME, CREATE_TIME, UPDATE_TIME FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN (%s, %s) ORDER BY TABLE_NAME",
+            GDP_TABLES
+        )
+        rows = cursor.fetchall()
+    except Exception as e:
+        print(f"Could not read GDP table versions: {e}")
+        return None
+    finally:
+        cursor.close()
+        conn.close()
+    return tuple((name, str(created), str(updated)) for name, created, updated in rows) or None
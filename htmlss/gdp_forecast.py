@@ -0,0 +1,171 @@
+"""
+GDP Sector Forecasting
+Forecasts every gdp_details subsector and every gdp_main sector in one
+vectorized batch and reconciles the subsectors so that, for every forecast
+quarter, they sum to the forecast of their gdp_main sector
+
+Reconciliation is top-down proportional: each subsector keeps its share of
+the sum of its sector's subsector forecasts, and that sum is scaled to the
+sector forecast. Bounds are scaled by the same factor.
+"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+from forecast_cache import ForecastCache, series_fingerprint
+from forecast_engines import FORECAST_ENGINES, run_engine, engine_description, engine_accumulates_errors
+from prediction_intervals import bootstrap_intervals
+from gdp_data import load_gdp_table, gdp_tables_version
+
+DEFAULT_GDP_ENGINE = 'holt_winters'
+
+# Forecasts keyed by (GDP tables version, engine, horizon)
+gdp_forecast_cache = ForecastCache(max_entries=32)
+
+
+def reconcile_top_down(sector_forecast, sub_forecast, sub_codes, sector_codes, history_shares):
+    """
+    Scale subsector forecasts so each sector's subsectors sum to its forecast
+
+    Args:
+        sector_forecast: Array (sectors, horizon)
+        sub_forecast: Array (subsectors, horizon)
+        sub_codes: Sector code of every subsector
+        sector_codes: Code of every sector row
+        history_shares: Share of every subsector in its sector over the last
+            year, used where a sector's subsector forecasts sum to <= 0
+
+    Returns:
+        Tuple of (reconciled subsector forecasts, scale factor per subsector and quarter)
+    """
+    sector_row = {code: i for i, code in enumerate(sector_codes)}
+    rows = np.array([sector_row.get(code, -1) for code in sub_codes])
+    matched = rows >= 0
+
+    # Sum of subsector forecasts per sector: (sectors, horizon)
+    group_sums = np.zeros(sector_forecast.shape)
+    np.add.at(group_sums, rows[matched], np.clip(sub_forecast[matched], 0, None))
+
+    reconciled = sub_forecast.copy()
+    scale = np.ones(sub_forecast.shape)
+    sums = group_sums[rows[matched]]
+    targets = sector_forecast[rows[matched]]
+    positive = sums > 0
+    clipped = np.clip(sub_forecast[matched], 0, None)
+    reconciled[matched] = np.where(positive, clipped / np.where(positive, sums, 1) * targets,
+                                   history_shares[matched, None] * targets)
+    scale[matched] = np.where(positive, targets / np.where(positive, sums, 1), 1.0)
+    return reconciled, scale
+
+
+def forecast_gdp(main, details, horizon=4, engine=DEFAULT_GDP_ENGINE):
+    """
+    Forecast all GDP sectors and subsectors and reconcile them
+
+    Args:
+        main: (quarters, codes, items, values) of gdp_main
+        details: (quarters, codes, items, values) of gdp_details
+        horizon: Number of quarters to forecast
+        engine: Registered forecasting engine (see forecast_engines)
+
+    Returns:
+        Dictionary with forecast quarters and per-sector results
+    """
+    quarters, sector_codes, sector_names, sector_values = main
+    _, sub_codes, sub_names, sub_values = details
+    n_sectors = len(sector_codes)
+
+    # One batch for sectors and subsectors: (sectors + subsectors, quarters)
+    values = np.vstack([sector_values, sub_values])
+    result = run_engine(engine, values, horizon, season_length=4)
+    point = result['forecast']
+    lower, upper = bootstrap_intervals(point, values - result['fitted'],
+                                       accumulate=engine_accumulates_errors(engine))
+
+    # Each subsector's share of its sector over the last four quarters
+    last_year = sub_values[:, -4:].sum(axis=1)
+    sector_totals = {code: 0.0 for code in sector_codes}
+    for code, total in zip(sub_codes, last_year):
+        sector_totals[code] = sector_totals.get(code, 0.0) + total
+    history_shares = np.array([
+        total / sector_totals[code] if sector_totals.get(code) else 0.0
+        for code, total in zip(sub_codes, last_year)
+    ])
+
+    sector_point = point[:n_sectors]
+    sub_point, scale = reconcile_top_down(sector_point, point[n_sectors:], sub_codes, sector_codes,
+                                          history_shares)
+    # Move each band with its reconciled point (scaled like the point where it
+    # was scaled), keeping it around the point where the fallback shares replaced it
+    sub_raw = point[n_sectors:]
+    sub_lower = np.minimum(sub_point + (lower[n_sectors:] - sub_raw) * scale, sub_point)
+    sub_upper = np.maximum(sub_point + (upper[n_sectors:] - sub_raw) * scale, sub_point)
+
+    last_quarter = pd.Period(quarters[-1], freq='Q')
+    forecast_quarters = [str(last_quarter + i + 1) for i in range(horizon)]
+
+    def rounded(row):
+        return [round(float(v), 2) for v in row]
+
+    sectors = []
+    for i, (code, name) in enumerate(zip(sector_codes, sector_names)):
+        subsectors = []
+        for j in np.flatnonzero(np.array(sub_codes) == code):
+            subsectors.append({
+                'subsector': sub_names[j],
+                'forecast': rounded(sub_point[j]),
+                'unreconciled_forecast': rounded(point[n_sectors + j]),
+                'lower_bound': rounded(sub_lower[j]),
+                'upper_bound': rounded(sub_upper[j]),
+                'last_value': float(sub_values[j, -1])
+            })
+        sectors.append({
+            'code': code,
+            'sector': name,
+            'forecast': rounded(sector_point[i]),
+            'lower_bound': rounded(lower[i]),
+            'upper_bound': rounded(upper[i]),
+            'last_value': float(sector_values[i, -1]),
+            'subsectors': subsectors
+        })
+
+    return {
+        'quarters': list(quarters),
+        'forecast_quarters': forecast_quarters,
+        'engine': engine,
+        'method': engine_description(engine),
+        'reconciliation': 'Top-down proportional (subsectors sum to gdp_main sector forecasts)',
+        'sectors': sectors
+    }
+
+
+def get_gdp_forecast(horizon=4, engine=DEFAULT_GDP_ENGINE):
+    """
+    Reconciled GDP forecast, cached until create_gdp_tables.py reloads the tables
+
+    Returns:
+        Forecast dictionary (see forecast_gdp) with a 'cached' flag
+    """
+    if engine not in FORECAST_ENGINES:
+        raise ValueError(f"Unknown forecasting engine: {engine}")
+
+    version = gdp_tables_version()
+    data = None
+    if version is None:
+        # No table metadata available: key on the table contents instead
+        data = (load_gdp_table('gdp_main'), load_gdp_table('gdp_details'))
+        version = series_fingerprint([[table[0], table[1], table[2], table[3].tolist()] for table in data])
+    else:
+        # Drop forecasts of previous loads of the tables
+        gdp_forecast_cache.invalidate(lambda key: key[0] != version)
+
+    def compute():
+        main, details = data or (load_gdp_table('gdp_main'), load_gdp_table('gdp_details'))
+        return forecast_gdp(main, details, horizon, engine)
+
+    forecast, cache_hit = gdp_forecast_cache.get_or_compute((version, engine, horizon), compute)
+    forecast = copy.deepcopy(forecast)
+    forecast['cached'] = cache_hit
+    return forecast
@@ -0,0 +1,186 @@
+"""
+Joint Multi-Currency Forecasting
+Vector autoregression on daily log-returns of all currencies, fitted in one
+least-squares solve with NumPy, so co-moving currencies are forecast
+consistently (shared shocks enter through the residual covariance)
+
+The VAR is fitted on the business days every currency was posted. Forecasts
+start from the last such day; a currency with later observations has its
+path shifted to its own last rate and its interval counted from that date.
+Weekends repeat Friday's forecast, as no rates are posted on them.
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from prediction_intervals import INTERVAL_WIDTH
+
+JOINT_ENGINE = 'joint'
+MAX_VAR_LAGS = 5
+
+
+def align_log_rates(frames):
+    """
+    Log average rates of all currencies on their common posting dates
+
+    Args:
+        frames: Dictionary of currency code -> DataFrame with post_date and average_rate
+
+    Returns:
+        Tuple of (codes, dates, log rates array (dates, currencies))
+    """
+    codes = list(frames)
+    # Some dates are posted twice; average them
+    series = [frames[code].groupby('post_date')['average_rate'].mean() for code in codes]
+    wide = pd.concat(series, axis=1, join='inner', keys=codes).sort_index()
+    return codes, wide.index, np.log(wide.to_numpy(dtype=float))
+
+
+def _lagged_design(returns, lags, offset):
+    """Regressors [1, r(t-1), ..., r(t-lags)] for t = offset..n-1"""
+    n = len(returns)
+    columns = [np.ones((n - offset, 1))]
+    columns += [returns[offset - j:n - j] for j in range(1, lags + 1)]
+    return np.hstack(columns)
+
+
+def fit_var(returns, max_lags=MAX_VAR_LAGS):
+    """
+    Fit a VAR(p) with intercept by least squares, choosing p by AIC
+
+    Args:
+        returns: Array (observations, series)
+        max_lags: Largest lag order considered
+
+    Returns:
+        Dictionary with intercept (series,), coefs (lags, series, series)
+        where coefs[j] multiplies r(t-j-1), residual covariance sigma and lags
+    """
+    n, k = returns.shape
+    best = None
+    for lags in range(1, max_lags + 1):
+        # Same estimation sample for every order so the AICs are comparable
+        X = _lagged_design(returns, lags, max_lags)
+        Y = returns[max_lags:]
+        B, _, _, _ = np.linalg.lstsq(X, Y, rcond=None)
+        residuals = Y - X @ B
+        _, logdet = np.linalg.slogdet(residuals.T @ residuals / len(Y))
+        aic = logdet + 2 * X.shape[1] * k / len(Y)
+        if best is None or aic < best[0]:
+            best = (aic, lags)
+
+    # Refit the chosen order on all available observations
+    lags = best[1]
+    X = _lagged_design(returns, lags, lags)
+    Y = returns[lags:]
+    B, _, _, _ = np.linalg.lstsq(X, Y, rcond=None)
+    residuals = Y - X @ B
+    return {
+        'intercept': B[0],
+        'coefs': B[1:].reshape(lags, k, k).transpose(0, 2, 1),
+        'sigma': residuals.T @ residuals / max(len(Y) - X.shape[1], 1),
+        'lags': lags,
+        'observations': len(Y)
+    }
+
+
+def var_forecast(model, returns, steps):
+    """
+    Forecast cumulative log-returns and their variances
+
+    Args:
+        model: Result of fit_var
+        returns: History of returns (at least model['lags'] rows)
+        steps: Number of steps to forecast
+
+    Returns:
+        Tuple of (cumulative mean returns, variances of the cumulative
+        returns), both arrays (steps, series)
+    """
+    coefs = model['coefs']
+    lags, k, _ = coefs.shape
+    sigma = model['sigma']
+
+    history = list(returns[-lags:])
+    mean = np.empty((steps, k))
+    for h in range(steps):
+        step = model['intercept'] + sum(coefs[j] @ history[-1 - j] for j in range(lags))
+        mean[h] = step
+        history.append(step)
+
+    # Impulse responses psi_i and their running sums; the h-step cumulative
+    # return has variance sum_{i<h} C_i sigma C_i' with C_i = psi_0 + ... + psi_i
+    psi = [np.eye(k)]
+    cumulative = np.eye(k)
+    variance = np.empty((steps, k))
+    total = np.zeros(k)
+    for h in range(steps):
+        total = total + ((cumulative @ sigma) * cumulative).sum(axis=1)
+        variance[h] = total
+        psi.append(sum(coefs[j] @ psi[-1 - j] for j in range(min(len(psi), lags))))
+        cumulative = cumulative + psi[-1]
+    return np.cumsum(mean, axis=0), variance
+
+
+def forecast_currencies_joint(frames, end_date, width=INTERVAL_WIDTH, max_lags=MAX_VAR_LAGS):
+    """
+    Forecast all currencies to end_date with one VAR fit
+
+    Args:
+        frames: Dictionary of currency code -> DataFrame with post_date and average_rate
+        end_date: Last forecast day
+        width: Coverage of the prediction intervals
+        max_lags: Largest VAR order considered
+
+    Returns:
+        Tuple of (dictionary of code -> DataFrame with ds, yhat, yhat_lower,
+        yhat_upper for every day after the currency's last observation, model summary)
+    """
+    codes, dates, log_rates = align_log_rates(frames)
+    if len(dates) < 4 * max_lags + 2:
+        raise ValueError("Not enough common observations for the joint model")
+
+    returns = np.diff(log_rates, axis=0)
+    model = fit_var(returns, max_lags)
+
+    origin = dates[-1]
+    business_days = pd.bdate_range(origin + pd.Timedelta(days=1), end_date)
+    cumulative, variance = var_forecast(model, returns, len(business_days))
+    # Step 0 is the origin itself
+    log_path = np.vstack([log_rates[-1], log_rates[-1] + cumulative])
+    variance = np.vstack([np.zeros(len(codes)), variance])
+    z = NormalDist().inv_cdf(0.5 + width / 2)
+
+    forecasts = {}
+    for i, code in enumerate(codes):
+        last_date = frames[code]['post_date'].max()
+        last_rate = frames[code].loc[frames[code]['post_date'] == last_date, 'average_rate'].mean()
+        days = pd.date_range(max(last_date, origin) + pd.Timedelta(days=1), end_date)
+        steps = business_days.searchsorted(days, side='right')
+
+        # Anchor the path at the currency's own last rate
+        own_step = business_days.searchsorted(last_date, side='right') if last_date > origin else 0
+        level = log_path[:, i] - log_path[own_step, i] + np.log(last_rate)
+        spread = z * np.sqrt(np.maximum(variance[:, i] - variance[own_step, i], 0))
+
+        forecasts[code] = pd.DataFrame({
+            'ds': days,
+            'yhat': np.exp(level[steps]),
+            'yhat_lower': np.exp(level[steps] - spread[steps]),
+            'yhat_upper': np.exp(level[steps] + spread[steps])
+        })
+
+    std = np.sqrt(np.diag(model['sigma']))
+    correlation = model['sigma'] / np.outer(std, std)
+    summary = {
+        'lags': model['lags'],
+        'observations': model['observations'],
+        'origin': origin.strftime('%Y-%m-%d'),
+        'return_correlation': {
+            code: {other: round(float(correlation[i, j]), 3) for j, other in enumerate(codes)}
+            for i, code in enumerate(codes)
+        }
+    }
+    return forecasts, summary
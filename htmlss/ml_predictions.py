@@ -5,10 +5,31 @@ Uses Prophet, Linear Regression, and Time Series Analysis
 
 import pandas as pd
 import numpy as np
+import copy
+import time
+from itertools import combinations_with_replacement
 from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+from forecast_cache import ForecastCache, make_cache_key
+from model_store import model_store
+from prophet_pool import fit_prophet_model, warm_start_init
+from forecast_engines import (
+    FORECAST_ENGINES,
+    HOLT_WINTERS_PARAMS,
+    DAMPED_TREND_PARAMS,
+    run_engine,
+    engine_description,
+    engine_accumulates_errors,
+    fit_metrics
+)
+from prediction_intervals import bootstrap_intervals, INTERVAL_WIDTH
+from ensemble_weights import DEFAULT_PROPHET_WEIGHT, get_series_plan
+from prophet_tuning import tuned_prophet_params
+from forecast_ledger import record_forecast
+from settings import COMMODITY_FORECAST_ENGINE, BOOTSTRAP_PATHS
+
 # Try importing ML libraries with fallbacks
 try:
     from prophet import Prophet
@@ -26,12 +47,51 @@ except ImportError:
     print("Warning: Scikit-learn not available, using basic predictions")
     SKLEARN_AVAILABLE = False
 
+# Model parameters - part of the cache key so changing them invalidates fitted models
+# (prophet_tuning.py may override the prior scales per commodity)
+PROPHET_PARAMS = {
+    'yearly_seasonality': True,
+    'changepoint_prior_scale': 0.1,
+    'seasonality_prior_scale': 10,
+    'interval_width': 0.95
+}
+POLYNOMIAL_DEGREE = 2
+
+# Forecast horizon in quarters
+DEFAULT_HORIZON = 2
+MAX_HORIZON = 20
+LINEAR_FEATURES = ['quarter_num', 'seasonal_sin', 'seasonal_cos', 'year']
+
+# Engines built on CommodityPredictor's own models; FORECAST_ENGINES are also accepted
+MODEL_ENGINES = ('ensemble', 'prophet', 'linear')
+# Ensemble with the per-series plan learned by ensemble_weights.py
+LEARNED_ENGINE = 'auto'
+ENSEMBLE_METHODS = {
+    'ensemble': 'Weighted Average (Prophet {prophet:.0%} + Linear {linear:.0%})',
+    'prophet': 'Prophet only',
+    'linear': 'Polynomial Regression only'
+}
+
+# Fitted predictors and their forecasts, keyed by (table, commodity, series hash, params)
+commodity_model_cache = ForecastCache()
+
+# Latest fitted Prophet model per (table, commodity). Survives cache eviction and
+# data changes so the refit after a new quarter arrives is warm-started from it.
+latest_prophet_models = {}
+
 class CommodityPredictor:
     def __init__(self):
         self.prophet_model = None
         self.linear_model = None
         self.poly_features = None
         self.historical_data = None
+        self.engine = 'ensemble'
+        self.engine_fitted = None
+        self.prophet_weight = DEFAULT_PROPHET_WEIGHT
+        self.prophet_params = PROPHET_PARAMS
+        # (table, commodity) identity; when set, fitted models are shared through the model store
+        self.series_id = None
+        self.stored_models = []
         
     def prepare_data(self, commodity_data):
         """
@@ -41,8 +101,8 @@ class CommodityPredictor:
         # Convert to DataFrame
         df = pd.DataFrame(commodity_data)
         
-        # Convert quarter to datetime
-        df['ds'] = pd.to_datetime(df['quarter'].str.replace('Q', '-Q'), format='%Y-Q%q')
+        # Convert quarter labels (e.g. '2020Q1') to the quarter start date
+        df['ds'] = pd.PeriodIndex(df['quarter'], freq='Q').to_timestamp()
         df['y'] = df['value'].astype(float)
         
         # Create numerical features for linear regression
@@ -58,31 +118,53 @@ class CommodityPredictor:
         self.historical_data = df
         return df
     
-    def train_prophet_model(self, df):
+    def fit(self, commodity_data, engine='ensemble', prophet_init=None):
+        """
+        Prepare data and train the models used by `engine`
+        Registry engines (see forecast_engines) have no separate training step
+        
+        Args:
+            commodity_data: List of {'quarter', 'value'} records
+            engine: Engine name
+            prophet_init: Warm start parameters for the Prophet fit (see warm_start_init)
+        
+        Returns:
+            Tuple of (prophet_success, linear_success)
+        """
+        self.engine = engine
+        df = self.prepare_data(commodity_data)
+        
+        prophet_success = linear_success = False
+        if engine in ('ensemble', 'prophet'):
+            prophet_success = self.train_prophet_model(df, prophet_init)
+        if engine in ('ensemble', 'linear'):
+            linear_success = self.train_linear_model(df)[0]
+        return prophet_success, linear_success
+    
+    def train_prophet_model(self, df, init=None):
         """
         Train Facebook Prophet model for time series forecasting
+        The fit runs in the Prophet process pool and is abandoned after PROPHET_TIMEOUT;
+        `init` warm-starts it from a previous fit's parameters
         """
         if not PROPHET_AVAILABLE:
             return False
             
-        try:
-            # Prepare data for Prophet
-            prophet_df = df[['ds', 'y']].copy()
-            
-            # Initialize and train Prophet model
-            self.prophet_model = Prophet(
-                yearly_seasonality=True,
-                quarterly_seasonality=True,
-                changepoint_prior_scale=0.1,
-                seasonality_prior_scale=10,
-                interval_width=0.95
-            )
-            
-            self.prophet_model.fit(prophet_df)
-            return True
-        except Exception as e:
-            print(f"Prophet model training failed: {e}")
-            return False
+        # Reuse a model fitted on the same data by any worker or earlier run
+        store_key = self._store_key(df, self.prophet_params)
+        if store_key:
+            self.prophet_model = model_store.load_prophet('commodity_prophet', store_key)
+            if self.prophet_model is not None:
+                self.stored_models.append('prophet')
+                return True
+        
+        # Prepare data for Prophet
+        prophet_df = df[['ds', 'y']].copy()
+        
+        self.prophet_model = fit_prophet_model(prophet_df, self.prophet_params, init=init)
+        if store_key and self.prophet_model is not None:
+            model_store.save_prophet('commodity_prophet', store_key, self.prophet_model)
+        return self.prophet_model is not None
     
     def train_linear_model(self, df):
         """
@@ -93,17 +175,25 @@ class CommodityPredictor:
             
         try:
             # Prepare features
-            features = ['quarter_num', 'seasonal_sin', 'seasonal_cos', 'year']
-            X = df[features]
+            X = df[LINEAR_FEATURES]
             y = df['y']
             
-            # Create polynomial features for better fitting
-            self.poly_features = PolynomialFeatures(degree=2, include_bias=False)
-            X_poly = self.poly_features.fit_transform(X)
-            
-            # Train linear regression model
-            self.linear_model = LinearRegression()
-            self.linear_model.fit(X_poly, y)
+            store_key = self._store_key(df, {'degree': POLYNOMIAL_DEGREE, 'features': LINEAR_FEATURES})
+            stored = model_store.load_object('commodity_linear', store_key) if store_key else None
+            if stored is not None:
+                self.poly_features, self.linear_model = stored
+                self.stored_models.append('linear')
+                X_poly = self.poly_features.transform(X)
+            else:
+                # Create polynomial features for better fitting
+                self.poly_features = PolynomialFeatures(degree=POLYNOMIAL_DEGREE, include_bias=False)
+                X_poly = self.poly_features.fit_transform(X)
+                
+                # Train linear regression model
+                self.linear_model = LinearRegression()
+                self.linear_model.fit(X_poly, y)
+                if store_key:
+                    model_store.save_object('commodity_linear', store_key, (self.poly_features, self.linear_model))
             
             # Calculate model performance
             y_pred = self.linear_model.predict(X_poly)
@@ -115,114 +205,107 @@ class CommodityPredictor:
             print(f"Linear model training failed: {e}")
             return False, 0, 0
     
-    def predict_future(self, periods=2):
+    def _store_key(self, df, params):
+        """Model store key for this series' data and model params, or None without a series_id"""
+        if self.series_id is None:
+            return None
+        series = list(zip(df['ds'].dt.strftime('%Y-%m-%d'), df['y'].tolist()))
+        return model_store.key(self.series_id, series, params)
+    
+    def predict_future(self, periods=DEFAULT_HORIZON):
         """
         Generate predictions for future periods using both models
+        Bounds are a residual bootstrap interval of the in-sample ensemble errors
         """
-        predictions = []
-        
-        # Generate future quarters
-        last_quarter = self.historical_data['ds'].max()
-        future_quarters = []
+        if self.engine in FORECAST_ENGINES:
+            return self._predict_with_engine(periods)
         
-        for i in range(1, periods + 1):
-            # Calculate next quarter
-            if last_quarter.month <= 3:
-                next_q = 2
-                next_year = last_quarter.year
-            elif last_quarter.month <= 6:
-                next_q = 3
-                next_year = last_quarter.year
-            elif last_quarter.month <= 9:
-                next_q = 4
-                next_year = last_quarter.year
-            else:
-                next_q = 1
-                next_year = last_quarter.year + 1
-            
-            future_date = datetime(next_year, (next_q-1)*3 + 1, 1)
-            future_quarters.append(future_date)
-            last_quarter = future_date
+        # History and future quarters with their features in one step
+        n = len(self.historical_data)
+        y = self.historical_data['y'].values.astype(float)
+        history_periods = pd.PeriodIndex(self.historical_data['ds'], freq='Q')
+        future_periods = self.future_periods(periods)
+        all_periods = history_periods.append(future_periods)
         
-        # Prophet predictions
-        prophet_predictions = []
+        # Prophet predictions (in-sample and future in one call)
+        prophet_pred = np.zeros(n + periods)
         if self.prophet_model:
-            future_df = pd.DataFrame({'ds': future_quarters})
-            forecast = self.prophet_model.predict(future_df)
-            prophet_predictions = forecast[['ds', 'yhat', 'yhat_lower', 'yhat_upper']].to_dict('records')
+            prophet_df = pd.DataFrame({'ds': all_periods.to_timestamp()})
+            prophet_pred = self.prophet_model.predict(prophet_df)['yhat'].values
         
         # Linear model predictions
-        linear_predictions = []
+        linear_pred = np.zeros(n + periods)
         if self.linear_model and self.poly_features:
-            for i, future_date in enumerate(future_quarters):
-                quarter_num = len(self.historical_data) + i
-                year = future_date.year
-                quarter = ((future_date.month - 1) // 3) + 1
-                
-                features = np.array([[
-                    quarter_num,
-                    np.sin(2 * np.pi * quarter / 4),
-                    np.cos(2 * np.pi * quarter / 4),
-                    year
-                ]])
-                
-                features_poly = self.poly_features.transform(features)
-                pred_value = self.linear_model.predict(features_poly)[0]
-                
-                linear_predictions.append({
-                    'ds': future_date,
-                    'predicted_value': pred_value
-                })
+            features = quarter_feature_matrix(np.arange(n + periods), all_periods)
+            linear_pred = self.linear_model.predict(self.poly_features.transform(features))
         
-        # Combine predictions (ensemble method)
-        for i in range(periods):
-            quarter_str = f"{future_quarters[i].year}Q{((future_quarters[i].month-1)//3)+1}"
-            
-            # Get predictions from both models
-            prophet_pred = prophet_predictions[i]['yhat'] if prophet_predictions else 0
-            linear_pred = linear_predictions[i]['predicted_value'] if linear_predictions else 0
-            
-            # Ensemble prediction (weighted average)
-            if prophet_pred > 0 and linear_pred > 0:
-                # Weight Prophet more for trend, Linear more for seasonality
-                ensemble_pred = (prophet_pred * 0.6) + (linear_pred * 0.4)
-                confidence = "High"
-            elif prophet_pred > 0:
-                ensemble_pred = prophet_pred
-                confidence = "Medium"
-            elif linear_pred > 0:
-                ensemble_pred = linear_pred
-                confidence = "Medium"
-            else:
-                # Fallback to simple trend extrapolation
-                last_values = self.historical_data['y'].tail(4).values
-                trend = np.mean(np.diff(last_values))
-                ensemble_pred = self.historical_data['y'].iloc[-1] + (trend * (i + 1))
-                confidence = "Low"
-            
-            # Add confidence intervals
-            confidence_interval = ensemble_pred * 0.15  # 15% confidence interval
-            
+        # Fallback to simple trend extrapolation (previous value + trend in-sample)
+        trend = np.mean(np.diff(y[-4:]))
+        trend_pred = np.concatenate([[np.nan], y[:-1] + trend, y[-1] + trend * np.arange(1, periods + 1)])
+        
+        ensemble_pred, confidence = combine_ensemble(prophet_pred, linear_pred, trend_pred,
+                                                     self.prophet_weight)
+        
+        # Prediction intervals from the in-sample errors, allowing for the regression's terms
+        n_params = self.linear_model.rank_ + 1 if self.linear_model else 0
+        lower, upper = bootstrap_intervals(ensemble_pred[None, n:], (y - ensemble_pred[:n])[None],
+                                           n_params=n_params)
+        
+        predictions = []
+        for i, period in enumerate(future_periods):
+            h = n + i
             predictions.append({
-                'quarter': quarter_str,
-                'predicted_value': max(0, int(ensemble_pred)),
-                'prophet_prediction': max(0, int(prophet_pred)) if prophet_pred > 0 else None,
-                'linear_prediction': max(0, int(linear_pred)) if linear_pred > 0 else None,
-                'confidence_level': confidence,
-                'upper_bound': max(0, int(ensemble_pred + confidence_interval)),
-                'lower_bound': max(0, int(ensemble_pred - confidence_interval)),
+                'quarter': str(period),
+                'predicted_value': max(0, int(ensemble_pred[h])),
+                'prophet_prediction': max(0, int(prophet_pred[h])) if prophet_pred[h] > 0 else None,
+                'linear_prediction': max(0, int(linear_pred[h])) if linear_pred[h] > 0 else None,
+                'confidence_level': str(confidence[h]),
+                'upper_bound': max(0, int(upper[0, i])),
+                'lower_bound': max(0, int(lower[0, i])),
                 'is_prediction': True
             })
         
         return predictions
     
+    def future_periods(self, periods):
+        """Quarterly PeriodIndex of the `periods` quarters after the history"""
+        last_quarter = pd.Period(self.historical_data['ds'].max(), freq='Q')
+        return pd.period_range(last_quarter + 1, periods=periods, freq='Q')
+    
+    def _predict_with_engine(self, periods):
+        """
+        Generate predictions with a registered NumPy engine
+        """
+        y = self.historical_data['y'].values.astype(float)
+        result = run_engine(self.engine, y, periods, season_length=4)
+        self.engine_fitted = result['fitted']
+        
+        # Bootstrap the engine's one-step-ahead in-sample errors
+        lower, upper = bootstrap_intervals(result['forecast'][None], (y - result['fitted'])[None],
+                                           accumulate=engine_accumulates_errors(self.engine))
+        
+        predictions = []
+        for i, (period, value) in enumerate(zip(self.future_periods(periods), result['forecast'])):
+            predictions.append({
+                'quarter': str(period),
+                'predicted_value': max(0, int(value)),
+                'prophet_prediction': None,
+                'linear_prediction': None,
+                'confidence_level': 'Medium',
+                'upper_bound': max(0, int(upper[0, i])),
+                'lower_bound': max(0, int(lower[0, i])),
+                'is_prediction': True
+            })
+        return predictions
+    
     def get_model_performance(self):
         """
         Return model performance metrics
         """
+        if self.engine in FORECAST_ENGINES and self.engine_fitted is not None:
+            return fit_metrics(self.historical_data['y'].values, self.engine_fitted)
         if not self.historical_data.empty and self.linear_model:
-            features = ['quarter_num', 'seasonal_sin', 'seasonal_cos', 'year']
-            X = self.historical_data[features]
+            X = self.historical_data[LINEAR_FEATURES]
             y = self.historical_data['y']
             X_poly = self.poly_features.transform(X)
             y_pred = self.linear_model.predict(X_poly)
@@ -234,21 +317,342 @@ class CommodityPredictor:
             }
         return None
 
-def generate_ml_predictions(commodity_data, commodity_name):
+def combine_ensemble(prophet_pred, linear_pred, fallback_pred, prophet_weight=DEFAULT_PROPHET_WEIGHT):
+    """
+    Combine Prophet and linear predictions the way the ensemble does
+
+    Positive predictions of both models are averaged (Prophet 60%, Linear 40%
+    unless a learned weight is given); otherwise the positive one is used, and
+    the fallback if neither is.
+
+    Returns:
+        Tuple of (combined predictions, confidence level labels)
+    """
+    has_prophet = prophet_pred > 0
+    has_linear = linear_pred > 0
+    # Weight Prophet more for trend, Linear more for seasonality
+    combined = np.where(
+        has_prophet & has_linear, prophet_pred * prophet_weight + linear_pred * (1 - prophet_weight),
+        np.where(has_prophet, prophet_pred, np.where(has_linear, linear_pred, fallback_pred))
+    )
+    confidence = np.where(has_prophet & has_linear, 'High',
+                          np.where(has_prophet | has_linear, 'Medium', 'Low'))
+    return combined, confidence
+
+
+def quarter_feature_matrix(quarter_nums, periods):
+    """
+    Build the linear model features (LINEAR_FEATURES order) for a set of quarters
+
+    Args:
+        quarter_nums: Sequence of trend indices
+        periods: pandas PeriodIndex with quarterly frequency
+
+    Returns:
+        Array of shape (len(periods), 4)
+    """
+    quarter = np.asarray(periods.quarter, dtype=float)
+    return np.column_stack([
+        np.asarray(quarter_nums, dtype=float),
+        np.sin(2 * np.pi * quarter / 4),
+        np.cos(2 * np.pi * quarter / 4),
+        np.asarray(periods.year, dtype=float)
+    ])
+
+
+def polynomial_expand(X, degree=POLYNOMIAL_DEGREE):
+    """
+    Vectorized equivalent of PolynomialFeatures(degree, include_bias=False).fit_transform
+    (same column order)
+    """
+    columns = []
+    for d in range(1, degree + 1):
+        for combo in combinations_with_replacement(range(X.shape[1]), d):
+            columns.append(np.prod(X[:, list(combo)], axis=1))
+    return np.column_stack(columns)
+
+
+def batch_polynomial_forecast(quarters, names, values, periods=DEFAULT_HORIZON):
+    """
+    Fit the polynomial regression model for many commodities in one least-squares solve
+
+    All series sharing the same observed quarters share one design matrix, so a
+    table with complete data is solved with a single np.linalg.lstsq call using
+    one right-hand-side column per commodity.
+
+    Args:
+        quarters: Quarter labels shared by all series (e.g. '2020Q1')
+        names: Commodity names, one per row of values
+        values: Array of shape (len(names), len(quarters)); NaN marks missing data
+        periods: Number of future quarters to forecast
+
+    Returns:
+        Dictionary mapping commodity name to its predictions and model performance
+    """
+    values = np.asarray(values, dtype=float)
+    quarter_index = pd.PeriodIndex(quarters, freq='Q')
+    observed = ~np.isnan(values)
+
+    # Group series by their missing-value pattern; each group shares a design matrix
+    groups = {}
+    for i, mask in enumerate(observed):
+        groups.setdefault(mask.tobytes(), []).append(i)
+
+    # Per-series fit results, filled group by group
+    n_series = len(names)
+    point = np.full((n_series, periods), np.nan)
+    linear = np.full((n_series, periods), np.nan)
+    residuals = np.full(values.shape, np.nan)
+    r2 = np.zeros(n_series)
+    mae = np.zeros(n_series)
+    labels = [None] * n_series
+    n_params = np.zeros(n_series)
+
+    results = {}
+    for rows in groups.values():
+        mask = observed[rows[0]]
+        n = int(mask.sum())
+        if n < 3:
+            for i in rows:
+                results[names[i]] = {'error': 'Insufficient data for forecasting'}
+            continue
+
+        hist_periods = quarter_index[mask]
+        future_periods = pd.period_range(hist_periods[-1] + 1, periods=periods, freq='Q')
+        X = polynomial_expand(quarter_feature_matrix(np.arange(n), hist_periods))
+        X_future = polynomial_expand(quarter_feature_matrix(np.arange(n, n + periods), future_periods))
+        Y = values[rows][:, mask].T
+
+        # Centered least squares, as sklearn's LinearRegression does
+        X_mean = X.mean(axis=0)
+        Y_mean = Y.mean(axis=0)
+        coef, _, rank, _ = np.linalg.lstsq(X - X_mean, Y - Y_mean, rcond=None)
+        intercept = Y_mean - X_mean @ coef
+
+        fitted = X @ coef + intercept
+        forecast = X_future @ coef + intercept
+
+        # In-sample performance per series
+        ss_res = ((Y - fitted) ** 2).sum(axis=0)
+        ss_tot = ((Y - Y_mean) ** 2).sum(axis=0)
+        r2[rows] = np.where(ss_tot > 0, 1 - ss_res / np.where(ss_tot > 0, ss_tot, 1), 0.0)
+        mae[rows] = np.abs(Y - fitted).mean(axis=0)
+
+        # Same trend fallback as predict_future when the regression goes non-positive
+        tail = Y[-4:]
+        trend = np.diff(tail, axis=0).mean(axis=0)
+        steps = np.arange(1, periods + 1)[:, None]
+        trend_forecast = Y[-1] + trend * steps
+        point[rows] = np.where(forecast > 0, forecast, trend_forecast).T
+        linear[rows] = forecast.T
+        residuals[np.ix_(rows, np.flatnonzero(mask))] = (Y - fitted).T
+        n_params[rows] = rank + 1
+        for i in rows:
+            labels[i] = [str(p) for p in future_periods]
+
+    # Prediction intervals for all series in one bootstrap
+    fitted_rows = [i for i in range(n_series) if labels[i] is not None]
+    lower = np.full(point.shape, np.nan)
+    upper = np.full(point.shape, np.nan)
+    if fitted_rows:
+        lower[fitted_rows], upper[fitted_rows] = bootstrap_intervals(point[fitted_rows], residuals[fitted_rows],
+                                                                     n_params=n_params[fitted_rows])
+
+    for i in fitted_rows:
+        predictions = []
+        for h in range(periods):
+            linear_pred = linear[i, h]
+            predictions.append({
+                'quarter': labels[i][h],
+                'predicted_value': max(0, int(point[i, h])),
+                'prophet_prediction': None,
+                'linear_prediction': max(0, int(linear_pred)) if linear_pred > 0 else None,
+                'confidence_level': 'Medium' if linear_pred > 0 else 'Low',
+                'upper_bound': max(0, int(upper[i, h])),
+                'lower_bound': max(0, int(lower[i, h])),
+                'is_prediction': True
+            })
+        results[names[i]] = {
+            'predictions': predictions,
+            'model_performance': {
+                'r2_score': round(float(r2[i]), 3),
+                'mean_absolute_error': round(float(mae[i]), 2),
+                'model_accuracy': round(float(r2[i]) * 100, 1)
+            }
+        }
+
+    return results
+
+
+def generate_batch_predictions(quarters, names, values, table=None, periods=DEFAULT_HORIZON):
+    """
+    Forecast every commodity of a table at once with the batch polynomial engine
+
+    Results are cached on the content of the whole table.
+    """
+    series = {
+        'quarters': list(quarters),
+        'names': list(names),
+        'values': [[None if np.isnan(v) else v for v in row] for row in np.asarray(values, dtype=float)]
+    }
+    cache_key = make_cache_key(table, '*', series, {
+        'engine': 'batch_polynomial',
+        'polynomial_degree': POLYNOMIAL_DEGREE,
+        'periods': periods,
+        'interval': {'method': 'residual_bootstrap', 'paths': BOOTSTRAP_PATHS, 'width': INTERVAL_WIDTH}
+    })
+
+    forecasts, _ = commodity_model_cache.get_or_compute(
+        cache_key, lambda: batch_polynomial_forecast(quarters, names, values, periods)
+    )
+    return copy.deepcopy(forecasts)
+
+
+INTERVAL_METHOD = f'Residual Bootstrap ({INTERVAL_WIDTH:.0%}, {BOOTSTRAP_PATHS} paths)'
+
+
+def available_engines():
+    """Engine names accepted by generate_ml_predictions"""
+    return [LEARNED_ENGINE] + list(MODEL_ENGINES) + list(FORECAST_ENGINES)
+
+
+def _engine_params(engine, prophet_weight=DEFAULT_PROPHET_WEIGHT, prophet_params=PROPHET_PARAMS):
+    """Parameters that affect a fit with `engine` (part of the cache key)"""
+    params = {'engine': engine}
+    if engine == 'ensemble':
+        params['prophet_weight'] = prophet_weight
+    if engine in ('ensemble', 'prophet'):
+        params['prophet'] = prophet_params
+    if engine in ('ensemble', 'linear'):
+        params['polynomial_degree'] = POLYNOMIAL_DEGREE
+    if engine == 'holt_winters':
+        params['holt_winters'] = HOLT_WINTERS_PARAMS
+    if engine == 'damped_trend':
+        params['damped_trend'] = DAMPED_TREND_PARAMS
+    return params
+
+
+def generate_ml_predictions(commodity_data, commodity_name, table=None, engine=None,
+                            horizon=DEFAULT_HORIZON):
     """
     Main function to generate ML predictions for a commodity
+
+    Fitted models are cached per (table, commodity, series content, model params),
+    so repeated requests for unchanged data skip the Prophet/regression fits.
+    The horizon is not part of the fit key: any horizon is predicted from the
+    same fitted models, and each horizon's predictions are cached as well.
+    When the series changed, Prophet is warm-started from the commodity's
+    previous fit.
+
+    When the engine is defaulted to 'ensemble' or requested as 'auto', a
+    plan learned offline by ensemble_weights.py replaces the static 60/40
+    weights: the series gets its learned Prophet weight, or only the single
+    engine that backtested best (so Prophet is not fitted at all for series
+    where its weight is ~0). An explicitly requested engine is always used
+    as requested.
+
+    Args:
+        commodity_data: List of {'quarter', 'value'} records
+        commodity_name: Commodity name
+        table: Source table (part of the cache key)
+        engine: One of available_engines(); defaults to COMMODITY_FORECAST_ENGINE
+        horizon: Number of future quarters to forecast (1 to MAX_HORIZON)
+    """
+    use_plan = engine in (None, LEARNED_ENGINE)
+    engine = engine or COMMODITY_FORECAST_ENGINE
+    if engine not in available_engines():
+        raise ValueError(f"Unknown forecasting engine: {engine}")
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise ValueError(f"Forecast horizon must be between 1 and {MAX_HORIZON} quarters")
+    if engine == LEARNED_ENGINE:
+        engine = 'ensemble'
+
+    prophet_weight = DEFAULT_PROPHET_WEIGHT
+    plan = get_series_plan(table, commodity_name) if use_plan and engine == 'ensemble' else None
+    if plan and plan['engine'] in available_engines() and plan['engine'] != LEARNED_ENGINE:
+        engine = plan['engine']
+        prophet_weight = plan.get('prophet_weight') or DEFAULT_PROPHET_WEIGHT
+
+    prophet_params = tuned_prophet_params(PROPHET_PARAMS, 'commodities', table, commodity_name)
+
+    series = [(row['quarter'], row['value']) for row in commodity_data]
+    params = _engine_params(engine, prophet_weight, prophet_params)
+    fit_key = make_cache_key(table, commodity_name, series, params)
+    result_key = fit_key + (horizon,)
+
+    def predict():
+        started = time.time()
+        fitted, _ = commodity_model_cache.get_or_compute(
+            fit_key, lambda: _fit_models(commodity_data, engine, (table, commodity_name), prophet_weight,
+                                prophet_params)
+        )
+        result = _build_result(fitted, engine, horizon, learned=plan is not None)
+        if table is not None and commodity_data:
+            predictions = result['predictions']
+            record_forecast(
+                'commodity', table, commodity_name, engine, result['models_used']['ensemble_method'],
+                commodity_data[-1]['quarter'], [p['quarter'] for p in predictions],
+                [p['predicted_value'] for p in predictions], [p['lower_bound'] for p in predictions],
+                [p['upper_bound'] for p in predictions], time.time() - started
+            )
+        return result
+
+    result, cache_hit = commodity_model_cache.get_or_compute(result_key, predict)
+
+    result = copy.deepcopy(result)
+    result['cached'] = cache_hit
+    return result
+
+
+def _fit_models(commodity_data, engine='ensemble', series_id=None, prophet_weight=DEFAULT_PROPHET_WEIGHT,
+                prophet_params=PROPHET_PARAMS):
+    """
+    Fit the engine's models
+    
+    Args:
+        commodity_data: List of {'quarter', 'value'} records
+        engine: Engine name
+        series_id: (table, commodity) identity used to warm-start Prophet from
+            the series' previous fit, or None for a cold fit
+        prophet_weight: Prophet's weight in the ensemble
+        prophet_params: Prophet parameters (tuned or PROPHET_PARAMS)
+    
+    Returns:
+        Dictionary with the fitted predictor and which models trained
     """
     predictor = CommodityPredictor()
+    predictor.prophet_weight = prophet_weight
+    predictor.prophet_params = prophet_params
+    predictor.series_id = series_id
+    prophet_init = None
+    if series_id is not None and engine in ('ensemble', 'prophet'):
+        prophet_init = warm_start_init(latest_prophet_models.get(series_id))
     
-    # Prepare and train models
-    df = predictor.prepare_data(commodity_data)
+    # Prepare data and train the models the engine needs
+    prophet_success, linear_success = predictor.fit(commodity_data, engine, prophet_init)
+    if series_id is not None and predictor.prophet_model is not None:
+        latest_prophet_models[series_id] = predictor.prophet_model
     
-    # Train both models
-    prophet_success = predictor.train_prophet_model(df)
-    linear_success, r2, mae = predictor.train_linear_model(df)
+    return {
+        'predictor': predictor,
+        'prophet': prophet_success,
+        'linear_regression': linear_success,
+        'warm_start': prophet_init is not None and 'prophet' not in predictor.stored_models,
+        'stored_models': list(predictor.stored_models)
+    }
+
+
+def _build_result(fitted, engine, horizon, learned=False):
+    """Predict `horizon` quarters with fitted models and build the prediction payload"""
+    predictor = fitted['predictor']
+    if engine in ENSEMBLE_METHODS:
+        method = ENSEMBLE_METHODS[engine].format(prophet=predictor.prophet_weight,
+                                                 linear=1 - predictor.prophet_weight)
+    else:
+        method = engine_description(engine)
     
     # Generate predictions
-    predictions = predictor.predict_future(periods=2)
+    predictions = predictor.predict_future(periods=horizon)
     
     # Get model performance
     performance = predictor.get_model_performance()
@@ -256,9 +660,16 @@ def generate_ml_predictions(commodity_data, commodity_name):
     return {
         'predictions': predictions,
         'model_performance': performance,
+        'horizon': horizon,
         'models_used': {
-            'prophet': prophet_success,
-            'linear_regression': linear_success,
-            'ensemble_method': 'Weighted Average (Prophet 60% + Linear 40%)'
+            'prophet': fitted['prophet'],
+            'linear_regression': fitted['linear_regression'],
+            'engine': engine,
+            'warm_start': fitted['warm_start'],
+            'stored_models': fitted['stored_models'],
+            'ensemble_method': method,
+            'learned_weights': learned,
+            'interval_method': INTERVAL_METHOD
         }
-    }
\ No newline at end of file
+    }
+
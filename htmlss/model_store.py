@@ -0,0 +1,157 @@
+"""
+On-Disk Model Store
+Fitted Prophet models (JSON serialization) and scikit-learn regression models
+(pickle) keyed by the content hash of the series they were fitted on, so
+every gunicorn worker and every restart reuses a fit instead of refitting
+
+Layout:
+    MODEL_STORE_DIR/v<STORE_VERSION>/<kind>/<series>-<params>-<content>.json   Prophet models
+    MODEL_STORE_DIR/v<STORE_VERSION>/<kind>/<series>-<params>-<content>.pkl    regression models
+
+Files are written to a temporary name and renamed into place, so concurrent
+workers never read a partial model. Saving a model removes the models of
+earlier data of the same series, kind and parameters, so the store holds
+one model per series and parameter set instead of one per data version.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+
+from forecast_cache import series_fingerprint
+from settings import MODEL_STORE_DIR, MODEL_STORE_ENABLED
+
+try:
+    from prophet import __version__ as PROPHET_VERSION
+    from prophet.serialize import model_to_json, model_from_json
+    PROPHET_AVAILABLE = True
+except ImportError:
+    PROPHET_VERSION = None
+    PROPHET_AVAILABLE = False
+
+try:
+    from sklearn import __version__ as SKLEARN_VERSION
+except ImportError:
+    SKLEARN_VERSION = None
+
+# Bump when the stored format or the fitting code changes incompatibly
+STORE_VERSION = 3
+
+
+def _short_hash(value):
+    payload = json.dumps(value, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+class ModelStore:
+    """
+    Content-addressed store of fitted models shared by all processes
+
+    Keys include the library versions, since Prophet JSON and sklearn pickles
+    are only guaranteed to load with the version that wrote them.
+    """
+
+    def __init__(self, root=MODEL_STORE_DIR, enabled=MODEL_STORE_ENABLED):
+        self.root = os.path.join(root, f'v{STORE_VERSION}')
+        self.enabled = enabled
+
+    def key(self, series_name, series, params):
+        """
+        Key for the model of one series
+
+        Args:
+            series_name: Series identity (e.g. (table, commodity) or currency code)
+            series: Data the model is fitted on, passed to series_fingerprint
+            params: Model parameters that affect the fit
+
+        Returns:
+            '<series>-<params>-<content>' where <series> hashes only series_name
+            and <params> only params
+        """
+        series_hash = _short_hash(series_name)
+        params_hash = _short_hash(params)
+        payload = json.dumps({
+            'series_name': series_name,
+            'series': series_fingerprint(series),
+            'params': params,
+            'prophet': PROPHET_VERSION,
+            'sklearn': SKLEARN_VERSION
+        }, sort_keys=True, default=str)
+        return f"{series_hash}-{params_hash}-{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+    def _path(self, kind, key, extension):
+        return os.path.join(self.root, kind, f'{key}.{extension}')
+
+    def _read(self, path, mode):
+        try:
+            with open(path, mode) as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, path, data, mode):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, mode) as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self._prune(path)
+
+    def _prune(self, path):
+        """Remove the other models of the series and parameters stored at path"""
+        directory, name = os.path.split(path)
+        prefix = name.rsplit('-', 1)[0] + '-'
+        for entry in os.listdir(directory):
+            if entry.startswith(prefix) and entry != name:
+                try:
+                    os.unlink(os.path.join(directory, entry))
+                except FileNotFoundError:
+                    pass
+
+    def load_prophet(self, kind, key):
+        """Stored Prophet model, or None"""
+        if not self.enabled or not PROPHET_AVAILABLE:
+            return None
+        try:
+            data = self._read(self._path(kind, key, 'json'), 'r')
+            return model_from_json(data) if data is not None else None
+        except Exception as e:
+            print(f"Could not load stored Prophet model {kind}/{key}: {e}")
+            return None
+
+    def save_prophet(self, kind, key, model):
+        if not self.enabled or not PROPHET_AVAILABLE or model is None:
+            return
+        try:
+            self._write(self._path(kind, key, 'json'), model_to_json(model), 'w')
+        except Exception as e:
+            print(f"Could not store Prophet model {kind}/{key}: {e}")
+
+    def load_object(self, kind, key):
+        """Stored pickled object (e.g. a regression model and its features), or None"""
+        if not self.enabled:
+            return None
+        try:
+            data = self._read(self._path(kind, key, 'pkl'), 'rb')
+            return pickle.loads(data) if data is not None else None
+        except Exception as e:
+            print(f"Could not load stored model {kind}/{key}: {e}")
+            return None
+
+    def save_object(self, kind, key, value):
+        if not self.enabled:
+            return
+        try:
+            self._write(self._path(kind, key, 'pkl'), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 'wb')
+        except Exception as e:
+            print(f"Could not store model {kind}/{key}: {e}")
+
+
+model_store = ModelStore()
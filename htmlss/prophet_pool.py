@@ -0,0 +1,209 @@
+"""
+Prophet Fitting Pool
+Runs Prophet fits in worker processes and enforces PROPHET_TIMEOUT,
+so a slow Stan fit can never tie up a web worker
+"""
+
+import multiprocessing
+import os
+import signal
+import threading
+
+import numpy as np
+import pandas as pd
+
+from settings import PROPHET_TIMEOUT, PROPHET_POOL_WORKERS, PROPHET_WARM_START
+
+try:
+    from prophet import Prophet
+    from prophet.serialize import model_to_json, model_from_json
+    from prophet.utilities import warm_start_params
+    PROPHET_AVAILABLE = True
+except ImportError:
+    PROPHET_AVAILABLE = False
+
+
+def _process_context():
+    """
+    Start worker processes from a fork server where available: forking the
+    (multi-threaded) web process directly can deadlock a child on a lock held
+    by another thread, and spawning re-imports Prophet for every fit
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload(['prophet_pool'])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def _init_worker():
+    """Put each worker process in its own process group so CmdStan children die with it"""
+    if hasattr(os, 'setsid'):
+        os.setsid()
+
+
+def _kill_worker(process):
+    if hasattr(os, 'killpg'):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+            return
+        except OSError:
+            pass
+    process.kill()
+
+
+def warm_start_init(model):
+    """
+    Parameters of a fitted Prophet model in the form accepted as `init` by a refit
+
+    Returns:
+        Dictionary of initial values, or None if warm starts are disabled or unavailable
+    """
+    if not PROPHET_WARM_START or model is None or not PROPHET_AVAILABLE:
+        return None
+    try:
+        return warm_start_params(model)
+    except Exception as e:
+        print(f"Could not read warm start parameters: {e}")
+        return None
+
+
+def _align_init(init, n_obs, params):
+    """
+    Match the changepoint deltas of a warm start to the new history length
+
+    Prophet places min(n_changepoints, floor(n * changepoint_range) - 1)
+    changepoints (at least one slot), so the count can grow as quarters are
+    appended. Missing deltas start at zero; surplus ones are dropped.
+    """
+    hist_size = int(np.floor(n_obs * params.get('changepoint_range', 0.8)))
+    n_changepoints = max(1, min(params.get('n_changepoints', 25), hist_size - 1))
+    delta = np.zeros(n_changepoints)
+    previous = np.asarray(init['delta'], dtype=float)[:n_changepoints]
+    delta[:len(previous)] = previous
+    return dict(init, delta=delta)
+
+
+def _fit_prophet(df, params, init=None):
+    """
+    Fit Prophet, warm-started from `init` when given
+
+    A warm start that fails (e.g. the seasonality terms changed shape and
+    Stan rejects the initial values) falls back to a cold fit.
+    """
+    if init is not None:
+        try:
+            model = Prophet(**params)
+            model.fit(df, init=_align_init(init, len(df), params))
+            return model
+        except Exception as e:
+            print(f"Warm-started Prophet fit failed ({e}), fitting from scratch")
+    model = Prophet(**params)
+    model.fit(df)
+    return model
+
+
+def _fit_in_worker(connection, ds, y, params, init=None):
+    """Fit a Prophet model inside a worker process and send it back as JSON"""
+    _init_worker()
+    try:
+        model = _fit_prophet(pd.DataFrame({'ds': ds, 'y': y}), params, init)
+        connection.send(('ok', model_to_json(model)))
+    except Exception as e:
+        connection.send(('error', str(e)))
+    finally:
+        connection.close()
+
+
+class ProphetFitPool:
+    """
+    Worker processes for Prophet fits with a hard per-fit timeout
+
+    Every fit runs in a process of its own, at most max_workers at a time. A
+    fit that exceeds the timeout cannot be cancelled inside a running
+    process, so that process (and its CmdStan children) is killed; fits
+    running alongside it are unaffected. The timeout counts from the start
+    of the fit's process, so fits waiting for a free slot never time out.
+    """
+
+    def __init__(self, max_workers=PROPHET_POOL_WORKERS, timeout=PROPHET_TIMEOUT):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._context = _process_context()
+
+    def fit(self, df, params, timeout=None, init=None):
+        """
+        Fit Prophet on df (ds, y columns) with a hard timeout
+
+        Returns:
+            Fitted Prophet model, or None if the fit failed or timed out
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._slots:
+            receiver, sender = self._context.Pipe(duplex=False)
+            process = self._context.Process(target=_fit_in_worker, daemon=True,
+                                              args=(sender, list(df['ds']), list(df['y']), params, init))
+            process.start()
+            sender.close()
+            try:
+                if not receiver.poll(timeout):
+                    print(f"Prophet fit exceeded {timeout}s, killing its worker")
+                    _kill_worker(process)
+                    return None
+                status, payload = receiver.recv()
+            except (EOFError, OSError):
+                print("Prophet fit worker died")
+                return None
+            finally:
+                receiver.close()
+                process.join()
+
+        if status != 'ok':
+            print(f"Prophet fit failed in worker process: {payload}")
+            return None
+        try:
+            return model_from_json(payload)
+        except Exception as e:
+            print(f"Could not read fitted Prophet model: {e}")
+            return None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_prophet_pool():
+    """Return the process-wide Prophet fitting pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProphetFitPool()
+        return _pool
+
+
+def fit_prophet_model(df, params, timeout=None, init=None):
+    """
+    Fit a Prophet model without blocking longer than PROPHET_TIMEOUT
+
+    Args:
+        df: DataFrame with 'ds' and 'y' columns
+        params: Keyword arguments for Prophet()
+        timeout: Override for PROPHET_TIMEOUT (seconds)
+        init: Warm start parameters from warm_start_init() of a previous fit
+
+    Returns:
+        Fitted Prophet model, or None if Prophet is unavailable, failed or timed out
+    """
+    if not PROPHET_AVAILABLE:
+        return None
+
+    if PROPHET_POOL_WORKERS <= 0:
+        # Pool disabled: fit inline (no timeout enforcement)
+        try:
+            return _fit_prophet(df[['ds', 'y']], params, init)
+        except Exception as e:
+            print(f"Prophet model training failed: {e}")
+            return None
+
+    return get_prophet_pool().fit(df, params, timeout, init)
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Prophet Hyperparameter Search
+Grid-searches changepoint_prior_scale and seasonality_prior_scale for every
+commodity series and every currency on a process pool, scores each candidate
+by rolling-origin MAE and writes the winners to PROPHET_TUNED_PARAMS_FILE.
+CommodityPredictor and CurrencyForecaster pick the tuned values up at serve
+time; nothing is tuned on the request path.
+
+Usage:
+    python prophet_tuning.py [--table exports|imports|all|none] [--currencies USD,EUR,...]
+                             [--workers N] [--from-dump] [--output prophet_params.json]
+"""
+
+import argparse
+import logging
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import product
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(__file__))
+
+from forecast_cache import JsonArtifact, write_json_atomic
+from settings import PROPHET_TUNED_PARAMS_FILE
+
+try:
+    from prophet import Prophet
+    PROPHET_AVAILABLE = True
+except ImportError:
+    PROPHET_AVAILABLE = False
+
+# Candidate values (the defaults of both models are included)
+CHANGEPOINT_PRIOR_SCALES = [0.001, 0.01, 0.05, 0.1, 0.5]
+SEASONALITY_PRIOR_SCALES = [0.1, 1.0, 10.0]
+
+# Rolling-origin settings: commodities use every origin from COMMODITY_MIN_TRAIN
+# quarters on; currencies use CURRENCY_ORIGINS cutoffs CURRENCY_HORIZON days apart
+COMMODITY_HORIZON = 2
+COMMODITY_MIN_TRAIN = 12
+CURRENCY_HORIZON = 90
+CURRENCY_ORIGINS = 3
+
+TUNED_KEYS = ('changepoint_prior_scale', 'seasonality_prior_scale')
+
+tuned_params_file = JsonArtifact(PROPHET_TUNED_PARAMS_FILE)
+
+
+def tuned_prophet_params(base_params, section, *path):
+    """
+    Prophet parameters for one series with its tuned values applied
+
+    Args:
+        base_params: Default Prophet parameters of the model
+        section: 'commodities' or 'currencies'
+        path: Keys below the section ((table, commodity) or (currency_code,))
+
+    Returns:
+        New parameter dictionary (base_params if the series was never tuned)
+    """
+    entry = tuned_params_file.load().get(section, {})
+    for key in path:
+        entry = entry.get(key or '', {}) if isinstance(entry, dict) else {}
+    tuned = {k: v for k, v in entry.get('params', {}).items() if k in TUNED_KEYS}
+    return dict(base_params, **tuned) if tuned else base_params
+
+
+def rolling_origins(n, horizon, min_train=None, count=None):
+    """Training lengths of the rolling origins of a series with n observations"""
+    if count is not None:
+        return [n - horizon * (count - i) for i in range(count) if n - horizon * (count - i) > horizon]
+    return list(range(min_train, n - horizon + 1))
+
+
+def _init_worker():
+    logging.getLogger('cmdstanpy').setLevel(logging.WARNING)
+
+
+def score_candidate(ds, y, params, origins, horizon):
+    """
+    Rolling-origin MAE of one Prophet parameter set
+
+    Args:
+        ds, y: Full history
+        params: Keyword arguments for Prophet()
+        origins: Training lengths to evaluate
+        horizon: Number of observations forecast after each origin
+
+    Returns:
+        Mean absolute error over all origins (inf if any fit fails)
+    """
+    history = pd.DataFrame({'ds': pd.to_datetime(ds), 'y': np.asarray(y, dtype=float)})
+    errors = []
+    try:
+        for t in origins:
+            model = Prophet(**params)
+            model.fit(history.iloc[:t])
+            test = history.iloc[t:t + horizon]
+            forecast = model.predict(test[['ds']])['yhat'].values
+            errors.append(np.abs(forecast - test['y'].values))
+    except Exception as e:
+        print(f"Candidate {params} failed: {e}", file=sys.stderr)
+        return float('inf')
+    return float(np.concatenate(errors).mean()) if errors else float('inf')
+
+
+def candidate_grid(base_params):
+    return [dict(base_params, changepoint_prior_scale=cps, seasonality_prior_scale=sps)
+            for cps, sps in product(CHANGEPOINT_PRIOR_SCALES, SEASONALITY_PRIOR_SCALES)]
+
+
+def collect_series(tables, currencies, from_dump=False):
+    """
+    Yield (section, path, ds, y, base_params, origins, horizon) for every series to tune
+    """
+    from ml_predictions import PROPHET_PARAMS
+    from currency_forecasting import CURRENCY_PROPHET_PARAMS
+    from currency_analysis import load_currency_data
+    from backtest_ml import load_series
+
+    for table_name, commodity, records in load_series(tables, from_dump):
+        origins = rolling_origins(len(records), COMMODITY_HORIZON, min_train=COMMODITY_MIN_TRAIN)
+        if not origins:
+            print(f"Skipping {commodity}: only {len(records)} quarters", file=sys.stderr)
+            continue
+        ds = pd.PeriodIndex([r['quarter'] for r in records], freq='Q').to_timestamp()
+        yield ('commodities', (table_name, commodity), list(ds), [r['value'] for r in records],
+               PROPHET_PARAMS, origins, COMMODITY_HORIZON)
+
+    for code in currencies:
+        df = load_currency_data(code)
+        if df is None or df.empty:
+            print(f"Skipping {code}: no data", file=sys.stderr)
+            continue
+        origins = rolling_origins(len(df), CURRENCY_HORIZON, count=CURRENCY_ORIGINS)
+        yield ('currencies', (code,), list(df['post_date']), list(df['average_rate']),
+               CURRENCY_PROPHET_PARAMS, origins, CURRENCY_HORIZON)
+
+
+def tune_all(tables, currencies, workers=None, from_dump=False):
+    """
+    Grid-search every series on a process pool
+
+    Returns:
+        Dictionary with 'commodities' (by table, then commodity) and 'currencies'
+        entries holding the winning params and their errors
+    """
+    tuned = {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'grid': {
+            'changepoint_prior_scale': CHANGEPOINT_PRIOR_SCALES,
+            'seasonality_prior_scale': SEASONALITY_PRIOR_SCALES
+        },
+        'commodities': {},
+        'currencies': {}
+    }
+
+    scores = {}
+    series = list(collect_series(tables, currencies, from_dump))
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker) as executor:
+        futures = {}
+        for section, path, ds, y, base_params, origins, horizon in series:
+            for params in candidate_grid(base_params):
+                future = executor.submit(score_candidate, ds, y, params, origins, horizon)
+                futures[future] = (section, path, params)
+        print(f"Scoring {len(futures)} candidates for {len(series)} series...", file=sys.stderr)
+
+        for future in as_completed(futures):
+            section, path, params = futures[future]
+            scores.setdefault((section, path), []).append((future.result(), params))
+
+    for section, path, ds, y, base_params, origins, horizon in series:
+        candidates = scores.get((section, path), [])
+        default_mae = next((mae for mae, params in candidates
+                            if all(params[k] == base_params[k] for k in TUNED_KEYS)), None)
+        mae, best = min(candidates, key=lambda c: c[0])
+        if not np.isfinite(mae):
+            continue
+        node = tuned[section]
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = {
+            'params': {k: best[k] for k in TUNED_KEYS},
+            'mae': mae,
+            'default_mae': default_mae,
+            'origins': len(origins)
+        }
+    return tuned
+
+
+def main(argv=None):
+    from commodity_data import COMMODITY_TABLES
+    from currency_analysis import AVAILABLE_CURRENCIES
+
+    parser = argparse.ArgumentParser(description='Grid-search Prophet prior scales per series')
+    parser.add_argument('--table', choices=['exports', 'imports', 'all', 'none'], default='all')
+    parser.add_argument('--currencies', default=','.join(AVAILABLE_CURRENCIES),
+                        help='Comma-separated currency codes, empty for none (default: %(default)s)')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--from-dump', action='store_true',
+                        help='Read commodity series from bigdata.sql instead of the database')
+    parser.add_argument('--output', default=PROPHET_TUNED_PARAMS_FILE,
+                        help='Tuned parameters file (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    if not PROPHET_AVAILABLE:
+        parser.error('Prophet is not installed')
+
+    if args.table == 'all':
+        tables = list(COMMODITY_TABLES.values())
+    elif args.table == 'none':
+        tables = []
+    else:
+        tables = [COMMODITY_TABLES[args.table]]
+    currencies = [c.strip() for c in args.currencies.split(',') if c.strip()]
+    unknown = set(currencies) - set(AVAILABLE_CURRENCIES)
+    if unknown:
+        parser.error(f"Unknown currencies: {', '.join(sorted(unknown))}")
+
+    tuned = tune_all(tables, currencies, args.workers, args.from_dump)
+
+    # Keep winners of series that were not re-tuned this run
+    previous = JsonArtifact(args.output).load()
+    for table_name, entries in previous.get('commodities', {}).items():
+        tuned['commodities'].setdefault(table_name, {})
+        for commodity, entry in entries.items():
+            tuned['commodities'][table_name].setdefault(commodity, entry)
+    for code, entry in previous.get('currencies', {}).items():
+        tuned['currencies'].setdefault(code, entry)
+
+    write_json_atomic(args.output, tuned)
+    count = sum(len(entries) for entries in tuned['commodities'].values()) + len(tuned['currencies'])
+    print(f"Tuned parameters for {count} series written to {args.output}", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""
+Runtime Settings Module
+Exposes the shared Config values to the dashboard modules
+Falls back to environment variables when the project root is not importable
+(e.g. when the app is started with `cd htmlss && python app.py`)
+"""
+
+import os
+
+try:
+    from config import Config
+except ImportError:
+    Config = None
+
+
+def _setting(name, default, cast=str):
+    """Read a setting from Config if available, otherwise from the environment"""
+    if Config is not None and hasattr(Config, name):
+        return getattr(Config, name)
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return cast(value)
+
+
+def _flag(value):
+    return str(value).lower() == 'true'
+
+
+# ML Configuration
+PROPHET_TIMEOUT = _setting('PROPHET_TIMEOUT', 30, int)
+PROPHET_POOL_WORKERS = _setting('PROPHET_POOL_WORKERS', 4, int)
+PROPHET_WARM_START = _setting('PROPHET_WARM_START', True, _flag)
+ML_CACHE_ENABLED = _setting('ML_CACHE_ENABLED', True, _flag)
+ML_CACHE_MAX_ENTRIES = _setting('ML_CACHE_MAX_ENTRIES', 256, int)
+ML_CACHE_MAX_MB = _setting('ML_CACHE_MAX_MB', 64, int)
+BOOTSTRAP_PATHS = _setting('BOOTSTRAP_PATHS', 2000, int)
+MODEL_STORE_ENABLED = _setting('MODEL_STORE_ENABLED', True, _flag)
+MODEL_STORE_DIR = _setting('MODEL_STORE_DIR', os.path.join(os.path.dirname(__file__), 'model_store'))
+COMMODITY_FORECAST_ENGINE = _setting('COMMODITY_FORECAST_ENGINE', 'ensemble')
+PROPHET_TUNED_PARAMS_FILE = _setting('PROPHET_TUNED_PARAMS_FILE', os.path.join(os.path.dirname(__file__), 'prophet_params.json'))
+ENSEMBLE_WEIGHTS_FILE = _setting('ENSEMBLE_WEIGHTS_FILE', os.path.join(os.path.dirname(__file__), 'ensemble_weights.json'))
+CURRENCY_FORECAST_ENGINE = _setting('CURRENCY_FORECAST_ENGINE', 'auto')
+FORECAST_PRECOMPUTE_ENABLED = _setting('FORECAST_PRECOMPUTE_ENABLED', True, _flag)
+FORECAST_REFRESH_INTERVAL = _setting('FORECAST_REFRESH_INTERVAL', 300, int)
+FORECAST_SCHEDULER_LOCK_FILE = _setting('FORECAST_SCHEDULER_LOCK_FILE', os.path.join(os.path.dirname(__file__), 'forecast_scheduler.lock'))
+FORECAST_LEDGER_ENABLED = _setting('FORECAST_LEDGER_ENABLED', True, _flag)
+CURRENCY_CACHE_ENABLED = _setting('CURRENCY_CACHE_ENABLED', True, _flag)
+CURRENCY_CACHE_DIR = _setting('CURRENCY_CACHE_DIR', os.path.join(os.path.dirname(__file__), 'currency_cache'))
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Tests for the forecast cache and the vectorized numeric helpers
+(batch polynomial fit, bootstrap intervals, date windows, window
+statistics and LTTB downsampling); none of them need the database
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(__file__))
+
+import numpy as np
+import pandas as pd
+
+
+def test_forecast_cache():
+    from forecast_cache import ForecastCache
+
+    cache = ForecastCache(max_entries=10, max_bytes=1000, enabled=True)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return [1, 2, 3]
+
+    # Concurrent misses on one key run the computation once
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('a', compute)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert [value for value, _ in results] == [[1, 2, 3]] * 4
+    assert sum(hit for _, hit in results) == 3
+    assert cache.get_or_compute('a', compute) == ([1, 2, 3], True)
+
+    # A failed computation is not cached
+    def fail():
+        raise ValueError('no data')
+    try:
+        cache.get_or_compute('b', fail)
+        assert False, 'expected ValueError'
+    except ValueError:
+        pass
+    assert cache.get('b') is None
+
+    # Least recently used entries are evicted to stay within the byte budget
+    cache.put('x', 'x', size=400)
+    cache.put('y', 'y', size=400)
+    cache.get('x')
+    cache.put('z', 'z', size=400)
+    assert cache.get('y') is None
+    assert cache.get('x') == 'x' and cache.get('z') == 'z'
+    assert cache.stats()['bytes'] <= 1000
+
+    # Values larger than the whole budget are never cached
+    cache.put('huge', 'h', size=2000)
+    assert cache.get('huge') is None
+
+
+def test_batch_polynomial_forecast():
+    from sklearn.linear_model import LinearRegression
+    from sklearn.preprocessing import PolynomialFeatures
+    from ml_predictions import batch_polynomial_forecast, quarter_feature_matrix
+
+    quarters = [f'{year}Q{q}' for year in range(2016, 2025) for q in range(1, 5)]
+    n = len(quarters)
+    rng = np.random.default_rng(0)
+    trend = np.arange(n, dtype=float)
+    values = np.vstack([
+        1e6 + 2e4 * trend + 5e3 * rng.standard_normal(n),
+        5e5 + 3e3 * trend ** 1.5 + 2e3 * rng.standard_normal(n),
+        2e5 + 1e3 * trend + 1e3 * rng.standard_normal(n)
+    ])
+    values[2, [3, 10]] = np.nan
+    names = ['Coffee', 'Tea', 'Minerals']
+
+    results = batch_polynomial_forecast(quarters, names, values, periods=2)
+
+    history = pd.PeriodIndex(quarters, freq='Q')
+    future = pd.period_range(history[-1] + 1, periods=2, freq='Q')
+    for i, name in enumerate(names):
+        # Trend index counts observed quarters, as in CommodityPredictor
+        observed = ~np.isnan(values[i])
+        k = int(observed.sum())
+        features = PolynomialFeatures(degree=2)
+        X = features.fit_transform(quarter_feature_matrix(np.arange(k), history[observed]))
+        model = LinearRegression().fit(X, values[i, observed])
+        expected = model.predict(features.transform(quarter_feature_matrix(np.arange(k, k + 2), future)))
+
+        predictions = results[name]['predictions']
+        assert [p['quarter'] for p in predictions] == [str(p) for p in future]
+        linear = np.array([p['linear_prediction'] for p in predictions], dtype=float)
+        assert np.allclose(linear, expected, rtol=1e-6, atol=1.0), (name, linear, expected)
+        for p in predictions:
+            assert p['lower_bound'] <= p['predicted_value'] <= p['upper_bound']
+
+
+def test_bootstrap_intervals():
+    from prediction_intervals import bootstrap_intervals
+
+    rng = np.random.default_rng(1)
+    point = np.vstack([np.linspace(100, 110, 8), np.full(8, 50.0), np.zeros(8)])
+    residuals = rng.normal(0, [[1.0], [5.0], [1.0]], (3, 40))
+    residuals[1, 30:] = np.nan
+    residuals[2, 1:] = np.nan  # fewer than two residuals
+
+    for accumulate in (False, True):
+        lower, upper = bootstrap_intervals(point, residuals, accumulate=accumulate)
+        assert lower.shape == upper.shape == point.shape
+        assert np.all(lower[:2] < point[:2]) and np.all(upper[:2] > point[:2])
+        assert np.array_equal(lower[2], point[2]) and np.array_equal(upper[2], point[2])
+
+        width = upper[:2] - lower[:2]
+        if accumulate:
+            # Accumulated errors widen the band at every step
+            assert np.all(np.diff(width, axis=1) > 0)
+        else:
+            # Independent errors keep it about level
+            assert np.all(width.max(axis=1) < 1.5 * width.min(axis=1))
+        # The noisier series gets the wider band
+        assert np.all(width[1] > width[0])
+
+    # Fitted parameters widen the band
+    lower, upper = bootstrap_intervals(point[:1], residuals[:1])
+    lower_p, upper_p = bootstrap_intervals(point[:1], residuals[:1], n_params=10)
+    assert np.all(upper_p - lower_p > upper - lower)
+
+
+def _currency_frame(rows=2000):
+    rng = np.random.default_rng(2)
+    dates = pd.bdate_range('2015-01-01', periods=rows)
+    average = 800 + np.cumsum(rng.normal(0, 1, rows))
+    return pd.DataFrame({
+        'post_date': dates,
+        'buying_rate': average - 2,
+        'average_rate': average,
+        'selling_rate': average + 2
+    })
+
+
+def test_date_window():
+    from currency_analysis import date_window, date_position
+
+    df = _currency_frame()
+    cases = [
+        ('2016-03-05', '2017-07-01'),   # weekend start
+        ('2015-01-01', '2015-01-01'),
+        (None, '2016-01-01'),
+        ('2018-06-01', None),
+        ('2030-01-01', None),           # after the data
+        ('2017-01-01', '2016-01-01'),   # empty range
+        (None, None)
+    ]
+    for start, end in cases:
+        mask = np.ones(len(df), dtype=bool)
+        if start is not None:
+            mask &= df['post_date'] >= pd.Timestamp(start)
+        if end is not None:
+            mask &= df['post_date'] <= pd.Timestamp(end)
+        window = date_window(df, start, end)
+        assert window.equals(df[mask]), (start, end)
+
+    assert date_position(df, '2016-03-05') == int((df['post_date'] < '2016-03-05').sum())
+
+
+def test_window_statistics():
+    from currency_analysis import WindowStatistics
+
+    df = _currency_frame()
+    values = df['average_rate']
+    stats = WindowStatistics(values.to_numpy())
+    rng = np.random.default_rng(3)
+    ranges = [(0, len(values)), (0, 1), (5, 7), (100, 400), (len(values) - 30, len(values))]
+    ranges += [tuple(sorted(rng.choice(len(values) + 1, 2, replace=False))) for _ in range(50)]
+    for lo, hi in ranges:
+        window = values.iloc[lo:hi]
+        assert np.isclose(stats.mean(lo, hi), window.mean())
+        assert stats.min(lo, hi) == window.min() and stats.max(lo, hi) == window.max()
+        if hi - lo < 2:
+            assert np.isnan(stats.std(lo, hi))
+        else:
+            assert np.isclose(stats.std(lo, hi), window.std(), rtol=1e-9)
+
+    # Same as a rolling window at every position
+    rolling = values.rolling(30)
+    for name in ('mean', 'std', 'min', 'max'):
+        expected = getattr(rolling, name)().to_numpy()[29:]
+        actual = [getattr(stats, name)(hi - 30, hi) for hi in range(30, len(values) + 1)]
+        assert np.allclose(actual, expected), name
+
+
+def test_lttb_indices():
+    from currency_analysis import lttb_indices
+
+    rng = np.random.default_rng(4)
+    x = np.cumsum(rng.uniform(0.5, 3, 5000))
+    y = np.cumsum(rng.normal(size=5000))
+    y[2500] = y.max() + 100  # spike
+
+    for max_points in (3, 10, 500):
+        indices = np.asarray(lttb_indices(x, y, max_points))
+        assert len(indices) == max_points
+        assert indices[0] == 0 and indices[-1] == len(y) - 1
+        assert np.all(np.diff(indices) > 0)
+    assert 2500 in lttb_indices(x, y, 500)
+
+    # Short series are returned whole
+    assert list(lttb_indices(x[:5], y[:5], 10)) == list(range(5))
+
+
+if __name__ == "__main__":
+    tests = [test_forecast_cache, test_batch_polynomial_forecast, test_bootstrap_intervals,
+             test_date_window, test_window_statistics, test_lttb_indices]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+            print(f"✅ {test.__name__}")
+        except Exception as e:
+            failed += 1
+            print(f"❌ {test.__name__}: {e}")
+            import traceback
+            traceback.print_exc()
+    if failed:
+        print(f"\n❌ {failed} of {len(tests)} tests failed")
+        sys.exit(1)
+    print("\n🎉 All forecast numerics tests passed!")
@@ -11,34 +11,37 @@ htmlss_dir = current_dir / "htmlss"
 sys.path.insert(0, str(htmlss_dir))
 sys.path.insert(0, str(current_dir))
 
-print("🚀 Starting Rwanda Trade Dashboard...")
-
-# Try to run your current working application
-try:
-    from app import app
-    print("✅ Successfully imported application")
-    print("🌐 Starting server on http://localhost:5000")
-    print("� Dashboard will be available shortly...")
-    
-    # Start the application
-    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=False)
-    
-except ImportError as e:
-    print(f"❌ Import error: {e}")
-    print("📝 Checking for database dependencies...")
-    
-    # Try to install missing dependencies
+# Prophet fit workers re-import this script as __mp_main__, so only start
+# the server when it is run directly
+if __name__ == '__main__':
+    print("🚀 Starting Rwanda Trade Dashboard...")
+
+    # Try to run your current working application
     try:
-        import subprocess
-        print("🔧 Installing missing database dependencies...")
-        subprocess.check_call([sys.executable, "-m", "pip", "install", "mysql-connector-python", "pymysql"])
-        
-        # Try again
         from app import app
-        print("✅ Dependencies installed, starting application...")
+        print("✅ Successfully imported application")
+        print("🌐 Starting server on http://localhost:5000")
+        print("� Dashboard will be available shortly...")
+
+        # Start the application
         app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=False)
-        
-    except Exception as e2:
-        print(f"❌ Could not resolve dependencies: {e2}")
-        print("📝 Please check your database configuration")
-        sys.exit(1)
\ No newline at end of file
+
+    except ImportError as e:
+        print(f"❌ Import error: {e}")
+        print("📝 Checking for database dependencies...")
+
+        # Try to install missing dependencies
+        try:
+            import subprocess
+            print("🔧 Installing missing database dependencies...")
+            subprocess.check_call([sys.executable, "-m", "pip", "install", "mysql-connector-python", "pymysql"])
+
+            # Try again
+            from app import app
+            print("✅ Dependencies installed, starting application...")
+            app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), debug=False)
+
+        except Exception as e2:
+            print(f"❌ Could not resolve dependencies: {e2}")
+            print("📝 Please check your database configuration")
+            sys.exit(1)
\ No newline at end of file